@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Ensure we can import the project modules when run from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from src.utils.candidate_index import CandidateIndex
+
+def make_pool(size, vocab_size, rng):
+    """Candidate skill strings: 3-8 skills each, drawn from a long-tailed (Zipf-like) vocabulary."""
+    popularity = 1.0 / np.arange(1, vocab_size + 1)
+    popularity /= popularity.sum()
+    skills = np.array([f"skill{i}" for i in range(vocab_size)])
+    counts = rng.integers(3, 9, size=size)
+    picks = rng.choice(vocab_size, size=counts.sum(), p=popularity)
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    texts = [" ".join(skills[picks[bounds[i]:bounds[i + 1]]]) for i in range(size)]
+    return texts, skills, popularity
+
+def full_scan(query_vec, candidate_matrix, top_n):
+    # What /api/match_candidates did before the inverted index
+    similarities = cosine_similarity(query_vec, candidate_matrix).flatten()
+    top_indices = similarities.argsort()[-top_n:][::-1]
+    return top_indices, similarities[top_indices]
+
+def p50_ms(timings):
+    return round(float(np.median(timings)) * 1000, 3)
+
+def main():
+    parser = argparse.ArgumentParser(description="Candidate search latency versus pool size: full scan vs inverted index.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--vocab", type=int, default=2_000, help="Distinct skills in the synthetic pool")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--query-skills", type=int, default=5, help="Skills per search")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        # Same pool and queries on every run so results are comparable
+        rng = np.random.default_rng(42)
+        texts, skills, popularity = make_pool(size, args.vocab, rng)
+        vectorizer = TfidfVectorizer()
+        candidate_matrix = vectorizer.fit_transform(texts)
+        start = time.perf_counter()
+        index = CandidateIndex(candidate_matrix)
+        build_seconds = time.perf_counter() - start
+
+        queries = [
+            vectorizer.transform([" ".join(rng.choice(skills, size=args.query_skills, replace=False, p=popularity))])
+            for _ in range(args.queries)
+        ]
+        scan_times, index_times, scored, mismatches = [], [], [], 0
+        for query_vec in queries:
+            start = time.perf_counter()
+            scan_indices, scan_scores = full_scan(query_vec, candidate_matrix, args.top_n)
+            scan_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            indices, scores, n_scored = index.search_with_stats(query_vec, args.top_n)
+            index_times.append(time.perf_counter() - start)
+            scored.append(n_scored)
+
+            # Same scores in the same order; among equal scores argsort's order is arbitrary
+            if not (np.array_equal(scores, scan_scores) and np.array_equal(scores, index.search_exhaustive(query_vec, args.top_n)[1])
+                    and set(indices[scores > scores[-1]].tolist()) == set(scan_indices[scan_scores > scan_scores[-1]].tolist())):
+                mismatches += 1
+
+        result = {
+            "pool_size": size,
+            "vocab": args.vocab,
+            "top_n": args.top_n,
+            "build_seconds": round(build_seconds, 3),
+            "full_scan_p50_ms": p50_ms(scan_times),
+            "index_p50_ms": p50_ms(index_times),
+            "avg_candidates_scored": int(np.mean(scored)),
+            "mismatches": mismatches,
+        }
+        results.append(result)
+        print(f"{size:>10,} candidates: full scan {result['full_scan_p50_ms']:>8.2f} ms  "
+              f"index {result['index_p50_ms']:>7.2f} ms  scored {result['avg_candidates_scored']:>9,}  "
+              f"build {result['build_seconds']:.2f}s  mismatches {mismatches}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if any(r["mismatches"] for r in results) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import random
+
+import numpy as np
+import pandas as pd
+
+# Ensure we can import the project modules when run from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from benchmark_training_memory import peak_rss_mb, run_in_fresh_process
+
+MODES = ("default", "fast")
+
+# A run is flagged when it is this much worse than the baseline
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.25
+MAE_TOLERANCE = 0.05
+
+def run_fit(data_path, mode, threads, results):
+    from src.models.train import train_salary_model
+
+    df_jobs = pd.read_pickle(data_path)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    model, _, _, _, metrics = train_salary_model(df_jobs, fast=(mode == "fast"), n_jobs=threads)
+    elapsed = time.perf_counter() - start
+    results.put({
+        "fit_seconds": round(elapsed, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_over_data_mb": round(peak_rss_mb() - baseline, 1),
+        "mae": round(float(metrics["mae"]), 4),
+        "r2": round(float(metrics["r2"]), 4),
+        "rounds": int(model.best_iteration) + 1 if mode == "fast" else model.n_estimators,
+    })
+
+def compare(result, baseline):
+    """Returns the regressions of `result` against the matching baseline run."""
+    problems = []
+    if result["fit_seconds"] > baseline["fit_seconds"] * (1 + TIME_TOLERANCE):
+        problems.append(f"fit time {baseline['fit_seconds']}s -> {result['fit_seconds']}s")
+    if result["rss_over_data_mb"] > baseline["rss_over_data_mb"] * (1 + MEMORY_TOLERANCE):
+        problems.append(f"memory {baseline['rss_over_data_mb']} MB -> {result['rss_over_data_mb']} MB")
+    if result["mae"] > baseline["mae"] * (1 + MAE_TOLERANCE):
+        problems.append(f"MAE {baseline['mae']} -> {result['mae']}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark salary model fit time, memory and accuracy.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 50_000, 200_000])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--threads", type=int, default=-1, help="XGBoost thread budget (-1 = all cores)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier --output file; exit 1 if any run regressed against it")
+    args = parser.parse_args()
+
+    from src.utils.generate_data import generate_jobs
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            data_path = os.path.join(tmp, f"jobs_{size}.pkl")
+            # Same data on every run so results are comparable with a baseline
+            random.seed(42)
+            np.random.seed(42)
+            generate_jobs(size).to_pickle(data_path)
+            for mode in args.modes:
+                exitcode, run = run_in_fresh_process(run_fit, data_path, mode, args.threads)
+                if exitcode != 0:
+                    print(f"{size:>9,} {mode:>8}: failed with exit code {exitcode}")
+                    continue
+                result = {"rows": size, "mode": mode, "threads": args.threads, **run}
+                results.append(result)
+                print(f"{size:>9,} {mode:>8}: {result['fit_seconds']:>7.2f}s  peak {result['peak_rss_mb']:>7,.0f} MB  "
+                      f"MAE {result['mae']:.3f}  R2 {result['r2']:.3f}  rounds {result['rounds']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = {(r["rows"], r["mode"]): r for r in json.load(f)}
+        regressed = False
+        for result in results:
+            previous = baseline.get((result["rows"], result["mode"]))
+            problems = compare(result, previous) if previous else []
+            if problems:
+                regressed = True
+                print(f"REGRESSION {result['rows']:,} {result['mode']}: " + "; ".join(problems))
+        sys.exit(1 if regressed else 0)
+
+if __name__ == "__main__":
+    main()
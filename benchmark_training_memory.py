@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing as mp
+
+import pandas as pd
+
+# Ensure we can import the project modules when run from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_in_fresh_process(target, *args):
+    """
+    Runs `target(*args, queue)` in a spawned process, so peak RSS and warm
+    caches are not shared between runs. Returns (exit code, what the target
+    put on the queue, or None if it failed).
+    """
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=target, args=(*args, queue))
+    proc.start()
+    proc.join()
+    return proc.exitcode, queue.get() if proc.exitcode == 0 else None
+
+def train_dense(df_jobs, n_estimators):
+    """The previous pipeline: dense skills DataFrame concatenated into a dense training frame."""
+    import numpy as np
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import MultiLabelBinarizer, TargetEncoder
+    from xgboost import XGBRegressor
+    from src.models.train import prepare_jobs
+
+    prepare_jobs(df_jobs)
+    encoder = TargetEncoder(target_type='continuous', random_state=42)
+    encoder.set_output(transform="pandas")
+    X_pre = df_jobs[['role', 'Normalized_Location', 'experience_years']]
+    y = df_jobs['log_salary']
+    mlb = MultiLabelBinarizer()
+    skills_encoded = mlb.fit_transform(df_jobs['Skills_List'])
+    skills_columns = [f"Skill_{s}" for s in mlb.classes_]
+    skills_df = pd.DataFrame(skills_encoded, columns=skills_columns)
+    X = pd.concat([X_pre, skills_df], axis=1)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    encoder.fit(X_train[['role', 'Normalized_Location']], y_train)
+    X_train_final = pd.concat([encoder.transform(X_train[['role', 'Normalized_Location']]).reset_index(drop=True),
+                               X_train[['experience_years']].reset_index(drop=True),
+                               X_train[skills_columns].reset_index(drop=True)], axis=1)
+    model = XGBRegressor(n_estimators=n_estimators, learning_rate=0.05, max_depth=5, random_state=42, n_jobs=-1)
+    model.fit(X_train_final, y_train)
+    return model
+
+def train_sparse(df_jobs, n_estimators):
+    from src.models.train import train_salary_model
+    return train_salary_model(df_jobs, n_estimators=n_estimators)[0]
+
+def run_variant(name, data_path, n_estimators, results):
+    df_jobs = pd.read_pickle(data_path)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    (train_dense if name == "dense" else train_sparse)(df_jobs, n_estimators)
+    results.put((name, baseline, peak_rss_mb(), time.perf_counter() - start))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare peak RSS of dense vs sparse salary-model training.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--estimators", type=int, default=20)
+    args = parser.parse_args()
+
+    from src.utils.generate_data import generate_jobs
+    print(f"Generating {args.rows:,} synthetic job postings...")
+    df_jobs = generate_jobs(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "jobs.pkl")
+        df_jobs.to_pickle(data_path)
+        del df_jobs
+
+        for name in ("dense", "sparse"):
+            exitcode, result = run_in_fresh_process(run_variant, name, data_path, args.estimators)
+            if exitcode != 0:
+                print(f"{name}: failed with exit code {exitcode}")
+                continue
+            name, baseline, peak, elapsed = result
+            print(f"{name:>6}: peak RSS {peak:,.0f} MB (+{peak - baseline:,.0f} MB over loaded data), {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
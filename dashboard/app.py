@@ -4,8 +4,13 @@ import plotly.express as px
 import numpy as np
 import joblib
 import os
+import sys
 from sklearn.metrics.pairwise import cosine_similarity
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.columnar import load_dataset
+from src.utils.skill_cooccurrence import load_cooccurrence
+
 # --- Configuration ---
 st.set_page_config(page_title="AI Job Market Intelligence", layout="wide")
 
@@ -30,12 +35,14 @@ def load_ml_assets():
         skill_freq = joblib.load("src/models/skill_recommendation_data.pkl")
         vectorizer = joblib.load("src/models/candidate_vectorizer.pkl")
         candidate_matrix = joblib.load("src/models/candidate_matrix.pkl")
-        df_candidates = pd.read_csv("data/candidates.csv")
+        df_candidates = load_dataset("data/candidates.csv", categorical=False)
+        skill_cooccurrence = load_cooccurrence("src/models/skill_cooccurrence.npz")
         return {
             "model": model, "le_role": le_role, "le_loc": le_loc,
             "mlb": mlb, "feature_columns": feature_columns,
             "skill_freq": skill_freq, "vectorizer": vectorizer,
-            "candidate_matrix": candidate_matrix, "df_candidates": df_candidates
+            "candidate_matrix": candidate_matrix, "df_candidates": df_candidates,
+            "skill_cooccurrence": skill_cooccurrence
         }
     except Exception as e:
         st.error(f"Error loading models: {e}")
@@ -44,7 +51,7 @@ def load_ml_assets():
 @get_data_cache()
 def load_data():
     if os.path.exists("data/job_market_analytics_dataset.csv"):
-        return pd.read_csv("data/job_market_analytics_dataset.csv")
+        return load_dataset("data/job_market_analytics_dataset.csv", categorical=False)
     return pd.DataFrame()
 
 assets = load_ml_assets()
@@ -156,6 +163,14 @@ elif menu == "Skill Roadmap":
         st.markdown(f"**Top Missing Skills for {target_role}:**")
         for skill in recommendations['Skills_List'].head(5):
             st.info(f"💡 Recommendation: {skill}")
+
+        # "Learn next": skills most often listed alongside the ones already known
+        if assets['skill_cooccurrence'] is not None and current_skills:
+            related = assets['skill_cooccurrence'].related(current_skills, target_role, k=5)
+            if related:
+                st.markdown(f"**Learn Next (most associated with your skills in {target_role} postings):**")
+                for item in related:
+                    st.success(f"🔗 {item['skill']} — listed together in {item['score']} postings")
         
         # Skill Gap Visualization
         market_top = job_skills.sort_values(by='count', ascending=False).head(10)
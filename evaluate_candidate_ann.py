@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import joblib
+import numpy as np
+
+# Ensure we can import the project modules when run from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from src.utils.candidate_index import CandidateIndex
+from src.utils.candidate_ivf import CandidateIVF, load_candidate_ivf
+
+MODELS_DIR = "src/models"
+
+def recall_at_k(approx_scores, exact_scores, k):
+    """
+    Share of the exact top-k recovered. Any result scoring at least the exact
+    k-th score counts, so ties at the cut-off are not held against the index.
+    """
+    if len(exact_scores) == 0:
+        return 1.0
+    return min(int((approx_scores >= exact_scores[-1]).sum()), len(exact_scores)) / len(exact_scores)
+
+def sample_queries(vectorizer, candidate_matrix, n_queries, max_skills, rng):
+    # Query skills drawn by document frequency, like the skills recruiters actually search for
+    terms = vectorizer.get_feature_names_out()
+    df = np.bincount(candidate_matrix.indices, minlength=len(terms)).astype(np.float64)
+    p = df / df.sum()
+    queries = []
+    for _ in range(n_queries):
+        n = int(rng.integers(1, min(max_skills, np.count_nonzero(p)) + 1))
+        queries.append(vectorizer.transform([" ".join(rng.choice(terms, size=n, replace=False, p=p))]))
+    return queries
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k and latency of mode=approx (IVF) against exact candidate matching.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-skills", type=int, default=5, help="Queries use 1..max-skills skills")
+    parser.add_argument("--lists", type=int, help="Build a fresh IVF with this many lists instead of loading candidate_ivf.npz")
+    parser.add_argument("--synthetic", type=int, help="Evaluate on a synthetic pool of this many candidates")
+    parser.add_argument("--vocab", type=int, default=2_000, help="Distinct skills in the synthetic pool")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    if args.synthetic:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from benchmark_candidate_search import make_pool
+        texts, _, _ = make_pool(args.synthetic, args.vocab, rng)
+        vectorizer = TfidfVectorizer()
+        candidate_matrix = vectorizer.fit_transform(texts)
+        ivf = None
+    else:
+        vectorizer = joblib.load(os.path.join(MODELS_DIR, "candidate_vectorizer.pkl"))
+        candidate_matrix = joblib.load(os.path.join(MODELS_DIR, "candidate_matrix.pkl"))
+        ivf = None if args.lists else load_candidate_ivf(
+            os.path.join(MODELS_DIR, "candidate_ivf.npz"), os.path.join(MODELS_DIR, "candidate_matrix.pkl")
+        )
+    if ivf is None:
+        start = time.perf_counter()
+        ivf = CandidateIVF.build(candidate_matrix, n_lists=args.lists)
+        print(f"Built IVF with {ivf.n_lists} lists in {time.perf_counter() - start:.2f}s")
+
+    index = CandidateIndex(candidate_matrix)
+    queries = sample_queries(vectorizer, candidate_matrix, args.queries, args.max_skills, rng)
+
+    exact, exact_times = [], []
+    for query_vec in queries:
+        start = time.perf_counter()
+        exact.append(index.search(query_vec, args.k)[1])
+        exact_times.append(time.perf_counter() - start)
+    exact_p50 = round(float(np.median(exact_times)) * 1000, 3)
+    print(f"{index.n_candidates:,} candidates, {ivf.n_lists} lists, k={args.k}: exact p50 {exact_p50:.2f} ms")
+
+    results = []
+    for nprobe in args.nprobe:
+        recalls, times, scored = [], [], []
+        for query_vec, exact_scores in zip(queries, exact):
+            start = time.perf_counter()
+            _, scores, n_scored = ivf.search(index, query_vec, args.k, nprobe)
+            times.append(time.perf_counter() - start)
+            recalls.append(recall_at_k(scores, exact_scores, args.k))
+            scored.append(n_scored)
+        result = {
+            "nprobe": nprobe,
+            "recall_at_k": round(float(np.mean(recalls)), 4),
+            "approx_p50_ms": round(float(np.median(times)) * 1000, 3),
+            "exact_p50_ms": exact_p50,
+            "avg_candidates_scored": int(np.mean(scored)),
+        }
+        results.append(result)
+        print(f"  nprobe {nprobe:>4}: recall@{args.k} {result['recall_at_k']:.3f}  "
+              f"p50 {result['approx_p50_ms']:>7.2f} ms  scored {result['avg_candidates_scored']:>9,}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"k": args.k, "candidates": index.n_candidates, "lists": ivf.n_lists, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
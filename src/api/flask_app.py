@@ -3,11 +3,33 @@ import pandas as pd
 import numpy as np
 import joblib
 import tempfile
-from flask import Flask, request, jsonify
+import hashlib
+import shutil
+import json
+import time
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from sklearn.metrics.pairwise import cosine_similarity
 import logging
-import xgboost
+
+from src.utils.market_analytics import (
+    CHUNK_ROWS, MarketAggregator, MarketIndex, resolve_mapping, normalize_location,
+)
+from src.utils.market_cache import MarketDataCache
+from src.utils.salary_features import parse_profile, uses_sparse_features, FeatureAssembler
+from src.utils.micro_batcher import MicroBatcher
+from src.utils.compiled_trees import file_sha256, load_compiled_model
+from src.utils.skill_index import RoleSkillIndex, SkillGapIndex, TOP_ROLE_SKILLS
+from src.utils.skill_cooccurrence import load_cooccurrence, TOP_RELATED_SKILLS
+from src.utils.candidate_index import CandidateIndex
+from src.utils.candidate_ivf import load_candidate_ivf, DEFAULT_NPROBE
+from src.utils.candidate_partitions import PARTITION_COLUMN
+from src.utils.candidate_pool import CandidatePool
+from src.utils.candidate_records import render_records
+from src.utils.prediction_cache import PredictionCache, canonical_key
+from src.utils.columnar import (
+    ColumnarWriter, columnar_path, dataset_columns, iter_dataset_chunks,
+    load_dataset, publish, source_signature,
+)
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO)
@@ -49,18 +71,78 @@ def get_writable_data_path():
 DATA_PATH = get_writable_data_path()
 logger.info(f"Using DATA_PATH: {DATA_PATH}")
 
+# Opt-in micro-batching of concurrent /api/predict_salary calls into one model call
+SALARY_MICROBATCH = os.environ.get("SALARY_MICROBATCH", "0").lower() in ("1", "true", "yes")
+SALARY_BATCH_WINDOW_MS = float(os.environ.get("SALARY_BATCH_WINDOW_MS", 2.0))
+SALARY_BATCH_MAX_ROWS = int(os.environ.get("SALARY_BATCH_MAX_ROWS", 256))
+
+# LRU cache of /api/predict_salary results (0 disables); cleared whenever assets are reloaded
+SALARY_CACHE_SIZE = int(os.environ.get("SALARY_CACHE_SIZE", 10_000))
+prediction_cache = PredictionCache(SALARY_CACHE_SIZE)
+
+# Upper bound on profiles accepted by /api/predict_salary_batch in one request
+MAX_BATCH_PROFILES = int(os.environ.get("MAX_BATCH_PROFILES", 100_000))
+
+# Upper bound on (employee, role) pairs accepted by /api/skill_gap_batch in one request
+MAX_SKILL_GAP_PAIRS = int(os.environ.get("MAX_SKILL_GAP_PAIRS", 100_000))
+
+# Upper bound on jobs accepted by /api/match_candidates_batch in one request
+MAX_MATCH_JOBS = int(os.environ.get("MAX_MATCH_JOBS", 10_000))
+
+# Upper bound on candidates accepted by one POST /api/candidates
+MAX_CANDIDATE_UPDATES = int(os.environ.get("MAX_CANDIDATE_UPDATES", 100_000))
+
+# IVF lists probed by /api/match_candidates in mode=approx unless the request sets nprobe
+CANDIDATE_IVF_NPROBE = int(os.environ.get("CANDIDATE_IVF_NPROBE", DEFAULT_NPROBE))
+
+# Uploads are copied to disk in blocks of this size
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+# Computed /api/market_data payloads, persisted next to the dataset
+market_cache = MarketDataCache(os.path.join(DATA_PATH, "market_cache"))
+
+# "compiled" serves the NumPy export of the trees when it is present and current;
+# "xgboost" always unpickles the original model (faster for very large batches)
+SALARY_MODEL_BACKEND = os.environ.get("SALARY_MODEL_BACKEND", "compiled").lower()
+
+def load_salary_model():
+    model_path = os.path.join(ASSETS_PATH, "salary_model.pkl")
+    if SALARY_MODEL_BACKEND == "compiled":
+        compiled = load_compiled_model(os.path.join(ASSETS_PATH, "salary_model_compiled.npz"), model_path)
+        if compiled is not None:
+            logger.info("Serving the compiled salary model (xgboost not loaded).")
+            return compiled
+    # Unpickling imports xgboost on demand
+    return joblib.load(model_path)
+
 def load_assets():
     try:
         # Load compressed models
         assets = {
-            "model": joblib.load(os.path.join(ASSETS_PATH, "salary_model.pkl")),
+            "model": load_salary_model(),
             "encoder": joblib.load(os.path.join(ASSETS_PATH, "target_encoder.pkl")),
             "mlb": joblib.load(os.path.join(ASSETS_PATH, "mlb_skills.pkl")),
             "feature_columns": joblib.load(os.path.join(ASSETS_PATH, "feature_columns.pkl")),
             "skill_freq": joblib.load(os.path.join(ASSETS_PATH, "skill_recommendation_data.pkl")),
             "vectorizer": joblib.load(os.path.join(ASSETS_PATH, "candidate_vectorizer.pkl")),
             "candidate_matrix": joblib.load(os.path.join(ASSETS_PATH, "candidate_matrix.pkl")),
+            # Cache generation the predictions of this model are stored under
+            "generation": prediction_cache.generation,
         }
+        assets["assembler"] = FeatureAssembler(
+            assets["encoder"], assets["mlb"], assets["feature_columns"],
+            zero_as_missing=uses_sparse_features(assets["model"]),
+        )
+        # Pre-sorted per-role skill lists for the skills endpoints
+        assets["role_skills"] = RoleSkillIndex(assets["skill_freq"])
+        assets["skill_gaps"] = SkillGapIndex(assets["role_skills"], TOP_ROLE_SKILLS)
+        # Optional: built by the skill_recommendations training stage
+        assets["skill_cooccurrence"] = load_cooccurrence(os.path.join(ASSETS_PATH, "skill_cooccurrence.npz"))
+        if assets["skill_cooccurrence"] is None:
+            logger.info("No skill co-occurrence artifact; related-skill suggestions are disabled until "
+                        "`python src/models/train.py --stages skill_recommendations` builds it.")
+        if SALARY_MICROBATCH:
+            assets["batcher"] = MicroBatcher(assets["model"].predict, max_batch=SALARY_BATCH_MAX_ROWS, window_ms=SALARY_BATCH_WINDOW_MS)
         
         # Load candidates.csv from the ORIGINAL data path (read-only is fine for initial load)
         # If a user uploads a new one, it will be saved to and read from DATA_PATH
@@ -69,11 +151,30 @@ def load_assets():
              # Fallback to original read-only source if not yet in writable path
              candidates_path = os.path.join(ORIGINAL_DATA_PATH, "candidates.csv")
              
+        # Only needed to build the candidate pool, which keeps pre-rendered records instead
         if os.path.exists(candidates_path):
-            assets["df_candidates"] = pd.read_csv(candidates_path)
+            df_candidates = load_dataset(candidates_path)
         else:
              logger.warning("candidates.csv not found in data or temp path.")
-             assets["df_candidates"] = pd.DataFrame() # Empty fallback
+             df_candidates = pd.DataFrame() # Empty fallback
+
+        # Live candidate set: inverted index, per-experience-level partitions and optional IVF lists
+        # (None, i.e. exact search only, if missing or built from another matrix) over the trained
+        # matrix, plus candidates added or deleted through /api/candidates since (replayed from the journal)
+        try:
+            assets["candidate_pool"] = CandidatePool(
+                assets["vectorizer"], df_candidates, assets["candidate_matrix"],
+                index=CandidateIndex(assets["candidate_matrix"]),
+                ivf=load_candidate_ivf(
+                    os.path.join(ASSETS_PATH, "candidate_ivf.npz"), os.path.join(ASSETS_PATH, "candidate_matrix.pkl")
+                ),
+                journal_path=os.path.join(DATA_PATH, "candidate_updates.ndjson"),
+                # Journaled updates are dropped once the candidates are retrained
+                base_version=file_sha256(os.path.join(ASSETS_PATH, "candidate_matrix.pkl")),
+            )
+        except ValueError as e:
+            logger.warning(f"Candidate matching disabled: {e}")
+            assets["candidate_pool"] = None
 
         logger.info("ML Assets loaded successfully.")
         return assets
@@ -92,21 +193,20 @@ except Exception as e:
     print(f"CRITICAL ERROR loading assets: {e}", flush=True)
     assets = None
 
-# --- Helper Functions ---
-def normalize_location(loc):
-    if not isinstance(loc, str): return "Remote"
-    loc = loc.lower()
-    if "remote" in loc: return "Remote"
-    if "bengaluru" in loc or "bangalore" in loc: return "Bangalore, India"
-    if "san francisco" in loc or "sf" in loc: return "San Francisco, CA"
-    if "new york" in loc or "ny" in loc: return "New York, NY"
-    if "austin" in loc: return "Austin, TX"
-    if "london" in loc: return "London, UK"
-    if "berlin" in loc: return "Berlin, Germany"
-    if "singapore" in loc: return "Singapore"
-    if "sydney" in loc: return "Sydney, Australia"
-    if "toronto" in loc: return "Toronto, Canada"
-    return loc.title()
+def reload_assets():
+    """Reloads model assets from disk, keeping the current ones if loading fails."""
+    global assets
+    new_assets = load_assets()
+    if new_assets is None:
+        return False
+    old_batcher = assets.get("batcher") if assets else None
+    # Cached predictions came from the previous model; requests still running on it
+    # finish under the old generation, so their results are not re-added
+    new_assets["generation"] = prediction_cache.clear()
+    assets = new_assets
+    if old_batcher:
+        old_batcher.close()
+    return True
 
 # --- Endpoints ---
 
@@ -128,157 +228,182 @@ def debug_info():
         "files_in_data": os.listdir(DATA_PATH) if os.path.exists(DATA_PATH) else "Path does not exist"
     })
 
+def get_dataset_path():
+    """Returns the active analytics dataset: the uploaded copy if present, else the bundled one."""
+    # Check writable path first (uploaded file), then fallback to original
+    csv_path = os.path.join(DATA_PATH, "job_market_analytics_dataset.csv")
+    if not os.path.exists(csv_path):
+         csv_path = os.path.join(ORIGINAL_DATA_PATH, "job_market_analytics_dataset.csv")
+    return csv_path
+
+def store_market_aggregates(cache_key, aggregator):
+    """Caches the payload and the salary cube produced by one aggregation pass."""
+    payload = market_cache.put(cache_key, aggregator.payload())
+    if aggregator.cube is not None:
+        market_cache.put_artifact(cache_key, "cube", aggregator.cube)
+    return payload
+
+def build_market_aggregates(csv_path, mapping, cache_key):
+    aggregator = MarketAggregator(mapping)
+    for chunk in iter_dataset_chunks(csv_path, CHUNK_ROWS):
+        aggregator.update(chunk)
+    return store_market_aggregates(cache_key, aggregator)
+
+def parse_market_filters(body, args):
+    """
+    Collects drill-down filters from the JSON body or the query string:
+    roles, skills (+ skills_match "all"/"any"), experience_min, experience_max.
+    """
+    def get_list(key, single_key):
+        values = body.get(key) if key in body else args.getlist(key)
+        if not values:
+            single = body.get(single_key)
+            if single is not None and not isinstance(single, str):
+                raise ValueError(f"{single_key} must be a string")
+            # ?skill=Python&skill=SQL repeats the singular key
+            values = [single] if single else args.getlist(single_key)
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            raise ValueError(f"{key} must be a list of strings")
+        return [v for v in values if v]
+
+    def get_int(key):
+        value = body.get(key, args.get(key))
+        return None if value in (None, "") else int(value)
+
+    filters = {}
+    roles = get_list("roles", "role")
+    if roles:
+        filters["roles"] = roles
+    skills = get_list("skills", "skill")
+    if skills:
+        filters["skills"] = skills
+        skills_match = body.get("skills_match", args.get("skills_match", "all"))
+        if skills_match not in ("all", "any"):
+            raise ValueError("skills_match must be 'all' or 'any'")
+        filters["skills_match"] = skills_match
+    for key in ("experience_min", "experience_max"):
+        value = get_int(key)
+        if value is not None:
+            filters[key] = value
+    return filters
+
 @app.route("/api/market_data", methods=["GET", "POST"])
 def get_market_data():
     try:
-        # Check writable path first (uploaded file), then fallback to original
-        csv_path = os.path.join(DATA_PATH, "job_market_analytics_dataset.csv")
-        if not os.path.exists(csv_path):
-             csv_path = os.path.join(ORIGINAL_DATA_PATH, "job_market_analytics_dataset.csv")
-
+        csv_path = get_dataset_path()
         if not os.path.exists(csv_path):
             return jsonify({"error": "Dataset not found"}), 404
-        
-        df = pd.read_csv(csv_path)
-        
-        # User can provide custom mapping via POST
+
+        # User can provide custom mapping (and drill-down filters) via POST
         custom_mapping = {}
+        req_data = {}
         if request.method == "POST" and request.is_json:
-            req_data = request.json
-            if req_data and "mapping" in req_data:
+            # A body that is not an object carries no mapping or filters and is ignored
+            req_data = request.json if isinstance(request.json, dict) else {}
+            if "mapping" in req_data:
                 custom_mapping = req_data["mapping"] or {}
+                if not isinstance(custom_mapping, dict):
+                    return jsonify({"error": "mapping must be an object"}), 400
+        try:
+            filter_body = req_data.get("filters") or {}
+            if not isinstance(filter_body, dict):
+                raise ValueError("expected an object")
+            filters = parse_market_filters(filter_body, request.args)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid filters: {e}"}), 400
 
-        # Robust column detection (fuzzy matching)
-        cols_orig = list(df.columns)
-        def find_best_col(keywords):
-            # 1. Exact or close match (ignoring case/spaces/underscores)
-            for col in cols_orig:
-                clean_col = col.lower().replace('_', '').replace(' ', '')
-                for k in keywords:
-                    clean_k = k.lower().replace('_', '').replace(' ', '')
-                    if clean_col == clean_k:
-                        return col
-            # 2. Substring match
-            for col in cols_orig:
-                clean_col = col.lower().replace('_', '').replace(' ', '')
-                for k in keywords:
-                    clean_k = k.lower().replace('_', '').replace(' ', '')
-                    if clean_k in clean_col or clean_col in clean_k:
-                        return col
-            return None
-
-        role_col = custom_mapping.get('role') or find_best_col(['role', 'job role', 'title', 'job title', 'position', 'job name'])
-        salary_col = custom_mapping.get('salary') or find_best_col(['salary', 'salary_lpa', 'compensation', 'package', 'pay', 'ctc'])
-        skills_col = custom_mapping.get('skills') or find_best_col(['skills', 'skillset', 'technologies', 'requirements', 'stacks'])
-        exp_col = custom_mapping.get('experience') or find_best_col(['experience', 'exp', 'years of experience', 'years', 'tenure'])
+        # Only the header is needed to resolve the mapping
+        columns = dataset_columns(csv_path)
+        mapping = resolve_mapping(columns, custom_mapping)
 
         # Essential columns (Role is the only strictly required one now, Skills highly recommended)
-        if not role_col:
+        if not mapping['role']:
              return jsonify({
                 "error": "mapping_required",
-                "columns": list(df.columns),
-                "detected": {
-                    "role": role_col,
-                    "salary": salary_col,
-                    "skills": skills_col,
-                    "experience": exp_col
-                }
+                "columns": columns,
+                "detected": mapping
             }), 200
 
-        # Helper for Role Normalization
-        STANDARD_ROLES = [
-            "Data Scientist", "ML Engineer", "Software Engineer", "Data Analyst",
-            "Backend Developer", "Frontend Developer", "Full Stack Developer",
-            "DevOps Engineer", "Cloud Architect", "AI Researcher", "Data Engineer",
-            "Product Manager (Tech)", "UX Designer", "Cybersecurity Analyst",
-            "Blockchain Developer", "Mobile App Developer", "Embedded Systems Engineer",
-            "QA Automation Engineer", "NOC Engineer", "Solutions Architect",
-            "Technical Support Engineer", "Database Administrator", "Systems Analyst",
-            "Game Developer", "AR/VR Developer", "Big Data Engineer", "Scrum Master",
-            "Site Reliability Engineer", "Computer Vision Engineer", "NLP Scientist"
-        ]
-
-        def normalize_role(role):
-            if not isinstance(role, str): return "Other"
-            role_lower = role.lower()
-            # Simple fuzzy match
-            best_match = "Other"
-            max_score = 0
-            
-            for std in STANDARD_ROLES:
-                # Token overlap score
-                std_tokens = set(std.lower().split())
-                role_tokens = set(role_lower.split())
-                overlap = len(std_tokens.intersection(role_tokens))
-                if overlap > max_score:
-                    max_score = overlap
-                    best_match = std
-            
-            return best_match if max_score > 0 else role.title()
-
-        # Data Cleaning & Normalization
-        if role_col:
-            df['Normalized_Role'] = df[role_col].apply(normalize_role)
-            unique_roles = sorted(list(set(STANDARD_ROLES) & set(df['Normalized_Role'].unique()))) + sorted(list(set(df['Normalized_Role'].unique()) - set(STANDARD_ROLES)))
-        else:
-            unique_roles = []
+        # Serve from the content-addressed cache; recompute only when the data or mapping changed
+        cache_key = market_cache.make_key(market_cache.dataset_fingerprint(csv_path), mapping)
+
+        if filters:
+            # Drill-downs are answered from the row index built once per dataset version
+            index = market_cache.get_index(cache_key)
+            if index is None:
+                index = market_cache.put_index(cache_key, MarketIndex.build(iter_dataset_chunks(csv_path, CHUNK_ROWS), mapping))
+            try:
+                rows = index.query(**filters)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify({**index.payload(rows), "mapping": mapping, "applied_filters": filters})
+
+        payload = market_cache.get(cache_key)
+        if payload is None:
+            payload = build_market_aggregates(csv_path, mapping, cache_key)
+
+        return jsonify({**payload, "mapping": mapping})
+    except Exception as e:
+        logger.error(f"Market Data Error: {e}")
+        return jsonify({"error": str(e)}), 500
 
-        if salary_col:
-            df[salary_col] = pd.to_numeric(df[salary_col], errors='coerce').fillna(0)
-        
-        if exp_col:
-            # Extract just the number from "5 years", "5+", etc.
-            df[exp_col] = df[exp_col].astype(str).str.extract(r'(\d+)').astype(float).fillna(0).astype(int)
-            unique_exp = sorted(df[exp_col].unique().tolist())
-        else:
-            unique_exp = []
-        
-        # Skill Demand
-        if skills_col:
-            df[skills_col] = df[skills_col].astype(str)
-            all_skills = df[skills_col].apply(lambda x: [s.strip() for s in str(x).replace('|', ',').replace(';', ',').split(',')]).explode()
-            skill_counts = all_skills.value_counts().head(10).reset_index()
-            skill_counts.columns = ['skill', 'count']
-            
-            unique_skills = sorted(all_skills.dropna().unique().tolist())
-        else:
-            skill_counts = pd.DataFrame(columns=['skill', 'count'])
-            unique_skills = []
-        
-        # Salary by Role (only if salary exists)
-        job_salary = []
-        exp_salary = []
-
-        if salary_col:
-            # Use Normalized Role for aggregation
-            job_salary = df.groupby('Normalized_Role')[salary_col].mean().reset_index()
-            job_salary.columns = ['title', 'salary']
-            job_salary = job_salary.to_dict(orient="records")
-            
-            if exp_col:
-                exp_salary = df.groupby(exp_col)[salary_col].mean().reset_index()
-                exp_salary.columns = ['level', 'salary']
-                exp_salary = exp_salary.to_dict(orient="records")
+@app.route("/api/salary_breakdown", methods=["GET", "POST"])
+def salary_breakdown():
+    """
+    Salary roll-ups from the pre-aggregated role x experience x location cube.
+    Accepts group_by (any of role/experience/location), filters and percentiles.
+    """
+    try:
+        csv_path = get_dataset_path()
+        if not os.path.exists(csv_path):
+            return jsonify({"error": "Dataset not found"}), 404
 
-        return jsonify({
-            "skill_demand": skill_counts.to_dict(orient="records"),
-            "job_salary": job_salary,
-            "exp_salary": exp_salary,
-            "total_records": len(df),
-            "filters": {
-                "roles": unique_roles,
-                "skills": unique_skills,
-                "experience": unique_exp
-            },
-            "mapping": {
-                "role": role_col,
-                "salary": salary_col,
-                "skills": skills_col,
-                "experience": exp_col
-            }
-        })
+        req_data = (request.json or {}) if request.method == "POST" and request.is_json else {}
+        if not isinstance(req_data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        group_by = req_data.get("group_by", request.args.getlist("group_by"))
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        if not isinstance(group_by, list) or not all(isinstance(dim, str) for dim in group_by):
+            return jsonify({"error": "group_by must be a list of dimension names"}), 400
+        percentiles = req_data.get("percentiles") or request.args.getlist("percentiles")
+        if isinstance(percentiles, (str, int, float)):
+            percentiles = [percentiles]
+        try:
+            percentiles = [float(p) for p in percentiles] or [25, 50, 90]
+        except (TypeError, ValueError):
+            return jsonify({"error": "percentiles must be a list of numbers"}), 400
+        filters = req_data.get("filters") or {
+            dim: request.args.getlist(dim) for dim in ("role", "experience", "location") if request.args.getlist(dim)
+        }
+        if not isinstance(filters, dict) or not all(
+            isinstance(wanted, str) or (isinstance(wanted, list) and all(isinstance(v, str) for v in wanted))
+            for wanted in filters.values()
+        ):
+            return jsonify({"error": "filters must map dimensions to a string or a list of strings"}), 400
+
+        custom_mapping = req_data.get("mapping") or {}
+        if not isinstance(custom_mapping, dict):
+            return jsonify({"error": "mapping must be an object"}), 400
+        mapping = resolve_mapping(dataset_columns(csv_path), custom_mapping)
+        if not mapping['role'] or not mapping['salary']:
+            return jsonify({"error": "Salary breakdown requires role and salary columns", "mapping": mapping}), 400
+
+        cache_key = market_cache.make_key(market_cache.dataset_fingerprint(csv_path), mapping)
+        cube = market_cache.get_artifact(cache_key, "cube")
+        if cube is None:
+            build_market_aggregates(csv_path, mapping, cache_key)
+            cube = market_cache.get_artifact(cache_key, "cube")
+
+        try:
+            groups = cube.rollup(group_by=group_by, filters=filters, percentiles=percentiles)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"group_by": group_by, "groups": groups, "mapping": mapping})
     except Exception as e:
-        logger.error(f"Market Data Error: {e}")
+        logger.error(f"Salary Breakdown Error: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route("/api/upload_csv", methods=["POST"])
@@ -289,68 +414,149 @@ def upload_csv():
     if file.filename == '':
         return jsonify({"error": "No selected file"}), 400
     if file and file.filename.lower().endswith('.csv'):
+        # Spool the upload to disk in blocks (hashing as we go), then parse it in chunks
+        # so a multi-GB export never has to sit in worker memory
+        fd, spool_path = tempfile.mkstemp(dir=DATA_PATH, suffix=".upload")
+        cols_tmp = tempfile.mkdtemp(dir=DATA_PATH, suffix=".cols.tmp")
         try:
-            df = pd.read_csv(file)
+            sha = hashlib.sha256()
+            with os.fdopen(fd, "wb") as spool:
+                for block in iter(lambda: file.stream.read(UPLOAD_BLOCK_SIZE), b""):
+                    sha.update(block)
+                    spool.write(block)
+
+            # Validate and pre-aggregate with the auto-detected mapping in the same pass
+            columns = list(pd.read_csv(spool_path, nrows=0).columns)
+            mapping = resolve_mapping(columns)
+            aggregator = MarketAggregator(mapping)
+            # Columnar copy is written in the same pass so later reads can memory-map it
+            writer = ColumnarWriter(cols_tmp)
+            for chunk in pd.read_csv(spool_path, chunksize=CHUNK_ROWS):
+                aggregator.update(chunk)
+                if writer:
+                    try:
+                        writer.append(chunk)
+                    except ValueError as e:
+                        logger.warning(f"Skipping columnar copy of upload: {e}")
+                        writer = None
+            if writer:
+                writer.close(source_signature(spool_path))
+
             # Save it as the primary dataset for analytics
             # Using the dynamic DATA_PATH which is guaranteed to be writable
-            df.to_csv(os.path.join(DATA_PATH, "job_market_analytics_dataset.csv"), index=False)
-            
+            csv_path = os.path.join(DATA_PATH, "job_market_analytics_dataset.csv")
+            os.replace(spool_path, csv_path)
+            if writer:
+                publish(cols_tmp, columnar_path(csv_path))
+            market_cache.invalidate()
+            market_cache.record_fingerprint(csv_path, sha.hexdigest())
+            if mapping['role']:
+                store_market_aggregates(market_cache.make_key(sha.hexdigest(), mapping), aggregator)
+
             return jsonify({"message": "File uploaded and analyzed successfully"}), 200
         except Exception as e:
             logger.error(f"CSV Upload Failed: {e}")
             return jsonify({"error": f"Failed to process CSV: {e}"}), 500
+        finally:
+            if os.path.exists(spool_path):
+                os.remove(spool_path)
+            shutil.rmtree(cols_tmp, ignore_errors=True)
     return jsonify({"error": "Invalid file type. Please upload a CSV."}), 400
 
 @app.route("/api/predict_salary", methods=["POST"])
 def predict_salary():
-    if not assets: return jsonify({"error": "Model assets not loaded"}), 500
+    # One read of the global: a reload mid-request cannot mix two models' assets
+    current = assets
+    if not current: return jsonify({"error": "Model assets not loaded"}), 500
     data = request.json
     try:
-        role = data.get("role")
-        location = data.get("location")
-        experience = float(data.get("experience_years", 0))
-        skills = data.get("skills", [])
-
-        # Normalize location (Critical for accuracy)
-        norm_location = normalize_location(location)
-
-        # Create input dataframe for TargetEncoder
-        # Notes:
-        # 1. We must use the same columns/names as passed to fit()
-        # 2. TargetEncoder expects a DataFrame, not a single value usually
-        input_cats = pd.DataFrame([[role, norm_location]], columns=['role', 'Normalized_Location'])
-        
-        # Transform using the loaded encoder
-        # This returns a DataFrame with the encoded values
-        cats_encoded = assets['encoder'].transform(input_cats)
-        
-        # Skill encoding
-        s_vec = assets['mlb'].transform([skills])
-        s_df = pd.DataFrame(s_vec, columns=[f"Skill_{s}" for s in assets['mlb'].classes_])
-        
-        # Combine everything
-        # Access encoded values by column name (values are floats now)
-        # Note: reset_index is needed to align indices
-        i_data = pd.concat([cats_encoded.reset_index(drop=True), pd.DataFrame([[experience]], columns=['experience_years'])], axis=1)
-        
-        f_input = pd.concat([i_data, s_df], axis=1)
-        
-        # Align with training features
-        for col in assets['feature_columns']:
-            if col not in f_input.columns: f_input[col] = 0
-        f_input = f_input[assets['feature_columns']]
-        
-        # Predict (Log Scale)
-        prediction_log = assets['model'].predict(f_input)[0]
+        role, norm_location, experience, skills = parse_profile(data)
+
+        # Repeated inputs are answered from the cache
+        cache_key = canonical_key(role, norm_location, experience, skills)
+        cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            return jsonify({"predicted_salary": cached})
+
+        # Precompiled assembler: dict lookups into a preallocated float32 row
+        f_input = current['assembler'].transform_one(role, norm_location, experience, skills)
+
+        # Predict (Log Scale), coalesced with concurrent requests when micro-batching is on
+        if current.get('batcher'):
+            prediction_log = current['batcher'].predict(f_input)
+        else:
+            prediction_log = current['model'].predict(f_input)[0]
         
         # Inverse Log Transform (expm1)
         prediction = np.expm1(prediction_log)
         
-        return jsonify({"predicted_salary": round(float(prediction), 2)})
+        predicted_salary = prediction_cache.put(cache_key, round(float(prediction), 2), current['generation'])
+        return jsonify({"predicted_salary": predicted_salary})
     except Exception as e:
         logger.error(f"Prediction Error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/predict_salary/metrics", methods=["GET"])
+def predict_salary_metrics():
+    """Result-cache counters plus queue depth and batch-size stats for tuning the micro-batching window."""
+    batcher = assets.get('batcher') if assets else None
+    if not batcher:
+        return jsonify({"micro_batching": False, "cache": prediction_cache.stats()})
+    return jsonify({"micro_batching": True, "cache": prediction_cache.stats(), **batcher.metrics()})
+
+@app.route("/api/reload_assets", methods=["POST"])
+def reload_model_assets():
+    """Picks up retrained model files without restarting the worker."""
+    if not reload_assets():
+        return jsonify({"error": "Failed to reload model assets"}), 500
+    return jsonify({"message": "Model assets reloaded", "cache": prediction_cache.stats()})
+
+def read_batch_profiles(key="profiles"):
+    """Reads items from a JSON array, {key: [...]}, or an NDJSON body."""
+    if request.is_json and "ndjson" not in (request.content_type or ""):
+        body = request.get_json()
+        profiles = body.get(key) if isinstance(body, dict) else body
+    else:
+        text = request.get_data(as_text=True)
+        profiles = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if not isinstance(profiles, list):
+        raise ValueError(f"Expected a list of {key}")
+    return profiles
+
+@app.route("/api/predict_salary_batch", methods=["POST"])
+def predict_salary_batch():
+    current = assets
+    if not current: return jsonify({"error": "Model assets not loaded"}), 500
+    try:
+        raw_profiles = read_batch_profiles()
+        if len(raw_profiles) > MAX_BATCH_PROFILES:
+            return jsonify({"error": f"Batch too large (max {MAX_BATCH_PROFILES} profiles)"}), 413
+        profiles = []
+        for i, profile in enumerate(raw_profiles):
+            try:
+                profiles.append(parse_profile(profile))
+            except (TypeError, ValueError) as e:
+                return jsonify({"error": f"Invalid profile at index {i}: {e}"}), 400
+    except ValueError as e:
+        return jsonify({"error": f"Invalid request body: {e}"}), 400
+
+    try:
+        start = time.perf_counter()
+        # One vectorized encoding pass and one model call for the whole batch
+        X = current['assembler'].transform(profiles)
+        predictions = np.expm1(current['model'].predict(X)) if len(profiles) else np.array([])
+        elapsed = time.perf_counter() - start
+
+        return jsonify({
+            "predicted_salaries": [round(float(p), 2) for p in predictions],
+            "count": len(profiles),
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "profiles_per_sec": round(len(profiles) / elapsed, 1) if elapsed > 0 else None
+        })
+    except Exception as e:
+        logger.error(f"Batch Prediction Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/api/recommend_skills", methods=["POST"])
 def recommend_skills():
     if not assets: return jsonify({"error": "Model assets not loaded"}), 500
@@ -359,58 +565,128 @@ def recommend_skills():
         target_role = data.get("target_role")
         current_skills = data.get("current_skills", [])
         
-        sf = assets['skill_freq']
-        job_skills = sf[sf['role'] == target_role]
-        
-        if job_skills.empty:
+        # Top 30 skills constitute the "Required" set for this role
+        required_skills = assets['role_skills'].top_skills(target_role, TOP_ROLE_SKILLS)
+
+        # Skills most often listed alongside the user's current ones for this role
+        cooccurrence = assets.get('skill_cooccurrence')
+        related_skills = cooccurrence.related(current_skills, target_role) if cooccurrence else []
+
+        if not required_skills:
             return jsonify({
                 "match_percentage": 0,
                 "required_skills": [],
                 "missing_skills": [],
-                "matched_skills": []
+                "matched_skills": [],
+                "related_skills": related_skills
             })
 
-        # Top 30 skills constitute the "Required" set for this role
-        top_skills_df = job_skills.sort_values(by='count', ascending=False).head(30)
-        required_skills = top_skills_df['Skills_List'].tolist()
-        required_set = set(required_skills)
-        current_set = set(current_skills)
-        
-        matched_skills = list(required_set.intersection(current_set))
-        missing_skills = list(required_set - current_set)
-        
-        # Calculate Percentage
-        match_percentage = 0
-        if required_skills:
-            match_percentage = int((len(matched_skills) / len(required_skills)) * 100)
+        # Bitmask intersection against the role's required set
+        gap = assets['skill_gaps'].gaps([current_skills], [target_role])[0]
 
         return jsonify({
-            "match_percentage": match_percentage,
+            "match_percentage": gap["match_percentage"],
             "required_skills": required_skills,
-            "missing_skills": missing_skills,
-            "matched_skills": matched_skills
+            "missing_skills": gap["missing_skills"],
+            "matched_skills": gap["matched_skills"],
+            "related_skills": related_skills
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/related_skills", methods=["POST"])
+def related_skills():
+    """
+    "Learn next" suggestions: skills that co-occur most with `current_skills`
+    in job postings, optionally only within `target_role`.
+    """
+    if not assets: return jsonify({"error": "Model assets not loaded"}), 500
+    cooccurrence = assets.get('skill_cooccurrence')
+    if cooccurrence is None:
+        return jsonify({"error": "Skill co-occurrence data not available; run "
+                                 "`python src/models/train.py --stages skill_recommendations`"}), 503
+    data = request.get_json(silent=True) or {}
+    try:
+        current_skills = data.get("current_skills", []) or []
+        if isinstance(current_skills, str):
+            current_skills = [current_skills]
+        target_role = data.get("target_role")
+        top_k = int(data.get("top_k", TOP_RELATED_SKILLS))
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid request: {e}"}), 400
+    try:
+        return jsonify({
+            "target_role": target_role,
+            "related_skills": cooccurrence.related(current_skills, target_role, top_k),
+        })
+    except Exception as e:
+        logger.error(f"Related Skills Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/skill_gap_batch", methods=["POST"])
+def skill_gap_batch():
+    """
+    Skill-gap reports for many (employee skills, target role) pairs at once.
+    Body: {"pairs": [{"skills": [...], "target_role": "...", "id": optional}, ...],
+           "include_skills": true} or a bare list of pairs.
+    """
+    if not assets: return jsonify({"error": "Model assets not loaded"}), 500
+    body = request.get_json(silent=True)
+    pairs = body.get("pairs") if isinstance(body, dict) else body
+    if not isinstance(pairs, list):
+        return jsonify({"error": "Expected a list of pairs"}), 400
+    if len(pairs) > MAX_SKILL_GAP_PAIRS:
+        return jsonify({"error": f"Batch too large (max {MAX_SKILL_GAP_PAIRS} pairs)"}), 413
+    include_skills = bool(body.get("include_skills", True)) if isinstance(body, dict) else True
+
+    skills_lists, roles = [], []
+    for i, pair in enumerate(pairs):
+        if not isinstance(pair, dict):
+            return jsonify({"error": f"Invalid pair at index {i}: expected an object"}), 400
+        skills = pair.get("skills", pair.get("current_skills", [])) or []
+        if isinstance(skills, str):
+            skills = [skills]
+        if not isinstance(skills, list):
+            return jsonify({"error": f"Invalid pair at index {i}: expected a list of skills"}), 400
+        skills_lists.append(skills)
+        roles.append(pair.get("target_role"))
+
+    try:
+        start = time.perf_counter()
+        results = assets['skill_gaps'].gaps(skills_lists, roles, include_skills=include_skills)
+        elapsed = time.perf_counter() - start
+        for pair, result in zip(pairs, results):
+            result["target_role"] = pair.get("target_role")
+            if "id" in pair:
+                result["id"] = pair["id"]
+        return jsonify({"results": results, "count": len(results), "elapsed_ms": round(elapsed * 1000, 3)})
+    except Exception as e:
+        logger.error(f"Skill Gap Error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/api/get_role_skills", methods=["POST"])
 def get_role_skills():
     if not assets: return jsonify({"error": "Model assets not loaded"}), 500
     try:
         target_role = request.json.get("target_role")
-        sf = assets['skill_freq']
-        
-        # Filter for the role and get top 30 most frequent skills
-        role_skills = sf[sf['role'] == target_role].sort_values(by='count', ascending=False).head(30)
-        
-        if role_skills.empty:
+        # Top 30 most frequent skills for the role, pre-sorted at load time
+        role_skills = assets['role_skills'].top_skills(target_role, TOP_ROLE_SKILLS)
+
+        if not role_skills:
             # Fallback if no specific data for role
             return jsonify({"skills": ["Python", "SQL", "Communication", "Leadership", "Project Management"]})
-            
-        return jsonify({"skills": role_skills['Skills_List'].tolist()})
+
+        return jsonify({"skills": role_skills})
     except Exception as e:
          return jsonify({"error": str(e)}), 500
 
+def candidate_records(candidates, indices, similarities):
+    """
+    Matched candidates of a pool snapshot as a JSON array (bytes): their
+    records, rendered at load time, each with its 0-100 score appended.
+    """
+    return render_records(candidates.fragments(indices), similarities)
+
 @app.route("/api/match_candidates", methods=["POST"])
 def match_candidates():
     if not assets: return jsonify({"error": "Model assets not loaded"}), 500
@@ -418,19 +694,136 @@ def match_candidates():
     try:
         skills_required = data.get("skills_required", [])
         top_n = int(data.get("top_n", 10))
+        # "approx" scores only the nprobe IVF lists nearest the query; more probes = higher recall
+        mode = data.get("mode", "exact")
+        if mode not in ("exact", "approx"):
+            return jsonify({"error": "mode must be 'exact' or 'approx'"}), 400
+        nprobe = int(data.get("nprobe", CANDIDATE_IVF_NPROBE))
+        # Categorical filters, e.g. {"Experience Level": ["Mid-level", "Senior-level"]}
+        filters = data.get("filters") or {}
+        if not isinstance(filters, dict):
+            return jsonify({"error": "filters must be an object of column -> value(s)"}), 400
+        filters = dict(filters)
+        if data.get("experience_level"):
+            filters[PARTITION_COLUMN] = data["experience_level"]
         
+        if assets.get('candidate_pool') is None:
+            return jsonify({"error": "Candidate matching is unavailable (candidate metadata not loaded)"}), 503
+        # One consistent view for the whole request, even while candidates are added or compacted
+        candidates = assets['candidate_pool'].latest()
+
         query_text = " ".join(skills_required)
         query_vec = assets['vectorizer'].transform([query_text])
-        similarities = cosine_similarity(query_vec, assets['candidate_matrix']).flatten()
-        top_indices = similarities.argsort()[-top_n:][::-1]
-        
-        matches = assets['df_candidates'].iloc[top_indices].copy()
-        matches['score'] = np.round(similarities[top_indices] * 100, 1)
+        if filters:
+            # Filtered searches score only the matching partition's rows, always exactly
+            try:
+                top_indices, similarities = candidates.search(query_vec, top_n, filters)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            mode = "exact"
+        elif mode == "approx" and candidates.has_ivf:
+            top_indices, similarities, _ = candidates.search_approx(query_vec, top_n, nprobe)
+        else:
+            # Only candidates sharing a query skill are scored; same ranking as a full cosine scan
+            mode = "exact"
+            top_indices, similarities = candidates.search(query_vec, top_n)
         
-        return jsonify({
-            "candidates": matches[['Candidate ID', 'Name', 'Email', 'Experience Level', 'Skills', 'score']].to_dict(orient="records")
-        })
+        # Spliced together from pre-rendered records rather than re-serialized per request
+        body = b'{"candidates":' + candidate_records(candidates, top_indices, similarities) + b',"mode":' + json.dumps(mode).encode() + b'}'
+        return Response(body, mimetype="application/json")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/match_candidates_batch", methods=["POST"])
+def match_candidates_batch():
+    """
+    Top candidates for many jobs at once. Takes a JSON array, {"jobs": [...]},
+    or an NDJSON body; each job is {"id"?, "skills_required": [...]} or a bare
+    list of skills. All jobs are scored together in chunked sparse products
+    and the response streams one NDJSON line per job, in request order.
+    """
+    if not assets: return jsonify({"error": "Model assets not loaded"}), 500
+    try:
+        jobs = read_batch_profiles("jobs")
+        if len(jobs) > MAX_MATCH_JOBS:
+            return jsonify({"error": f"Batch too large (max {MAX_MATCH_JOBS} jobs)"}), 413
+        body = request.get_json(silent=True) if request.is_json else None
+        top_n = int((body if isinstance(body, dict) else request.args).get("top_n", 10))
+        texts = []
+        for i, job in enumerate(jobs):
+            skills = job.get("skills_required", []) if isinstance(job, dict) else job
+            if isinstance(skills, str):
+                skills = [skills]
+            if not isinstance(skills, list):
+                return jsonify({"error": f"Invalid job at index {i}: expected a list of skills"}), 400
+            texts.append(" ".join(str(skill) for skill in skills))
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid request body: {e}"}), 400
+
+    if assets.get('candidate_pool') is None:
+        return jsonify({"error": "Candidate matching is unavailable (candidate metadata not loaded)"}), 503
+    # Held locally so a concurrent reload or candidate update cannot change the pool mid-stream
+    candidates = assets['candidate_pool'].latest()
+    query_matrix = assets['vectorizer'].transform(texts)
+
+    def generate():
+        try:
+            for row, top_indices, similarities in candidates.search_batch(query_matrix, top_n):
+                job_id = jobs[row].get("id") if isinstance(jobs[row], dict) else None
+                yield b'{"index":%d,"id":%s,"candidates":%s}\n' % (
+                    row, json.dumps(job_id).encode(), candidate_records(candidates, top_indices, similarities)
+                )
+        except Exception as e:
+            # Headers are already sent, so the failure is reported in-band
+            logger.error(f"Batch Candidate Match Error: {e}")
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route("/api/candidates", methods=["GET", "POST", "DELETE"])
+def update_candidates():
+    """
+    Live candidate updates without retraining. POST adds candidates (JSON
+    array, {"candidates": [...]}, or NDJSON; each needs a "Candidate ID" and
+    "Skills", and replaces any candidate with that ID). DELETE removes
+    {"ids": [...]}. GET reports the pool's size and segments.
+    """
+    if not assets: return jsonify({"error": "Model assets not loaded"}), 500
+    pool = assets.get('candidate_pool')
+    if pool is None:
+        return jsonify({"error": "Candidate pool is unavailable (candidate metadata not loaded)"}), 503
+    if request.method == "GET":
+        return jsonify(pool.stats())
+
+    try:
+        if request.method == "POST":
+            records = read_batch_profiles("candidates")
+            if len(records) > MAX_CANDIDATE_UPDATES:
+                return jsonify({"error": f"Batch too large (max {MAX_CANDIDATE_UPDATES} candidates)"}), 413
+            if not all(isinstance(record, dict) for record in records):
+                return jsonify({"error": "Each candidate must be an object"}), 400
+        else:
+            ids = (request.get_json(silent=True) or {}).get("ids")
+            if isinstance(ids, str):
+                ids = [ids]
+            if not isinstance(ids, list):
+                return jsonify({"error": "Expected {\"ids\": [...]}"}), 400
+    except (AttributeError, ValueError) as e:
+        return jsonify({"error": f"Invalid request body: {e}"}), 400
+
+    try:
+        start = time.perf_counter()
+        if request.method == "POST":
+            result = {"added": pool.add(records)}
+        else:
+            result = {"deleted": pool.delete(ids)}
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        result.update(pool.stats())
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
+        logger.error(f"Candidate Update Error: {e}")
         return jsonify({"error": str(e)}), 500
 
 if __name__ == "__main__":
@@ -0,0 +1,21 @@
+import os
+import sys
+import argparse
+
+# Allow `python src/models/compile_model.py` from the repo root to import shared helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.utils.compiled_trees import compile_model_file
+
+MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def main():
+    parser = argparse.ArgumentParser(description="Export salary_model.pkl to NumPy arrays for xgboost-free serving.")
+    parser.add_argument("--model", default=os.path.join(MODELS_DIR, "salary_model.pkl"))
+    parser.add_argument("--out", default=os.path.join(MODELS_DIR, "salary_model_compiled.npz"))
+    args = parser.parse_args()
+
+    compiled = compile_model_file(args.model, args.out)
+    print(f"Compiled {len(compiled.roots)} trees ({len(compiled.value)} nodes, depth {compiled.max_depth}) to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,76 @@
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 import joblib
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import MultiLabelBinarizer, TargetEncoder
+import xgboost as xgb
 from xgboost import XGBRegressor
 from sklearn.metrics import mean_absolute_error, r2_score
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Allow `python src/models/train.py` from the repo root to import shared helpers
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.utils.columnar import ensure_columnar, load_dataset
+from src.utils.compiled_trees import compile_model_file, file_sha256
+from src.utils.target_encoding import StreamingTargetEncoder
+from src.utils.skill_cooccurrence import SkillCooccurrenceBuilder
+from src.utils.candidate_ivf import CandidateIVF
+from src.utils.candidate_pool import candidate_text
+
+JOBS_CSV = "data/job_market_analytics_dataset.csv"
+CANDIDATES_CSV = "data/candidates.csv"
+MODELS_DIR = "src/models"
+
+# Rows per chunk in streaming (out-of-core) training
+TRAIN_CHUNK_ROWS = int(os.environ.get("TRAIN_CHUNK_ROWS", 100_000))
+SALARY_COLUMNS = ['role', 'location', 'experience_years', 'skills', 'salary_lpa']
+TEST_FRACTION = 0.2
+# Share of the training rows held out for early stopping in fast-fit mode
+VALIDATION_FRACTION = 0.1
+
+# XGBoost thread budget for the salary model (-1 = all cores)
+TRAIN_THREADS = int(os.environ.get("TRAIN_THREADS", -1))
+
+# Lists in the approximate (IVF) candidate index (0 = about sqrt of the pool size)
+CANDIDATE_IVF_LISTS = int(os.environ.get("CANDIDATE_IVF_LISTS", 0))
+
+# Fast-fit mode: histogram trees, stop once the validation error stops improving
+FAST_FIT_MAX_BIN = 256
+FAST_FIT_EARLY_STOPPING_ROUNDS = 20
+
+def salary_params(n_jobs=TRAIN_THREADS):
+    """Native xgboost parameters matching the XGBRegressor settings used below."""
+    return {"objective": "reg:squarederror", "learning_rate": 0.05, "max_depth": 5, "seed": 42,
+            "tree_method": "hist", "max_bin": FAST_FIT_MAX_BIN, "nthread": n_jobs}
+
+def as_regressor(booster, n_estimators, n_jobs=TRAIN_THREADS):
+    """Wraps a natively trained Booster in the XGBRegressor the pickle and the API expect."""
+    model = XGBRegressor(n_estimators=n_estimators, learning_rate=0.05, max_depth=5, random_state=42, n_jobs=n_jobs)
+    # Keeps attributes such as best_iteration, so predict() stops at the best round
+    model.load_model(bytearray(booster.save_raw(raw_format="json")))
+    return model
+
+def fit_fast(X_train, y_train, X_eval, y_eval, n_estimators, n_jobs=TRAIN_THREADS):
+    """
+    Histogram-based fit with early stopping on the validation rows. Uses the
+    native API: the sklearn wrapper evaluates its eval_set through a
+    QuantileDMatrix, which made early stopping several times slower per round.
+    """
+    dtrain = xgb.QuantileDMatrix(X_train, y_train, max_bin=FAST_FIT_MAX_BIN)
+    deval = xgb.DMatrix(X_eval, y_eval)
+    booster = xgb.train(salary_params(n_jobs), dtrain, num_boost_round=n_estimators, evals=[(deval, "validation")],
+                        early_stopping_rounds=FAST_FIT_EARLY_STOPPING_ROUNDS, verbose_eval=False)
+    return as_regressor(booster, n_estimators, n_jobs)
 
 def normalize_location(loc):
     if not isinstance(loc, str): return "Remote"
@@ -24,87 +87,345 @@ def normalize_location(loc):
     if "toronto" in loc: return "Toronto, Canada"
     return loc.title()
 
-def train_models():
-    # Load Real Job Market Data
-    df_jobs = pd.read_csv("data/job_market_analytics_dataset.csv")
-    
-    # --- 1. Salary Prediction Model ---
-    # Preprocessing
+def prepare_jobs(df_jobs):
+    """Adds the derived columns the salary model and skill recommendations use."""
     df_jobs['Skills_List'] = df_jobs['skills'].apply(lambda x: [s.strip() for s in str(x).split('|')] if pd.notnull(x) else [])
-    
-    # Normalize Location
     df_jobs['Normalized_Location'] = df_jobs['location'].apply(normalize_location)
+    # Log-transform Salary
+    df_jobs['log_salary'] = np.log1p(df_jobs['salary_lpa'])
+    return df_jobs
+
+def build_feature_matrix(encoded, experience, skills_matrix):
+    """
+    Stacks target-encoded categoricals, experience and the binary skill matrix
+    into one float32 CSR matrix. Zeros are not stored, so XGBoost treats them
+    as missing; serving mirrors this via the model's `sparse_features` flag.
+    """
+    dense = sp.csr_matrix(np.column_stack([np.asarray(encoded, dtype=np.float32),
+                                           np.asarray(experience, dtype=np.float32)]))
+    X = sp.hstack([dense, skills_matrix], format="csr", dtype=np.float32)
+    X.eliminate_zeros()
+    return X
+
+def train_salary_model(df_jobs, n_estimators=200, fast=False, n_jobs=TRAIN_THREADS):
+    """
+    Fits the target encoder, skill binarizer and XGBoost salary model on
+    sparse features. Returns (model, encoder, mlb, feature_columns, metrics).
+    With `fast`, trees are histogram-built and boosting stops early on a
+    validation split carved out of the training rows, with `n_estimators` as
+    the upper bound; the test split stays unseen until the reported metrics.
+    """
+    prepare_jobs(df_jobs)
 
     # Encode categorical features with Target Encoding (sklearn version)
     # random_state for reproducibility in smoothing
     encoder = TargetEncoder(target_type='continuous', random_state=42)
-    encoder.set_output(transform="pandas")
-    
-    # Log-transform Salary
-    df_jobs['log_salary'] = np.log1p(df_jobs['salary_lpa'])
-
-    X_pre = df_jobs[['role', 'Normalized_Location', 'experience_years']]
-    y = df_jobs['log_salary']
+    categoricals = df_jobs[['role', 'Normalized_Location']]
+    y = df_jobs['log_salary'].to_numpy()
 
-    # MultiLabelBinarizer for Skills
-    mlb = MultiLabelBinarizer()
-    skills_encoded = mlb.fit_transform(df_jobs['Skills_List'])
+    # MultiLabelBinarizer for Skills, kept sparse: rows x skills never gets materialized
+    mlb = MultiLabelBinarizer(sparse_output=True)
+    skills_matrix = mlb.fit_transform(df_jobs['Skills_List']).tocsr()
     skills_columns = [f"Skill_{s}" for s in mlb.classes_]
-    skills_df = pd.DataFrame(skills_encoded, columns=skills_columns)
-    
-    X = pd.concat([X_pre, skills_df], axis=1)
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Same shuffle as splitting the full frame with random_state=42
+    train_idx, test_idx = train_test_split(np.arange(len(df_jobs)), test_size=0.2, random_state=42)
+    if fast:
+        # Early stopping must not pick its round on the rows the metrics are computed on
+        train_idx, val_idx = train_test_split(train_idx, test_size=VALIDATION_FRACTION, random_state=42)
 
     # Fit Target Encoder on TRAIN data only
-    # Note: sklearn TargetEncoder expects X to be the categorical columns only
-    encoder.fit(X_train[['role', 'Normalized_Location']], y_train)
-    
-    # Transform both
-    X_train_encoded = encoder.transform(X_train[['role', 'Normalized_Location']])
-    X_test_encoded = encoder.transform(X_test[['role', 'Normalized_Location']])
-    
-    # Add experience and skills back
-    X_train_final = pd.concat([X_train_encoded.reset_index(drop=True), X_train[['experience_years']].reset_index(drop=True), 
-                               X_train[skills_columns].reset_index(drop=True)], axis=1)
-    
-    X_test_final = pd.concat([X_test_encoded.reset_index(drop=True), X_test[['experience_years']].reset_index(drop=True),
-                              X_test[skills_columns].reset_index(drop=True)], axis=1)
-
-    # Train XGBoost Model
-    model = XGBRegressor(n_estimators=200, learning_rate=0.05, max_depth=5, random_state=42, n_jobs=-1)
-    model.fit(X_train_final, y_train)
-    
+    encoder.fit(categoricals.iloc[train_idx], y[train_idx])
+    experience = df_jobs['experience_years'].to_numpy()
+    X_train = build_feature_matrix(encoder.transform(categoricals.iloc[train_idx]), experience[train_idx], skills_matrix[train_idx])
+    X_test = build_feature_matrix(encoder.transform(categoricals.iloc[test_idx]), experience[test_idx], skills_matrix[test_idx])
+    feature_columns = list(encoder.get_feature_names_out()) + ['experience_years'] + skills_columns
+
+    # Train XGBoost Model on the CSR matrix
+    if fast:
+        X_val = build_feature_matrix(encoder.transform(categoricals.iloc[val_idx]), experience[val_idx], skills_matrix[val_idx])
+        model = fit_fast(X_train, y[train_idx], X_val, y[val_idx], n_estimators, n_jobs)
+        print(f"Fast fit stopped at {model.best_iteration + 1} of {n_estimators} rounds")
+    else:
+        model = XGBRegressor(n_estimators=n_estimators, learning_rate=0.05, max_depth=5, random_state=42, n_jobs=n_jobs)
+        model.fit(X_train, y[train_idx])
+    # Absent entries were missing values in training; tells serving to encode zeros as NaN
+    model.get_booster().set_attr(sparse_features="1")
+
     # Evaluate
-    y_pred_log = model.predict(X_test_final)
-    y_pred = np.expm1(y_pred_log)
-    y_test_orig = np.expm1(y_test)
-
-    print(f"Salary Model MAE: {mean_absolute_error(y_test_orig, y_pred):.2f} LPA")
-    print(f"Salary Model R2: {r2_score(y_test_orig, y_pred):.2f}")
-    
-    # Save Model artifacts
-    os.makedirs("src/models", exist_ok=True)
-    joblib.dump(model, "src/models/salary_model.pkl")
-    joblib.dump(encoder, "src/models/target_encoder.pkl")
-    joblib.dump(mlb, "src/models/mlb_skills.pkl")
-    joblib.dump(X_train_final.columns.tolist(), "src/models/feature_columns.pkl")
-    
-    # --- 2. Skill Recommendation Preparation ---
-    skill_job_matrix = df_jobs.explode('Skills_List')
-    skill_freq = skill_job_matrix.groupby(['role', 'Skills_List']).size().reset_index(name='count')
-    joblib.dump(skill_freq, "src/models/skill_recommendation_data.pkl")
-    
-    # --- 3. Candidate Matching Preparation ---
-    df_candidates = pd.read_csv("data/candidates.csv")
+    y_pred = np.expm1(model.predict(X_test))
+    y_test_orig = np.expm1(y[test_idx])
+    metrics = {"mae": mean_absolute_error(y_test_orig, y_pred), "r2": r2_score(y_test_orig, y_pred)}
+    print(f"Salary Model MAE: {metrics['mae']:.2f} LPA")
+    print(f"Salary Model R2: {metrics['r2']:.2f}")
+    return model, encoder, mlb, feature_columns, metrics
+
+# --- Streaming (Out-of-Core) Salary Training ---
+def is_test_row(row_ids):
+    """Hash-based train/test split by row position, identical in every pass over the data."""
+    hashed = (np.asarray(row_ids, dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32)
+    return hashed < np.uint64(TEST_FRACTION * 2 ** 32)
+
+def iter_job_csv_chunks(chunk_rows, columns):
+    # Straight from the CSV: the columnar copy's string dictionaries grow with the
+    # number of distinct values (e.g. skill strings), the CSV reader does not
+    return pd.read_csv(JOBS_CSV, chunksize=chunk_rows, usecols=columns)
+
+def iter_job_chunks(chunk_rows):
+    """Yields (prepared chunk, test-row mask) pairs over the jobs dataset."""
+    offset = 0
+    for chunk in iter_job_csv_chunks(chunk_rows, SALARY_COLUMNS):
+        chunk = prepare_jobs(chunk.reset_index(drop=True))
+        yield chunk, is_test_row(np.arange(offset, offset + len(chunk)))
+        offset += len(chunk)
+
+def encode_chunk(chunk, encoder, mlb):
+    return build_feature_matrix(
+        encoder.transform(chunk[['role', 'Normalized_Location']]),
+        chunk['experience_years'].to_numpy(),
+        mlb.transform(chunk['Skills_List']).tocsr(),
+    )
+
+class JobFeatureIter(xgb.DataIter):
+    """Feeds the training rows to XGBoost one encoded CSR chunk at a time."""
+
+    def __init__(self, encoder, mlb, chunk_rows, cache_prefix):
+        self.encoder = encoder
+        self.mlb = mlb
+        self.chunk_rows = chunk_rows
+        self._chunks = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = iter_job_chunks(self.chunk_rows)
+        for chunk, is_test in self._chunks:
+            train = chunk[~is_test]
+            if len(train):
+                input_data(data=encode_chunk(train, self.encoder, self.mlb), label=train['log_salary'].to_numpy())
+                return True
+        return False
+
+    def reset(self):
+        self._chunks = None
+
+def train_salary_model_streaming(n_estimators=200, chunk_rows=TRAIN_CHUNK_ROWS, n_jobs=TRAIN_THREADS):
+    """
+    Out-of-core variant of `train_salary_model` for datasets larger than RAM.
+
+    Pass 1 fits the target encoder and the skill vocabulary chunk by chunk,
+    pass 2 streams encoded CSR chunks into an external-memory DMatrix, and a
+    final pass scores the held-out rows. Only per-category statistics and one
+    chunk are ever in memory. The split is hash-based rather than shuffled.
+    """
+    encoder = StreamingTargetEncoder(['role', 'Normalized_Location'])
+    vocabulary = set()
+    for chunk, is_test in iter_job_chunks(chunk_rows):
+        vocabulary.update(chain.from_iterable(chunk['Skills_List']))
+        train = chunk[~is_test]
+        encoder.partial_fit(train[['role', 'Normalized_Location']], train['log_salary'])
+    encoder.finalize()
+    mlb = MultiLabelBinarizer(classes=sorted(vocabulary), sparse_output=True).fit([])
+    feature_columns = list(encoder.get_feature_names_out()) + ['experience_years'] + [f"Skill_{s}" for s in mlb.classes_]
+
+    params = salary_params(n_jobs)
+    with tempfile.TemporaryDirectory(prefix="salary_train_") as cache_dir:
+        data_iter = JobFeatureIter(encoder, mlb, chunk_rows, cache_prefix=os.path.join(cache_dir, "jobs"))
+        # ExtMemQuantileDMatrix is the external-memory path on xgboost >= 3; older versions page a DMatrix
+        dmatrix_cls = getattr(xgb, "ExtMemQuantileDMatrix", xgb.DMatrix)
+        booster = xgb.train(params, dmatrix_cls(data_iter), num_boost_round=n_estimators)
+    booster.set_attr(sparse_features="1")
+
+    model = as_regressor(booster, n_estimators, n_jobs)
+
+    # Evaluate on the held-out rows, accumulating the error sums chunk by chunk
+    n, abs_err, sq_err, y_sum, y_sq = 0, 0.0, 0.0, 0.0, 0.0
+    for chunk, is_test in iter_job_chunks(chunk_rows):
+        test = chunk[is_test]
+        if not len(test):
+            continue
+        y_pred = np.expm1(booster.inplace_predict(encode_chunk(test, encoder, mlb)))
+        y_true = test['salary_lpa'].to_numpy(dtype=np.float64)
+        n += len(test)
+        abs_err += np.abs(y_true - y_pred).sum()
+        sq_err += ((y_true - y_pred) ** 2).sum()
+        y_sum += y_true.sum()
+        y_sq += (y_true ** 2).sum()
+    metrics = {"mae": abs_err / n, "r2": 1 - sq_err / (y_sq - y_sum ** 2 / n)} if n else {}
+    if metrics:
+        print(f"Salary Model MAE: {metrics['mae']:.2f} LPA")
+        print(f"Salary Model R2: {metrics['r2']:.2f}")
+    return model, encoder, mlb, feature_columns, metrics
+
+# --- Training Stages ---
+# Each stage reads only its declared inputs and writes only its declared outputs,
+# so stages are independent and can run in separate processes.
+
+def run_salary_stage(streaming=False, fast=False, threads=TRAIN_THREADS, chunk_rows=TRAIN_CHUNK_ROWS):
+    if streaming:
+        model, encoder, mlb, feature_columns, _ = train_salary_model_streaming(chunk_rows=chunk_rows, n_jobs=threads)
+    else:
+        df_jobs = load_dataset(JOBS_CSV, categorical=False)
+        model, encoder, mlb, feature_columns, _ = train_salary_model(df_jobs, fast=fast, n_jobs=threads)
+
+    joblib.dump(model, f"{MODELS_DIR}/salary_model.pkl")
+    # Flattened copy of the trees so the API can predict without loading xgboost
+    compile_model_file(f"{MODELS_DIR}/salary_model.pkl", f"{MODELS_DIR}/salary_model_compiled.npz")
+    joblib.dump(encoder, f"{MODELS_DIR}/target_encoder.pkl")
+    joblib.dump(mlb, f"{MODELS_DIR}/mlb_skills.pkl")
+    joblib.dump(feature_columns, f"{MODELS_DIR}/feature_columns.pkl")
+
+def run_skill_stage(chunk_rows=TRAIN_CHUNK_ROWS):
+    # (role, skill) counts are summed chunk by chunk, so memory tracks the number of pairs, not rows
+    counts = None
+    cooccurrence = SkillCooccurrenceBuilder(by_role=True)
+    for chunk in iter_job_csv_chunks(chunk_rows, ['role', 'skills']):
+        chunk = chunk.reset_index(drop=True)
+        chunk['Skills_List'] = chunk['skills'].apply(lambda x: [s.strip() for s in str(x).split('|')] if pd.notnull(x) else [])
+        part = chunk.explode('Skills_List').groupby(['role', 'Skills_List']).size()
+        counts = part if counts is None else counts.add(part, fill_value=0)
+        cooccurrence.update(chunk['role'].tolist(), chunk['Skills_List'].tolist())
+    skill_freq = counts.astype('int64').sort_index().reset_index(name='count')
+    joblib.dump(skill_freq, f"{MODELS_DIR}/skill_recommendation_data.pkl")
+    # Skill x skill co-occurrence (overall and per role) for "learn next" suggestions
+    cooccurrence.build().save(f"{MODELS_DIR}/skill_cooccurrence.npz")
+
+def run_candidate_stage():
+    df_candidates = load_dataset(CANDIDATES_CSV, categorical=False)
     vectorizer = TfidfVectorizer()
-    candidate_skills_text = df_candidates['Skills'].astype(str).str.replace(',', ' ')
+    candidate_skills_text = candidate_text(df_candidates)
     candidate_matrix = vectorizer.fit_transform(candidate_skills_text)
-    
-    joblib.dump(vectorizer, "src/models/candidate_vectorizer.pkl")
-    joblib.dump(candidate_matrix, "src/models/candidate_matrix.pkl")
-    
+
+    joblib.dump(vectorizer, f"{MODELS_DIR}/candidate_vectorizer.pkl")
+    joblib.dump(candidate_matrix, f"{MODELS_DIR}/candidate_matrix.pkl")
+    # Clustered lists for approximate matching; tied to this exact matrix by its hash
+    ivf = CandidateIVF.build(candidate_matrix, n_lists=CANDIDATE_IVF_LISTS or None,
+                             source_sha256=file_sha256(f"{MODELS_DIR}/candidate_matrix.pkl"))
+    ivf.save(f"{MODELS_DIR}/candidate_ivf.npz")
+
+# Bump a stage's version when its code changes so existing artifacts are rebuilt
+STAGES = {
+    "salary_model": {
+        "version": 1,
+        "run": run_salary_stage,
+        "options": ["streaming", "fast", "threads", "chunk_rows"],
+        "inputs": [JOBS_CSV],
+        "outputs": ["salary_model.pkl", "salary_model_compiled.npz", "target_encoder.pkl",
+                    "mlb_skills.pkl", "feature_columns.pkl"],
+    },
+    "skill_recommendations": {
+        "version": 2,
+        "run": run_skill_stage,
+        "options": ["chunk_rows"],
+        "inputs": [JOBS_CSV],
+        "outputs": ["skill_recommendation_data.pkl", "skill_cooccurrence.npz"],
+    },
+    "candidate_matching": {
+        "version": 2,
+        "run": run_candidate_stage,
+        "inputs": [CANDIDATES_CSV],
+        "outputs": ["candidate_vectorizer.pkl", "candidate_matrix.pkl", "candidate_ivf.npz"],
+    },
+}
+
+# Options that change what a stage produces (chunk size and thread count do not)
+FINGERPRINT_OPTIONS = ("streaming", "fast")
+
+def stage_options(name, options):
+    return {key: value for key, value in options.items() if key in STAGES[name].get("options", [])}
+
+def fingerprint_path(name):
+    return os.path.join(MODELS_DIR, f"{name}.fingerprint.json")
+
+def stage_fingerprint(name, options):
+    stage = STAGES[name]
+    fingerprint = {
+        "version": stage["version"],
+        "inputs": {path: file_sha256(path) for path in stage["inputs"]},
+    }
+    relevant = {key: value for key, value in stage_options(name, options).items() if key in FINGERPRINT_OPTIONS}
+    if relevant:
+        fingerprint["options"] = relevant
+    return fingerprint
+
+def is_stale(name, fingerprint):
+    stage = STAGES[name]
+    if not all(os.path.exists(os.path.join(MODELS_DIR, out)) for out in stage["outputs"]):
+        return True
+    try:
+        with open(fingerprint_path(name), "r", encoding="utf-8") as f:
+            return json.load(f) != fingerprint
+    except (OSError, ValueError):
+        return True
+
+def _run_stage(name, options):
+    start = time.perf_counter()
+    STAGES[name]["run"](**stage_options(name, options))
+    return name, time.perf_counter() - start
+
+def train_models(force=False, stages=None, parallel=True, streaming=False, fast=False,
+                 threads=TRAIN_THREADS, chunk_rows=TRAIN_CHUNK_ROWS):
+    """
+    Runs the training stages whose inputs changed since their artifacts were
+    built (or all of `stages` with `force`). Stale stages run in parallel
+    worker processes; a stage's fingerprint is written only once it succeeds.
+    `streaming` trains the salary model out of core in chunks of `chunk_rows`,
+    `fast` uses early stopping, and `threads` caps XGBoost's thread count.
+    """
+    options = {"streaming": streaming, "fast": fast, "threads": threads, "chunk_rows": chunk_rows}
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    names = list(stages or STAGES)
+    for name in names:
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage {name!r}; expected one of {', '.join(STAGES)}")
+
+    # Convert inputs once up front so parallel stages never race on the same columnar copy
+    for path in sorted({path for name in names for path in STAGES[name]["inputs"]}):
+        ensure_columnar(path)
+
+    fingerprints = {name: stage_fingerprint(name, options) for name in names}
+    stale = [name for name in names if force or is_stale(name, fingerprints[name])]
+    for name in names:
+        if name not in stale:
+            print(f"[{name}] up to date, skipping")
+    if not stale:
+        print("All artifacts are up to date.")
+        return []
+
+    def finished(name, elapsed):
+        with open(fingerprint_path(name), "w", encoding="utf-8") as f:
+            json.dump(fingerprints[name], f, indent=2)
+        print(f"[{name}] done in {elapsed:.1f}s")
+
+    if parallel and len(stale) > 1:
+        errors = []
+        with ProcessPoolExecutor(max_workers=len(stale)) as pool:
+            futures = {pool.submit(_run_stage, name, options): name for name in stale}
+            # Record every stage that succeeds, even when another one fails
+            for future in as_completed(futures):
+                try:
+                    finished(*future.result())
+                except Exception as e:
+                    print(f"[{futures[future]}] failed: {e}")
+                    errors.append(e)
+        if errors:
+            raise errors[0]
+    else:
+        for name in stale:
+            finished(*_run_stage(name, options))
+
     print("Models and artifacts saved successfully.")
+    return stale
 
 if __name__ == "__main__":
-    train_models()
+    parser = argparse.ArgumentParser(description="Train the models whose input data changed.")
+    parser.add_argument("--force", action="store_true", help="Rebuild every selected stage")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), help="Only consider these stages")
+    parser.add_argument("--serial", action="store_true", help="Run stale stages one after another")
+    parser.add_argument("--streaming", action="store_true", help="Train the salary model out of core, chunk by chunk")
+    parser.add_argument("--chunk-rows", type=int, default=TRAIN_CHUNK_ROWS, help="Rows per chunk when streaming")
+    parser.add_argument("--fast", action="store_true", help="Histogram trees with early stopping on a validation split")
+    parser.add_argument("--threads", type=int, default=TRAIN_THREADS, help="XGBoost thread budget (-1 = all cores)")
+    args = parser.parse_args()
+    train_models(force=args.force, stages=args.stages, parallel=not args.serial, streaming=args.streaming,
+                 fast=args.fast, threads=args.threads, chunk_rows=args.chunk_rows)
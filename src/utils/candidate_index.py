@@ -0,0 +1,225 @@
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+# Relative slack on score bounds so float rounding can never prune a true top-k candidate
+BOUND_SLACK = 1e-9
+
+# Upper bound on non-zero scores held at once by `search_batch` (~12 bytes each)
+BATCH_MAX_SCORES = 5_000_000
+
+def normalize_query(query_vec):
+    """
+    L2-normalizes a single-row sparse query with the same arithmetic as
+    sklearn's `normalize` (sequential sum of squares, then one division per
+    entry), without its per-call validation overhead.
+    """
+    q = sp.csr_matrix(query_vec, dtype=np.float64, copy=True)
+    if q.shape[0] != 1:
+        raise ValueError(f"Expected a single query row, got {q.shape[0]}")
+    total = 0.0
+    for x in q.data.tolist():
+        total += x * x
+    if total != 0.0:
+        q.data /= np.sqrt(total)
+    return q
+
+def top_k(indices, scores, k):
+    """
+    The `k` best (index, score) pairs, ordered by score descending and then
+    by index ascending, so ties always come back in the same order.
+    """
+    if k <= 0 or len(indices) == 0:
+        return indices[:0], scores[:0]
+    if len(indices) > k:
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        keep = scores >= kth
+        indices, scores = indices[keep], scores[keep]
+    order = np.lexsort((indices, -scores))[:k]
+    return indices[order], scores[order]
+
+class CandidateIndex:
+    """
+    Inverted index over the TF-IDF candidate matrix for exact top-k cosine search.
+
+    Each term keeps a posting list of the candidates that contain it (by
+    candidate index, with weights), the same list ordered by weight, and its
+    largest weight. A search only touches candidates sharing a query term and
+    uses MaxScore pruning: the highest-impact postings of each query term give
+    a lower bound on the k-th best score, and the weakest terms whose combined
+    upper bound stays below it stop contributing candidates, since nobody
+    matching only those terms can reach the top k. They are still probed for
+    the surviving candidates' scores.
+
+    Scores are accumulated term by term in the query's stored order, the same
+    order scipy's sparse product uses, so they are bit-identical to
+    `cosine_similarity(query_vec, candidate_matrix)`.
+    """
+
+    def __init__(self, candidate_matrix, normalized=False):
+        # `normalized`: rows are already unit length (e.g. sliced from another index's matrix)
+        matrix = sp.csr_matrix(candidate_matrix, dtype=np.float64)
+        self.matrix = matrix if normalized else normalize(matrix)
+        self.n_candidates, self.n_terms = self.matrix.shape
+
+        postings = self.matrix.tocsc()
+        postings.sum_duplicates()  # also sorts each term's candidates by index
+        self.posting_indptr = postings.indptr.astype(np.int64)
+        self.posting_docs = postings.indices.astype(np.int64)
+        self.posting_weights = postings.data
+        # Positions into the posting arrays, highest weight first within each term
+        term = np.repeat(np.arange(self.n_terms), np.diff(self.posting_indptr))
+        self.impact_order = np.lexsort((self.posting_docs, -self.posting_weights, term))
+        self.max_weights = np.zeros(self.n_terms)
+        non_empty = np.diff(self.posting_indptr) > 0
+        self.max_weights[non_empty] = self.posting_weights[self.impact_order[self.posting_indptr[:-1][non_empty]]]
+        self._buffers = threading.local()
+
+    def __len__(self):
+        return self.n_candidates
+
+    def _query(self, query_vec):
+        q = normalize_query(query_vec)
+        if q.shape != (1, self.n_terms):
+            raise ValueError(f"Expected a (1, {self.n_terms}) query vector, got {q.shape}")
+        return q
+
+    def _scratch(self):
+        # Per-thread score accumulator and "seen in this search" stamps, reused across searches
+        buffers = self._buffers
+        if getattr(buffers, "scores", None) is None:
+            buffers.scores = np.zeros(self.n_candidates)
+            buffers.stamps = np.zeros(self.n_candidates, dtype=np.int64)
+            buffers.token = 0
+        buffers.token += 1
+        return buffers.scores, buffers.stamps, buffers.token
+
+    def _postings(self, term):
+        start, end = self.posting_indptr[term], self.posting_indptr[term + 1]
+        return self.posting_docs[start:end], self.posting_weights[start:end]
+
+    def score_candidates(self, query_vec, candidates):
+        """Exact cosine scores of the given candidates only (same values as a full scan)."""
+        q = self._query(query_vec)
+        if len(candidates) == 0:
+            return np.zeros(0)
+        return np.asarray((q @ self.matrix[candidates].T).todense()).ravel()
+
+    def _threshold(self, q, terms, k):
+        """Exact k-th best score among the top-k impact postings of every query term (0 if too few)."""
+        starts, ends = self.posting_indptr[terms], self.posting_indptr[terms + 1]
+        seeds = np.unique(np.concatenate([
+            self.posting_docs[self.impact_order[start:min(end, start + k)]] for start, end in zip(starts, ends)
+        ]))
+        if len(seeds) < k:
+            return 0.0
+        seed_scores = np.asarray((q @ self.matrix[seeds].T).todense()).ravel()
+        return np.partition(seed_scores, len(seeds) - k)[len(seeds) - k]
+
+    def search(self, query_vec, k):
+        """
+        Exact top-`k` candidates for a (1, n_terms) query vector.
+        Returns (candidate indices, cosine scores), best first.
+        """
+        indices, scores, _ = self.search_with_stats(query_vec, k)
+        return indices, scores
+
+    def search_with_stats(self, query_vec, k):
+        """Like `search`, also returning how many candidates were scored."""
+        k = max(0, int(k))
+        q = self._query(query_vec)
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0), 0
+
+        # Summed per term in case the query stores a term twice
+        term_weights = {}
+        for t, w in zip(q.indices.tolist(), q.data.tolist()):
+            term_weights[t] = term_weights.get(t, 0.0) + w
+        terms = np.array(sorted(t for t, w in term_weights.items() if w > 0), dtype=np.int64)
+
+        candidates, scores = np.zeros(0, dtype=np.int64), np.zeros(0)
+        if len(terms):
+            # MaxScore: the weakest terms whose bounds sum below the threshold only refine scores
+            bounds = np.array([term_weights[t] for t in terms.tolist()]) * self.max_weights[terms]
+            by_bound = np.argsort(bounds, kind="stable")
+            dropped = np.cumsum(bounds[by_bound]) * (1 + BOUND_SLACK) < self._threshold(q, terms, k)
+            essential = set(terms[by_bound[~dropped]].tolist())
+
+            acc, stamps, token = self._scratch()
+            parts = []
+            for t in sorted(essential):
+                docs, _ = self._postings(t)
+                new = docs[stamps[docs] != token]
+                stamps[new] = token
+                parts.append(new)
+            candidates = np.concatenate(parts)
+
+            for t, q_weight in zip(q.indices.tolist(), q.data.tolist()):
+                docs, weights = self._postings(t)
+                if t in essential:
+                    acc[docs] += q_weight * weights
+                elif len(candidates) < len(docs):
+                    # Pruned term: add its weight only for candidates that already qualify
+                    positions = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+                    hit = docs[positions] == candidates
+                    acc[candidates[hit]] += q_weight * weights[positions[hit]]
+                else:
+                    hit = stamps[docs] == token
+                    acc[docs[hit]] += q_weight * weights[hit]
+
+            scores = acc[candidates]
+            acc[candidates] = 0.0
+        indices, scores = self._pad(*top_k(candidates, scores, k), k)
+        return indices, scores, len(candidates)
+
+    def _pad(self, indices, scores, k):
+        # Fewer than k candidates share a query term: the rest score 0 and rank by index
+        need = min(k, self.n_candidates) - len(indices)
+        if need > 0:
+            taken = set(indices.tolist())
+            fill = [i for i in range(need + len(taken)) if i not in taken][:need]
+            indices = np.concatenate([indices, np.asarray(fill, dtype=np.int64)])
+            scores = np.concatenate([scores, np.zeros(len(fill))])
+        return indices, scores
+
+    def search_batch(self, query_matrix, k, max_scores=BATCH_MAX_SCORES):
+        """
+        Top-`k` for every row of a (n_queries, n_terms) query matrix, yielded
+        in order as (row, candidate indices, cosine scores).
+
+        Rows are scored in chunks with one sparse x sparse product each; a
+        chunk takes rows while their summed posting-list lengths (an upper
+        bound on the product's non-zeros) stay within `max_scores`, so memory
+        is bounded however many queries come in. Each row of the product then
+        gets a partial top-k, and results equal `search` on that row.
+        """
+        k = max(0, int(k))
+        Q = normalize(sp.csr_matrix(query_matrix, dtype=np.float64))
+        if Q.shape[1] != self.n_terms:
+            raise ValueError(f"Expected queries with {self.n_terms} terms, got {Q.shape[1]}")
+        # Terms in ascending order per row, the order single searches add them in
+        Q.sort_indices()
+        lengths = np.append(np.diff(self.posting_indptr)[Q.indices], 0)
+        expanded = np.add.reduceat(lengths, Q.indptr[:-1]) * (np.diff(Q.indptr) > 0)
+        matrix_t = self.matrix.T.tocsr()
+
+        start = 0
+        while start < Q.shape[0]:
+            stop, budget = start + 1, expanded[start]
+            while stop < Q.shape[0] and budget + expanded[stop] <= max_scores:
+                budget += expanded[stop]
+                stop += 1
+            scores = (Q[start:stop] @ matrix_t).tocsr()
+            for row in range(stop - start):
+                lo, hi = scores.indptr[row], scores.indptr[row + 1]
+                indices, row_scores = top_k(scores.indices[lo:hi].astype(np.int64), scores.data[lo:hi], k)
+                yield (start + row,) + self._pad(indices, row_scores, k)
+            start = stop
+
+    def search_exhaustive(self, query_vec, k):
+        """Reference full scan: scores every candidate, same ordering rules as `search`."""
+        q = self._query(query_vec)
+        scores = np.asarray((q @ self.matrix.T).todense()).ravel()
+        return top_k(np.arange(self.n_candidates, dtype=np.int64), scores, max(0, int(k)))
@@ -0,0 +1,135 @@
+import os
+import logging
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import normalize
+
+from src.utils.candidate_index import normalize_query, top_k
+from src.utils.compiled_trees import file_sha256
+
+logger = logging.getLogger(__name__)
+
+# Lists probed per query when the caller does not say
+DEFAULT_NPROBE = 8
+
+def default_n_lists(n_candidates):
+    # ~sqrt(N) lists keeps both the centroid scan and each probed list small
+    return int(min(max(1, round(np.sqrt(n_candidates))), 4096))
+
+def assign_lists(X, centroids):
+    # Closest unit centroid by cosine (what queries are routed by), in blocks to bound memory
+    return np.concatenate([
+        np.asarray((X[start:start + 65536] @ centroids.T)).argmax(axis=1)
+        for start in range(0, X.shape[0], 65536)
+    ] or [np.zeros(0, dtype=np.int64)])
+
+def list_layout(assignment, n_lists):
+    """(list_indptr, list_members) for a candidate -> list assignment."""
+    members = np.argsort(assignment, kind="stable")
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+    return indptr, members
+
+class CandidateIVF:
+    """
+    Inverted-file (IVF) partitioning of the normalized TF-IDF candidate rows
+    for approximate top-k search.
+
+    Candidates are clustered with k-means on their unit vectors; each one
+    lives in the list of its most similar centroid. A query ranks the
+    centroids by cosine, scores only the candidates of its `nprobe` best
+    lists exactly, and returns their top k. More probes trade latency for
+    recall; probing every list is an exact search.
+    """
+
+    def __init__(self, centroids, list_indptr, list_members, source_sha256=""):
+        self.centroids = np.asarray(centroids, dtype=np.float64)
+        self.list_indptr = np.asarray(list_indptr, dtype=np.int64)
+        self.list_members = np.asarray(list_members, dtype=np.int64)
+        self.source_sha256 = str(source_sha256)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    @property
+    def n_candidates(self):
+        return len(self.list_members)
+
+    @classmethod
+    def build(cls, candidate_matrix, n_lists=None, seed=42, source_sha256=""):
+        X = normalize(sp.csr_matrix(candidate_matrix, dtype=np.float64))
+        n_lists = min(n_lists or default_n_lists(X.shape[0]), X.shape[0])
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=seed, n_init=3, batch_size=4096)
+        kmeans.fit(X)
+        centroids = normalize(kmeans.cluster_centers_)
+        indptr, members = list_layout(assign_lists(X, centroids), n_lists)
+        return cls(centroids, indptr, members, source_sha256=source_sha256)
+
+    def compact(self, keep, appended):
+        """
+        Lists over rows `keep` of the indexed matrix (renumbered in order),
+        followed by the normalized rows of `appended`, each assigned to its
+        closest existing centroid. Centroids are not refit, so recall drifts
+        only as far as the new candidates differ from the trained ones.
+        """
+        assignment = np.empty(self.n_candidates, dtype=np.int64)
+        assignment[self.list_members] = np.repeat(np.arange(self.n_lists), np.diff(self.list_indptr))
+        assignment = np.concatenate([assignment[keep], assign_lists(appended, self.centroids)])
+        indptr, members = list_layout(assignment, self.n_lists)
+        return CandidateIVF(self.centroids, indptr, members)
+
+    def probe(self, query_vec, nprobe=DEFAULT_NPROBE):
+        """Sorted candidate indices in the `nprobe` lists whose centroids are closest to the query."""
+        q = normalize_query(query_vec)
+        nprobe = int(min(max(1, nprobe), self.n_lists))
+        # Only the query's own terms contribute, so read just those centroid columns
+        similarity = self.centroids[:, q.indices] @ q.data
+        lists = np.argpartition(-similarity, nprobe - 1)[:nprobe] if nprobe < self.n_lists else np.arange(self.n_lists)
+        return np.sort(np.concatenate([self.list_members[self.list_indptr[l]:self.list_indptr[l + 1]] for l in lists]))
+
+    def search(self, index, query_vec, k, nprobe=DEFAULT_NPROBE):
+        """
+        Approximate top-`k` via `index` (the exact CandidateIndex over the same
+        matrix). Returns (candidate indices, cosine scores, candidates scored).
+        A query without known terms scores 0 everywhere, so no list is closer
+        than another; it takes the exact path, which ranks such ties by index.
+        """
+        k = max(0, int(k))
+        if not np.any(sp.csr_matrix(query_vec).data):
+            return index.search_with_stats(query_vec, k)
+        candidates = self.probe(query_vec, nprobe)
+        scores = index.score_candidates(query_vec, candidates)
+        indices, scores = top_k(candidates, scores, k)
+        return indices, scores, len(candidates)
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path, centroids=self.centroids.astype(np.float32), list_indptr=self.list_indptr,
+            list_members=self.list_members.astype(np.int32), source_sha256=np.str_(self.source_sha256),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["centroids"], data["list_indptr"], data["list_members"], str(data["source_sha256"]))
+
+def load_candidate_ivf(ivf_path, matrix_path):
+    """
+    Returns the IVF index if it exists and was built from the current
+    `matrix_path`, otherwise None (approximate searches fall back to exact).
+    """
+    if not os.path.exists(ivf_path):
+        return None
+    try:
+        ivf = CandidateIVF.load(ivf_path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable candidate IVF index {ivf_path}: {e}")
+        return None
+    if os.path.exists(matrix_path) and ivf.source_sha256 != file_sha256(matrix_path):
+        logger.warning(f"Candidate IVF index {ivf_path} is stale; re-run training")
+        return None
+    return ivf
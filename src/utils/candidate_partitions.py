@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.candidate_index import CandidateIndex, top_k
+
+# Candidates are physically split by this column, one inverted index per value
+PARTITION_COLUMN = "Experience Level"
+
+# Other columns become filterable when they look categorical
+MAX_FILTER_VALUES = 1000
+
+class CandidatePartitions:
+    """
+    Filtered candidate matching over the full CandidateIndex.
+
+    At load time every categorical metadata column gets a value -> sorted row
+    ids map, and the candidate matrix is split by `PARTITION_COLUMN` into one
+    CandidateIndex per value. A query filtered only on that column searches
+    just the selected partitions' indexes and merges their top k; any other
+    filter combination intersects the row lists and scores only those rows.
+    Either way the work shrinks with the filter, and results (scores and
+    tie order) match scoring every candidate and dropping the rest.
+    """
+
+    def __init__(self, df_candidates, candidate_matrix, index=None, partition_column=PARTITION_COLUMN, columns=None):
+        # `columns`: filterable columns to use as-is (e.g. another block's), instead of detecting them
+        if len(df_candidates) != candidate_matrix.shape[0]:
+            raise ValueError(
+                f"Candidate metadata has {len(df_candidates)} rows but the matrix has {candidate_matrix.shape[0]}"
+            )
+        self.index = index if index is not None else CandidateIndex(candidate_matrix)
+        self.n_candidates = len(df_candidates)
+
+        # column -> {value: sorted row ids}
+        self.rows = {}
+        for column in (df_candidates.columns if columns is None else columns):
+            values = df_candidates[column]
+            if columns is None:
+                # pandas >= 3 reads text columns as `str` dtype rather than object
+                if not (isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(values)):
+                    continue
+                n_values = values.nunique(dropna=True)
+                if n_values == 0 or n_values > MAX_FILTER_VALUES or n_values * 2 > len(values):
+                    continue
+            groups = values.groupby(values, observed=True, sort=False).indices
+            self.rows[column] = {str(value): np.asarray(rows, dtype=np.int64) for value, rows in groups.items()}
+
+        self.partition_column = partition_column if partition_column in self.rows else None
+        self.partitions = {}
+        if self.partition_column:
+            for value, rows in self.rows[self.partition_column].items():
+                self.partitions[value] = (rows, CandidateIndex(self.index.matrix[rows], normalized=True))
+
+    @property
+    def columns(self):
+        return list(self.rows)
+
+    def select(self, filters):
+        """
+        Sorted row ids matching every filter ({column: value or [values]}).
+        Raises ValueError for columns that cannot be filtered on.
+        """
+        selected = None
+        for column, wanted in filters.items():
+            if column not in self.rows:
+                raise ValueError(f"Cannot filter on {column!r}; filterable columns: {', '.join(self.rows)}")
+            if isinstance(wanted, (str, int, float)):
+                wanted = [wanted]
+            parts = [self.rows[column][str(v)] for v in wanted if str(v) in self.rows[column]]
+            rows = np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+        return selected
+
+    def search(self, query_vec, k, filters=None):
+        """
+        Exact top-`k` (candidate indices, cosine scores) among candidates
+        matching `filters`, ordered like CandidateIndex.search.
+        """
+        k = max(0, int(k))
+        filters = {column: wanted for column, wanted in (filters or {}).items() if wanted not in (None, [], "")}
+        if not filters:
+            return self.index.search(query_vec, k)
+
+        if list(filters) == [self.partition_column]:
+            wanted = filters[self.partition_column]
+            values = {str(v) for v in ([wanted] if isinstance(wanted, (str, int, float)) else wanted)}
+            indices, scores = [np.zeros(0, dtype=np.int64)], [np.zeros(0)]
+            for value, (rows, partition) in self.partitions.items():
+                if value in values:
+                    # Rows are sorted, so local tie order maps onto global index order
+                    local, local_scores = partition.search(query_vec, k)
+                    indices.append(rows[local])
+                    scores.append(local_scores)
+            return top_k(np.concatenate(indices), np.concatenate(scores), k)
+
+        rows = self.select(filters)
+        return top_k(rows, self.index.score_candidates(query_vec, rows), k)
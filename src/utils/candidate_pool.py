@@ -0,0 +1,542 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from src.utils.candidate_index import CandidateIndex, top_k
+from src.utils.candidate_ivf import DEFAULT_NPROBE
+from src.utils.candidate_partitions import CandidatePartitions, PARTITION_COLUMN
+from src.utils.candidate_records import CandidateRecords
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no cross-process journal locking, so run a single worker there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Identifies a candidate for replacements and deletes
+ID_COLUMN = "Candidate ID"
+
+# Comma-separated skills, the text the TF-IDF matrix is built from
+SKILLS_COLUMN = "Skills"
+
+# Compact in the background once there are more segments than this...
+MAX_SEGMENTS = 8
+# ...or once this share of indexed rows are tombstones
+MAX_DELETED_RATIO = 0.1
+
+def candidate_text(df_candidates):
+    """Text vectorized per candidate, shared by training and live appends."""
+    return df_candidates[SKILLS_COLUMN].astype(str).str.replace(',', ' ')
+
+def _hash_ids(ids):
+    return pd.util.hash_array(np.asarray(ids, dtype=object).astype(str).astype(object))
+
+class CandidateSegment:
+    """
+    An immutable block of candidates: their inverted index, filter partitions
+    and pre-rendered result records, plus IVF lists for the block that has
+    them. Of the metadata only the IDs and filterable columns (categorical)
+    are kept, for deletes and for rebuilding partitions on compaction.
+    `origin` is each row's position in the trained matrix (-1 if appended).
+    """
+
+    def __init__(self, df, index, filter_columns=None, partition_column=PARTITION_COLUMN, ivf=None, records=None,
+                 origin=None):
+        df = df.reset_index(drop=True)
+        self.origin = np.full(len(df), -1, dtype=np.int64) if origin is None else np.asarray(origin, dtype=np.int64)
+        self.index = index
+        self.ivf = ivf
+        self.partitions = CandidatePartitions(
+            df, index.matrix, index=index, partition_column=partition_column, columns=filter_columns
+        )
+        self.records = records if records is not None else CandidateRecords.from_frame(df)
+        # 64-bit hashes rather than the ID strings themselves; hits are confirmed against the records
+        self.id_hashes = pd.Index(_hash_ids(df[ID_COLUMN].astype(str)) if ID_COLUMN in df else np.zeros(0, dtype=np.uint64))
+        self.filters = pd.DataFrame({column: df[column].astype("category") for column in self.partitions.columns})
+
+    def __len__(self):
+        return len(self.records)
+
+    def rows_of(self, ids):
+        """Local rows holding any of `ids`."""
+        if len(self.id_hashes) == 0 or len(ids) == 0:
+            return np.zeros(0, dtype=np.int64)
+        rows = self.id_hashes.get_indexer_for(pd.Index(_hash_ids(ids)))
+        rows = np.unique(rows[rows >= 0])
+        wanted = set(str(i) for i in ids)
+        return rows[[str(value) in wanted for value in self.records.field_values(ID_COLUMN, rows)]].astype(np.int64)
+
+    def frame(self, rows):
+        """IDs and filterable columns of `rows`, enough to rebuild a segment around its records."""
+        frame = self.filters.take(rows).reset_index(drop=True)
+        frame.insert(0, ID_COLUMN, self.records.field_values(ID_COLUMN, rows))
+        return frame
+
+class PoolSnapshot:
+    """
+    A consistent, read-only view of the pool: its segments and a tombstone
+    mask per segment. Rows are numbered across segments in order (tombstoned
+    rows keep their numbers), so results from one snapshot map back through
+    its own `fragments`.
+    """
+
+    def __init__(self, segments, deleted):
+        self.segments = tuple(segments)
+        self.deleted = tuple(deleted)
+        self.n_deleted = tuple(int(mask.sum()) for mask in self.deleted)
+        self.offsets = np.concatenate([[0], np.cumsum([len(segment) for segment in self.segments])]).astype(np.int64)
+
+    @property
+    def n_rows(self):
+        return int(self.offsets[-1])
+
+    def __len__(self):
+        return self.n_rows - sum(self.n_deleted)
+
+    @property
+    def has_ivf(self):
+        return any(segment.ivf is not None for segment in self.segments)
+
+    def fragments(self, rows):
+        """Pre-rendered JSON records of the given rows, in order (see CandidateRecords)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        owner = np.searchsorted(self.offsets, rows, side="right") - 1
+        return [
+            self.segments[s].records.fragment(row - self.offsets[s])
+            for s, row in zip(owner.tolist(), rows.tolist())
+        ]
+
+    def _merge(self, results, k):
+        # Each segment returned its top k + (its tombstones); dropping those leaves at least its live top k
+        indices, scores = [np.zeros(0, dtype=np.int64)], [np.zeros(0)]
+        for s, (local, local_scores) in enumerate(results):
+            live = ~self.deleted[s][local]
+            indices.append(local[live] + self.offsets[s])
+            scores.append(local_scores[live])
+        return top_k(np.concatenate(indices), np.concatenate(scores), k)
+
+    def search(self, query_vec, k, filters=None):
+        """
+        Exact top-`k` (rows, cosine scores) over live candidates matching
+        `filters`; same scores and tie order as one index over the live rows.
+        """
+        k = max(0, int(k))
+        return self._merge([
+            segment.partitions.search(query_vec, k + n_deleted, filters)
+            for segment, n_deleted in zip(self.segments, self.n_deleted)
+        ], k)
+
+    def search_approx(self, query_vec, k, nprobe=DEFAULT_NPROBE):
+        """
+        IVF search where a segment has lists (exact elsewhere).
+        Returns (rows, cosine scores, candidates scored).
+        """
+        k = max(0, int(k))
+        results, n_scored = [], 0
+        for segment, n_deleted in zip(self.segments, self.n_deleted):
+            if segment.ivf is not None:
+                indices, scores, scored = segment.ivf.search(segment.index, query_vec, k + n_deleted, nprobe)
+            else:
+                indices, scores, scored = segment.index.search_with_stats(query_vec, k + n_deleted)
+            results.append((indices, scores))
+            n_scored += scored
+        return self._merge(results, k) + (n_scored,)
+
+    def search_batch(self, query_matrix, k):
+        """Exact top-`k` for every query row, yielded in order as (row, rows, cosine scores)."""
+        k = max(0, int(k))
+        streams = [
+            segment.index.search_batch(query_matrix, k + n_deleted)
+            for segment, n_deleted in zip(self.segments, self.n_deleted)
+        ]
+        for per_segment in zip(*streams):
+            yield (per_segment[0][0],) + self._merge([(indices, scores) for _, indices, scores in per_segment], k)
+
+class CandidatePool:
+    """
+    The live candidate set: the trained TF-IDF matrix plus candidates added
+    or removed since, without refitting the vectorizer.
+
+    Added candidates are transformed with the trained vocabulary (skills it
+    has never seen do not count until the next retrain) and become a new
+    segment with its own index; an added Candidate ID replaces any earlier
+    row with that ID. Deletes only tombstone rows. Writers publish a new
+    `snapshot` under a lock while searches keep reading the one they took,
+    so ingestion never blocks search. Once segments or tombstones pile up, a
+    background thread merges everything into one segment and swaps it in.
+
+    With `journal_path`, every change is appended there and replayed on load,
+    so updates survive restarts. The journal is also how worker processes
+    sharing it see each other's updates: a writer first applies what others
+    appended since it last read, and `latest()` does the same whenever the
+    file changed (one stat otherwise). Reads and writes of the journal hold
+    an flock on `<journal>.lock`, never the snapshot lock; without fcntl
+    (Windows) only one process may use a journal.
+
+    The journal starts with `base_version` (the trained matrix's hash) and
+    is discarded once that no longer matches, i.e. after the candidates are
+    retrained. Compaction rewrites it, after catching up, as one checkpoint:
+    the live appended candidates plus the trained rows deleted, so it stays
+    proportional to the changes rather than their history. Processes that
+    had applied part of that history reconcile with the checkpoint.
+    """
+
+    def __init__(self, vectorizer, df_candidates, candidate_matrix, index=None, ivf=None, journal_path=None,
+                 base_version=""):
+        if len(df_candidates) != candidate_matrix.shape[0]:
+            raise ValueError(
+                f"Candidate metadata has {len(df_candidates)} rows but the matrix has {candidate_matrix.shape[0]}"
+            )
+        self.vectorizer = vectorizer
+        base = CandidateSegment(
+            df_candidates, index if index is not None else CandidateIndex(candidate_matrix), ivf=ivf,
+            origin=np.arange(len(df_candidates)),
+        )
+        self.columns = list(df_candidates.columns)
+        self.n_trained = len(df_candidates)
+        self.filter_columns = base.partitions.columns
+        self.partition_column = base.partitions.partition_column or PARTITION_COLUMN
+        self.snapshot = PoolSnapshot([base], [np.zeros(len(base), dtype=bool)])
+
+        self._lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._compactor = None
+        self._auto_compact = False
+        self.base_version = str(base_version)
+        self.journal_path = journal_path
+        # How far this pool has applied the journal: the file's token, bytes read,
+        # (inode, bytes) last seen, and changes appended since the file's checkpoint
+        self._journal_token = None
+        self._journal_offset = 0
+        self._journal_seen = None
+        self._pending = 0
+        if journal_path:
+            with self._journal():
+                self._catch_up(loading=True)
+        # Leaves one segment and, if anything was replayed, a fresh checkpoint
+        self.compact()
+        self._auto_compact = True
+
+    def _segment(self, df, index, ivf=None, records=None, origin=None):
+        return CandidateSegment(
+            df, index, self.filter_columns, self.partition_column, ivf=ivf, records=records, origin=origin
+        )
+
+    def latest(self):
+        """The current snapshot, including updates other processes have journaled."""
+        if self.journal_path and self._journal_changed():
+            with self._journal():
+                self._catch_up()
+            self._maybe_compact()
+        return self.snapshot
+
+    def stats(self):
+        snapshot = self.latest()
+        return {
+            "candidates": len(snapshot),
+            "segments": len(snapshot.segments),
+            "tombstones": sum(snapshot.n_deleted),
+            "compacting": self._compactor is not None and self._compactor.is_alive(),
+        }
+
+    def _frame(self, candidates):
+        df = candidates if isinstance(candidates, pd.DataFrame) else pd.DataFrame(list(candidates))
+        if len(df) == 0:
+            return df
+        for column in (ID_COLUMN, SKILLS_COLUMN):
+            if column not in df or df[column].isna().any():
+                raise ValueError(f"Every candidate needs a {column!r}")
+        return df.drop_duplicates(ID_COLUMN, keep="last").reindex(columns=self.columns)
+
+    def _build(self, df):
+        return self._segment(df, CandidateIndex(self.vectorizer.transform(candidate_text(df))))
+
+    def add(self, candidates):
+        """
+        Adds candidates (dicts or a DataFrame with a Candidate ID and Skills),
+        replacing any with the same ID. Returns how many were added.
+        """
+        df = self._frame(candidates)
+        if len(df) == 0:
+            return 0
+        # Vectorizing and indexing happen before any lock; publishing is a pointer swap
+        segment = self._build(df)
+        if not self.journal_path:
+            self._publish(df, segment)
+        else:
+            entry = {"op": "add", "candidates": df.astype(object).where(df.notna(), None).to_dict(orient="records")}
+            with self._journal():
+                # Other processes' earlier updates go first, in journal order
+                self._catch_up()
+                self._publish(df, segment)
+                self._append(entry)
+        self._maybe_compact()
+        return len(df)
+
+    def delete(self, ids):
+        """Tombstones every candidate with one of `ids`. Returns how many were removed."""
+        ids = [str(i) for i in ids]
+        if not self.journal_path:
+            removed = self._delete(ids)
+        else:
+            with self._journal():
+                self._catch_up()
+                removed = self._delete(ids)
+                if removed:
+                    self._append({"op": "delete", "ids": ids})
+        self._maybe_compact()
+        return removed
+
+    def _publish(self, df, segment):
+        with self._lock:
+            snapshot = self.snapshot
+            deleted = self._tombstone(snapshot, df[ID_COLUMN].astype(str).tolist())[0] + [np.zeros(len(segment), dtype=bool)]
+            self.snapshot = PoolSnapshot(snapshot.segments + (segment,), deleted)
+
+    def _delete(self, ids):
+        with self._lock:
+            snapshot = self.snapshot
+            deleted, removed = self._tombstone(snapshot, ids)
+            if removed:
+                self.snapshot = PoolSnapshot(snapshot.segments, deleted)
+        return removed
+
+    @staticmethod
+    def _tombstone(snapshot, ids):
+        # Masks are shared between snapshots, so a segment's mask is copied before it changes
+        deleted, removed = list(snapshot.deleted), 0
+        for s, segment in enumerate(snapshot.segments):
+            rows = segment.rows_of(ids)
+            rows = rows[~deleted[s][rows]]
+            if len(rows):
+                deleted[s] = deleted[s].copy()
+                deleted[s][rows] = True
+                removed += len(rows)
+        return deleted, removed
+
+    # --- Journal ---
+
+    @contextmanager
+    def _journal(self):
+        """Holds the journal against other threads and, where fcntl exists, other processes."""
+        with self._journal_lock, open(f"{self.journal_path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                # Released when the file is closed
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def _journal_changed(self):
+        try:
+            stat = os.stat(self.journal_path)
+        except OSError:
+            return self._journal_token is not None
+        return (stat.st_ino, stat.st_size) != self._journal_seen
+
+    def _header(self, token):
+        return json.dumps({"op": "base", "version": self.base_version, "token": token}) + "\n"
+
+    def _catch_up(self, loading=False):
+        """Applies what was journaled since this pool last read it (journal held)."""
+        try:
+            f = open(self.journal_path, "rb")
+        except FileNotFoundError:
+            self._journal_token, self._journal_offset, self._journal_seen = None, 0, None
+            return
+        with f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                header = {}
+            header = header if isinstance(header, dict) else {}
+            if header.get("version") != self.base_version:
+                if loading:
+                    logger.info(f"Discarding candidate journal {self.journal_path}: written against another trained matrix")
+                    f.close()
+                    os.remove(self.journal_path)
+                    return
+                # Written by workers that loaded retrained assets; this pool is about to be replaced
+                self._journal_offset = f.seek(0, os.SEEK_END)
+                data = b""
+            elif header.get("token") != self._journal_token or self._journal_offset == 0:
+                # New to this pool: first read, or rewritten by a checkpoint
+                self._journal_offset = f.tell()
+                data = f.read()
+            else:
+                f.seek(self._journal_offset)
+                data = f.read()
+            self._journal_token = header.get("token")
+            inode = os.fstat(f.fileno()).st_ino
+
+        # Appends are whole lines written under the lock; a torn tail waits for the next read
+        end = data.rfind(b"\n") + 1
+        self._journal_offset += end
+        self._journal_seen = (inode, self._journal_offset)
+        for line in data[:end].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Skipping candidate journal entry in {self.journal_path}: {e}")
+            # Keeps loading linear: every add and delete scans at most MAX_SEGMENTS segments
+            if loading and self._needs_compaction(self.snapshot):
+                self._merge()
+
+    def _apply(self, entry):
+        if entry["op"] == "checkpoint":
+            self._apply_checkpoint(entry)
+            self._pending = 0
+        elif entry["op"] == "add":
+            df = self._frame(entry["candidates"])
+            if len(df):
+                self._publish(df, self._build(df))
+            self._pending += 1
+        elif entry["op"] == "delete":
+            self._delete([str(i) for i in entry["ids"]])
+            self._pending += 1
+
+    def _apply_checkpoint(self, entry):
+        """Brings the pool to the checkpointed state, from fresh or from part of its history."""
+        deleted_rows = np.asarray(entry["deleted_rows"], dtype=np.int64)
+        wanted = {str(candidate[ID_COLUMN]): candidate for candidate in entry["candidates"]}
+        current = {str(candidate[ID_COLUMN]): candidate for candidate in self._changes(self.snapshot)[1]}
+        with self._lock:
+            snapshot = self.snapshot
+            deleted = list(snapshot.deleted)
+            for s, segment in enumerate(snapshot.segments):
+                rows = np.flatnonzero(np.isin(segment.origin, deleted_rows) & ~deleted[s])
+                if len(rows):
+                    deleted[s] = deleted[s].copy()
+                    deleted[s][rows] = True
+            self.snapshot = PoolSnapshot(snapshot.segments, deleted)
+        stale = [candidate_id for candidate_id in current if candidate_id not in wanted]
+        if stale:
+            self._delete(stale)
+        same = lambda a, b: json.dumps(a, sort_keys=True, default=str) == json.dumps(b, sort_keys=True, default=str)
+        changed = [candidate for candidate_id, candidate in wanted.items()
+                   if candidate_id not in current or not same(current[candidate_id], candidate)]
+        df = self._frame(changed)
+        if len(df):
+            self._publish(df, self._build(df))
+
+    def _append(self, entry):
+        """Appends one change (journal held and caught up)."""
+        if not os.path.exists(self.journal_path):
+            self._journal_token = uuid.uuid4().hex
+            with open(self.journal_path, "w", encoding="utf-8") as f:
+                f.write(self._header(self._journal_token))
+        with open(self.journal_path, "ab") as f:
+            f.write((json.dumps(entry, default=str) + "\n").encode("utf-8"))
+            self._journal_offset = f.tell()
+            self._journal_seen = (os.fstat(f.fileno()).st_ino, self._journal_offset)
+        self._pending += 1
+
+    def _changes(self, snapshot):
+        """(trained rows deleted, live appended candidates as dicts) of `snapshot`."""
+        candidates, kept = [], []
+        for segment, mask in zip(snapshot.segments, snapshot.deleted):
+            live = np.flatnonzero(~mask)
+            kept.append(segment.origin[live][segment.origin[live] >= 0])
+            appended = live[segment.origin[live] < 0]
+            if len(appended):
+                frame = segment.frame(appended)
+                for field in segment.records.fields:
+                    frame[field] = segment.records.field_values(field, appended)
+                candidates += frame.astype(object).where(frame.notna(), None).to_dict(orient="records")
+        return np.setdiff1d(np.arange(self.n_trained), np.concatenate(kept)), candidates
+
+    def _checkpoint(self):
+        """Rewrites the journal as the pool's changes relative to the trained matrix."""
+        with self._journal():
+            self._catch_up()
+            if not self._pending:
+                return
+            deleted, candidates = self._changes(self.snapshot)
+            token = uuid.uuid4().hex
+            tmp_path = f"{self.journal_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self._header(token))
+                f.write(json.dumps({"op": "checkpoint", "deleted_rows": deleted.tolist(), "candidates": candidates}, default=str) + "\n")
+            os.replace(tmp_path, self.journal_path)
+            stat = os.stat(self.journal_path)
+            self._journal_token, self._journal_offset, self._pending = token, stat.st_size, 0
+            self._journal_seen = (stat.st_ino, stat.st_size)
+
+    # --- Compaction ---
+
+    @staticmethod
+    def _needs_compaction(snapshot):
+        return len(snapshot.segments) > MAX_SEGMENTS or sum(snapshot.n_deleted) > MAX_DELETED_RATIO * snapshot.n_rows
+
+    def _compact_while_needed(self):
+        # Updates made during one merge may already call for the next
+        while self._needs_compaction(self.snapshot):
+            self.compact()
+
+    def _maybe_compact(self):
+        if not self._auto_compact or not self._needs_compaction(self.snapshot):
+            return
+        with self._lock:
+            if self._compactor is None or not self._compactor.is_alive():
+                self._compactor = threading.Thread(target=self._compact_while_needed, name="candidate-compaction", daemon=True)
+                self._compactor.start()
+
+    def compact(self):
+        """
+        Merges every segment into one without tombstoned rows, then
+        checkpoints the journal. Searches and updates keep running meanwhile;
+        changes made during the merge are carried over when it is swapped in.
+        """
+        self._merge()
+        if self.journal_path and self._pending:
+            try:
+                self._checkpoint()
+            except OSError as e:
+                logger.warning(f"Could not checkpoint candidate journal {self.journal_path}: {e}")
+
+    def _merge(self):
+        with self._compact_lock:
+            snapshot = self.snapshot
+            if len(snapshot.segments) == 1 and not snapshot.n_deleted[0]:
+                return
+            start = time.perf_counter()
+            live = [np.flatnonzero(~mask) for mask in snapshot.deleted]
+            df = pd.concat([segment.frame(rows) for segment, rows in zip(snapshot.segments, live)], ignore_index=True)
+            blocks = [segment.index.matrix[rows] for segment, rows in zip(snapshot.segments, live)]
+            index = CandidateIndex(sp.vstack(blocks, format="csr"), normalized=True)
+            ivf = None
+            if snapshot.segments[0].ivf is not None:
+                # Trained lists keep their centroids; appended candidates join the closest list
+                appended = sp.vstack(blocks[1:], format="csr") if len(blocks) > 1 else blocks[0][:0]
+                ivf = snapshot.segments[0].ivf.compact(live[0], appended)
+            records = CandidateRecords.concat([segment.records for segment in snapshot.segments], live)
+            origin = np.concatenate([segment.origin[rows] for segment, rows in zip(snapshot.segments, live)])
+            merged = self._segment(df, index, ivf=ivf, records=records, origin=origin)
+            # Where each old row landed in the merged segment (-1 if it was dropped)
+            positions, next_row = [], 0
+            for segment, rows in zip(snapshot.segments, live):
+                position = np.full(len(segment), -1, dtype=np.int64)
+                position[rows] = np.arange(next_row, next_row + len(rows))
+                positions.append(position)
+                next_row += len(rows)
+
+            with self._lock:
+                current = self.snapshot
+                n_merged = len(snapshot.segments)
+                mask = np.zeros(len(merged), dtype=bool)
+                for s in range(n_merged):
+                    # Deleted while merging: still present in the merged rows
+                    mask[positions[s][current.deleted[s] & ~snapshot.deleted[s]]] = True
+                self.snapshot = PoolSnapshot((merged,) + current.segments[n_merged:], [mask] + list(current.deleted[n_merged:]))
+            logger.info(f"Compacted {n_merged} candidate segments into {len(merged)} rows in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+# Fields returned per matched candidate, in the sorted key order jsonify used for them
+CANDIDATE_FIELDS = ("Candidate ID", "Email", "Experience Level", "Name", "Skills")
+
+def render_records(fragments, similarities):
+    """A JSON array (bytes) of pre-rendered candidates, each closed with its 0-100 score."""
+    scores = np.round(np.asarray(similarities, dtype=np.float64) * 100, 1).tolist()
+    return b"[" + b",".join(fragment + repr(score).encode() + b"}" for fragment, score in zip(fragments, scores)) + b"]"
+
+def _packed(values):
+    """(buffer, offsets) holding byte strings back to back."""
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    return b"".join(values), np.concatenate([[0], np.cumsum(lengths)])
+
+class RenderedColumn:
+    """
+    One field's values, already serialized as JSON. Repetitive fields are
+    dictionary-encoded (each distinct value stored once, rows hold the
+    smallest integer code that fits); mostly-unique fields are stored back
+    to back in one buffer, indexed by offsets.
+    """
+
+    def __init__(self, buffer, offsets, codes=None):
+        self.buffer = buffer
+        self.offsets = offsets
+        self.codes = codes
+
+    @classmethod
+    def build(cls, rendered, codes):
+        # `rendered`: distinct JSON values, `codes`: each row's position in it
+        if len(rendered) * 2 <= len(codes):
+            buffer, offsets = _packed(rendered)
+            return cls(buffer, offsets, codes.astype(np.min_scalar_type(max(len(rendered) - 1, 0))))
+        return cls(*_packed([rendered[code] for code in codes.tolist()]))
+
+    @classmethod
+    def from_values(cls, values):
+        codes, uniques = pd.factorize(values)
+        # Missing values (code -1) become null, the last entry
+        rendered = [json.dumps(value).encode("ascii") for value in uniques.tolist()] + [b"null"]
+        return cls.build(rendered, np.where(codes < 0, len(rendered) - 1, codes))
+
+    @classmethod
+    def from_rendered(cls, rendered):
+        codes, uniques = pd.factorize(np.array(rendered, dtype=object))
+        return cls.build(uniques.tolist(), codes)
+
+    def __len__(self):
+        return len(self.codes) if self.codes is not None else len(self.offsets) - 1
+
+    def value(self, row):
+        i = self.codes[row] if self.codes is not None else row
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]]
+
+    def values(self, rows):
+        return [self.value(row) for row in rows]
+
+class CandidateRecords:
+    """
+    Pre-serialized candidate results, one RenderedColumn per returned field.
+
+    Every value is JSON-encoded once at load time, so a response only splices
+    the matched rows' values between the field names and appends each score;
+    serving results needs no DataFrame, and the object strings behind one are
+    not kept per worker.
+    """
+
+    def __init__(self, columns, fields=CANDIDATE_FIELDS):
+        self.columns = list(columns)
+        self.fields = tuple(fields)
+        self.prefixes = [(b"," if i else b"{") + json.dumps(field).encode("ascii") + b":" for i, field in enumerate(fields)]
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    @classmethod
+    def from_frame(cls, df, fields=CANDIDATE_FIELDS):
+        return cls([
+            RenderedColumn.from_values(df[field] if field in df else pd.Series([None] * len(df), dtype=object))
+            for field in fields
+        ], fields)
+
+    def field_values(self, field, rows):
+        """Decoded values of one field for `rows`."""
+        column = self.columns[self.fields.index(field)]
+        return [json.loads(value) for value in column.values(np.asarray(rows).tolist())]
+
+    def fragment(self, row):
+        """The row's JSON object up to and including `"score":`."""
+        return b"".join(prefix + column.value(row) for prefix, column in zip(self.prefixes, self.columns)) + b',"score":'
+
+    @classmethod
+    def concat(cls, stores, rows):
+        """Records of `rows[i]` from `stores[i]`, in order, as one store."""
+        stores = list(stores)
+        fields = stores[0].fields
+        return cls([
+            RenderedColumn.from_rendered([
+                value for store, store_rows in zip(stores, rows) for value in store.columns[i].values(store_rows.tolist())
+            ])
+            for i in range(len(fields))
+        ], fields)
@@ -0,0 +1,343 @@
+import os
+import json
+import uuid
+import shutil
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: publishes are serialized within one process only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes; older copies are ignored and rebuilt
+FORMAT_VERSION = 1
+CODE_DTYPE = np.dtype("<i4")
+
+# Names the published version inside a dataset directory; swapped by one rename
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "v"
+
+_publish_lock = threading.Lock()
+
+def columnar_path(csv_path):
+    """
+    The converted copy of `data/foo.csv` lives in the directory `data/foo.cols`,
+    as one subdirectory per published version plus a CURRENT file naming the
+    live one.
+    """
+    return os.path.splitext(csv_path)[0] + ".cols"
+
+def current_version(target_dir):
+    """Returns the directory of the published version in `target_dir`, or None."""
+    try:
+        with open(os.path.join(target_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(target_dir, name) if name else None
+
+def source_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _is_numeric(series):
+    return pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series)
+
+class ColumnarWriter:
+    """
+    Appends DataFrame chunks to a columnar dataset directory.
+
+    Numeric columns are written as raw fixed-width little-endian arrays and
+    string columns as int32 codes into a per-column dictionary. Column types
+    are taken from the first chunk; int columns are widened to float if a
+    later chunk needs it (e.g. NaNs), anything else that changes type raises.
+    """
+
+    def __init__(self, target_dir):
+        self.target_dir = target_dir
+        os.makedirs(target_dir, exist_ok=True)
+        self.rows = 0
+        self.columns = None
+
+    def _file(self, index, suffix):
+        return os.path.join(self.target_dir, f"c{index}.{suffix}")
+
+    def _init_columns(self, chunk):
+        self.columns = []
+        for i, name in enumerate(chunk.columns):
+            series = chunk[name]
+            if _is_numeric(series):
+                dtype = np.dtype("|b1") if pd.api.types.is_bool_dtype(series) else series.to_numpy().dtype.newbyteorder("<")
+                col = {"name": name, "kind": "numeric", "dtype": dtype.str, "file": f"c{i}.bin"}
+            else:
+                col = {"name": name, "kind": "dict", "file": f"c{i}.codes", "dictionary": f"c{i}.dict.json"}
+            col["all_null"] = True
+            col["_lookup"] = {}
+            self.columns.append(col)
+
+    def _widen_to_float(self, index, col):
+        path = self._file(index, "bin")
+        values = np.fromfile(path, dtype=np.dtype(col["dtype"])).astype("<f8")
+        values.tofile(path)
+        col["dtype"] = np.dtype("<f8").str
+
+    def _switch_to_dict(self, index, col):
+        # A column that has only seen NaNs so far can still become a string column
+        os.remove(self._file(index, "bin"))
+        np.full(self.rows, -1, dtype=CODE_DTYPE).tofile(self._file(index, "codes"))
+        col.update({"kind": "dict", "file": f"c{index}.codes", "dictionary": f"c{index}.dict.json"})
+        col.pop("dtype", None)
+
+    def _append_numeric(self, index, col, series):
+        dtype = np.dtype(col["dtype"])
+        values = series.to_numpy()
+        if dtype.kind in "iub" and values.dtype.kind == "f":
+            self._widen_to_float(index, col)
+            dtype = np.dtype(col["dtype"])
+        with open(self._file(index, "bin"), "ab") as f:
+            f.write(values.astype(dtype).tobytes())
+
+    def _append_codes(self, index, col, series):
+        codes, uniques = pd.factorize(series)
+        lookup = col["_lookup"]
+        remap = np.empty(len(uniques) + 1, dtype=CODE_DTYPE)
+        remap[-1] = -1  # factorize marks missing values with -1
+        for j, value in enumerate(uniques):
+            remap[j] = lookup.setdefault(str(value), len(lookup))
+        with open(self._file(index, "codes"), "ab") as f:
+            f.write(remap[codes].tobytes())
+
+    def append(self, chunk):
+        if self.columns is None:
+            self._init_columns(chunk)
+        if list(chunk.columns) != [c["name"] for c in self.columns]:
+            raise ValueError("Chunk columns do not match the dataset header")
+
+        for i, col in enumerate(self.columns):
+            series = chunk[col["name"]]
+            chunk_null = bool(series.isna().all())
+            if col["kind"] == "numeric":
+                if not _is_numeric(series):
+                    if not col["all_null"]:
+                        raise ValueError(f"Column {col['name']!r} changed from numeric to text")
+                    self._switch_to_dict(i, col)
+                    self._append_codes(i, col, series)
+                else:
+                    self._append_numeric(i, col, series)
+            else:
+                self._append_codes(i, col, series)
+            col["all_null"] = col["all_null"] and chunk_null
+        self.rows += len(chunk)
+
+    def close(self, source=None):
+        for i, col in enumerate(self.columns or []):
+            if col["kind"] == "dict":
+                dictionary = sorted(col["_lookup"], key=col["_lookup"].get)
+                with open(self._file(i, "dict.json"), "w", encoding="utf-8") as f:
+                    json.dump(dictionary, f)
+        meta = {
+            "version": FORMAT_VERSION,
+            "rows": self.rows,
+            "source": source,
+            "columns": [
+                {k: v for k, v in col.items() if not k.startswith("_") and k != "all_null"}
+                for col in (self.columns or [])
+            ],
+        }
+        with open(os.path.join(self.target_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+@contextmanager
+def _publishing(target_dir):
+    """Holds `target_dir` against other publishing threads and, where fcntl exists, processes."""
+    with _publish_lock, open(os.path.join(target_dir, ".lock"), "a") as lock_file:
+        if fcntl is not None:
+            # Released when the file is closed
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        yield
+
+def publish(tmp_dir, target_dir):
+    """
+    Makes a freshly written dataset directory the current version of
+    `target_dir`. The version is moved in whole and the CURRENT pointer is
+    then replaced atomically, so readers resolve either the old or the new
+    version, never a missing or half-written one. The previous version is
+    kept for readers that resolved it just before the swap; older ones go.
+    """
+    if os.path.exists(os.path.join(target_dir, "meta.json")):
+        # Unversioned copy written before versions existed
+        shutil.rmtree(target_dir, ignore_errors=True)
+    os.makedirs(target_dir, exist_ok=True)
+    with _publishing(target_dir):
+        previous = current_version(target_dir)
+        name = f"{VERSION_PREFIX}{uuid.uuid4().hex}"
+        os.replace(tmp_dir, os.path.join(target_dir, name))
+        fd, tmp_pointer = tempfile.mkstemp(dir=target_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(tmp_pointer, os.path.join(target_dir, CURRENT_FILE))
+
+        keep = {name, os.path.basename(previous) if previous else None}
+        for entry in os.listdir(target_dir):
+            if entry.startswith(VERSION_PREFIX) and entry not in keep:
+                # Readers that still hold the old arrays mapped keep working after unlink
+                shutil.rmtree(os.path.join(target_dir, entry), ignore_errors=True)
+    return os.path.join(target_dir, name)
+
+def convert_csv(csv_path, chunksize=100_000):
+    """
+    Converts `csv_path` to the columnar format next to it.
+    Returns the published version directory, or None if the CSV could not be converted
+    (read-only location, column types that are not stable across chunks, ...).
+    """
+    target_dir = columnar_path(csv_path)
+    try:
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(csv_path)), suffix=".cols.tmp")
+    except OSError as e:
+        logger.warning(f"Cannot write columnar copy of {csv_path}: {e}")
+        return None
+
+    try:
+        source = source_signature(csv_path)
+        writer = ColumnarWriter(tmp_dir)
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            writer.append(chunk)
+        writer.close(source)
+        return publish(tmp_dir, target_dir)
+    except Exception as e:
+        logger.warning(f"Columnar conversion of {csv_path} failed: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return None
+
+def ensure_columnar(csv_path, chunksize=100_000):
+    """Returns a fresh columnar copy of `csv_path`, converting it first if needed."""
+    return fresh_columnar(csv_path) or convert_csv(csv_path, chunksize=chunksize)
+
+def read_meta(dataset_dir):
+    with open(os.path.join(dataset_dir, "meta.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def fresh_columnar(csv_path):
+    """
+    Returns the current version directory of the columnar copy of `csv_path`
+    if it matches the CSV, else None.
+    """
+    dataset_dir = current_version(columnar_path(csv_path))
+    if dataset_dir is None:
+        return None
+    try:
+        meta = read_meta(dataset_dir)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != FORMAT_VERSION:
+        return None
+    if os.path.exists(csv_path) and meta.get("source") != source_signature(csv_path):
+        return None
+    return dataset_dir
+
+def _map_array(path, dtype, rows):
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+
+def _load_dictionary(dataset_dir, col, dictionaries):
+    path = os.path.join(dataset_dir, col["dictionary"])
+    if dictionaries is not None and path in dictionaries:
+        return dictionaries[path]
+    with open(path, "r", encoding="utf-8") as f:
+        dictionary = json.load(f)
+    if dictionaries is not None:
+        dictionaries[path] = dictionary
+    return dictionary
+
+def _column_array(dataset_dir, col, dtype, rows, dictionaries):
+    path = os.path.join(dataset_dir, col["file"])
+    if dictionaries is not None and path in dictionaries:
+        return dictionaries[path]
+    array = _map_array(path, dtype, rows)
+    if dictionaries is not None:
+        dictionaries[path] = array
+    return array
+
+def _load_column(dataset_dir, col, rows, categorical, start=0, stop=None, dictionaries=None):
+    if col["kind"] == "numeric":
+        return _column_array(dataset_dir, col, np.dtype(col["dtype"]), rows, dictionaries)[start:stop]
+
+    # Slice the mapped codes first so only the requested rows get decoded
+    codes = _column_array(dataset_dir, col, CODE_DTYPE, rows, dictionaries)[start:stop]
+    dictionary = _load_dictionary(dataset_dir, col, dictionaries)
+    if categorical:
+        dtype = None if dictionaries is None else dictionaries.get((col["dictionary"], "dtype"))
+        if dtype is None:
+            dtype = pd.CategoricalDtype(dictionary)
+            if dictionaries is not None:
+                dictionaries[(col["dictionary"], "dtype")] = dtype
+        return pd.Categorical.from_codes(codes, dtype=dtype)
+    # Decoded strings share one object per distinct value; code -1 picks the trailing NaN
+    lookup = np.array(dictionary + [np.nan], dtype=object)
+    return lookup[codes]
+
+def read_columnar(dataset_dir, columns=None, categorical=True, start=0, stop=None, dictionaries=None):
+    """
+    Loads a columnar dataset as a DataFrame backed by memory-mapped arrays.
+    String columns come back as pandas Categoricals unless `categorical=False`.
+    `dictionaries` caches the metadata, mapped arrays and parsed dictionaries
+    between calls on the same dataset.
+    """
+    meta = None if dictionaries is None else dictionaries.get("meta.json")
+    if meta is None:
+        meta = read_meta(dataset_dir)
+        if dictionaries is not None:
+            dictionaries["meta.json"] = meta
+    rows = meta["rows"]
+    data = {}
+    for col in meta["columns"]:
+        if columns is not None and col["name"] not in columns:
+            continue
+        data[col["name"]] = _load_column(dataset_dir, col, rows, categorical, start, stop, dictionaries)
+    return pd.DataFrame(data, copy=False)
+
+def iter_columnar_chunks(dataset_dir, chunksize, columns=None, categorical=True):
+    meta = read_meta(dataset_dir)
+    rows = meta["rows"]
+    # Opened once and shared by every chunk, so the files may be unlinked by a
+    # later publish while the iteration is still running
+    dictionaries = {"meta.json": meta}
+    for start in range(0, rows, chunksize):
+        chunk = read_columnar(dataset_dir, columns=columns, categorical=categorical,
+                              start=start, stop=start + chunksize, dictionaries=dictionaries)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        yield chunk
+
+# --- Loader helpers shared by the API, training and the dashboard ---
+def dataset_columns(csv_path):
+    dataset_dir = fresh_columnar(csv_path)
+    if dataset_dir:
+        return [col["name"] for col in read_meta(dataset_dir)["columns"]]
+    return list(pd.read_csv(csv_path, nrows=0).columns)
+
+def load_dataset(csv_path, columns=None, categorical=True):
+    """Reads a dataset from its columnar copy when available, falling back to the CSV."""
+    dataset_dir = fresh_columnar(csv_path)
+    if dataset_dir:
+        try:
+            return read_columnar(dataset_dir, columns=columns, categorical=categorical)
+        except Exception as e:
+            logger.warning(f"Falling back to CSV for {csv_path}: {e}")
+    return pd.read_csv(csv_path, usecols=columns)
+
+def iter_dataset_chunks(csv_path, chunksize, columns=None):
+    """Yields DataFrame chunks from the columnar copy when available, else from the CSV."""
+    dataset_dir = fresh_columnar(csv_path)
+    if dataset_dir:
+        return iter_columnar_chunks(dataset_dir, chunksize, columns=columns)
+    return pd.read_csv(csv_path, chunksize=chunksize, usecols=columns)
@@ -0,0 +1,197 @@
+import os
+import json
+import hashlib
+import logging
+
+import numpy as np
+import scipy.sparse as sp
+
+logger = logging.getLogger(__name__)
+
+# Objectives whose prediction is the raw margin (no link function)
+IDENTITY_OBJECTIVES = ("reg:squarederror", "reg:squaredlogerror", "reg:pseudohubererror", "reg:absoluteerror")
+
+# CSR input is densified this many rows at a time, so a large batch never becomes rows x features
+SPARSE_BLOCK_ROWS = 4096
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def _parse_base_score(value):
+    # Newer xgboost stores a vector, e.g. '[3.419955E0]'
+    return float(str(value).strip("[]").split(",")[0])
+
+class CompiledTreeModel:
+    """
+    A gradient-boosted tree ensemble flattened into NumPy arrays.
+
+    All trees share one node table (feature, threshold, left child, default
+    direction for missing values, leaf value); a right child is always stored
+    right after its left sibling. Leaves point at themselves, so `predict` can
+    advance every (row, tree) pair one level per step for `max_depth` steps
+    without branching, then sum the leaves it landed on.
+    """
+
+    ARRAYS = ("feature", "threshold", "left", "default_left", "value", "roots")
+
+    def __init__(self, feature, threshold, left, default_left, value, roots,
+                 base_score, max_depth, n_features, objective="reg:squarederror", source_sha256="",
+                 sparse_features=False):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.base_score = np.float32(base_score)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.objective = str(objective)
+        self.source_sha256 = str(source_sha256)
+        # Trained on CSR input, where absent entries (zeros) were missing values
+        self.sparse_features = bool(sparse_features)
+
+    @classmethod
+    def from_booster(cls, booster, source_sha256=""):
+        """Exports an xgboost Booster (or XGBModel), keeping only trees up to `best_iteration`."""
+        if hasattr(booster, "get_booster"):
+            booster = booster.get_booster()
+        learner = json.loads(bytearray(booster.save_raw(raw_format="json")))["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in IDENTITY_OBJECTIVES:
+            raise ValueError(f"Unsupported objective {objective!r}")
+        gbm = learner["gradient_booster"]
+        if gbm["name"] != "gbtree":
+            raise ValueError(f"Unsupported booster {gbm['name']!r}")
+        model = gbm["model"]
+        if int(learner["learner_model_param"].get("num_target", 1)) != 1:
+            raise ValueError("Only single-target models can be compiled")
+
+        trees = model["trees"]
+        # Match XGBModel.predict, which stops at the early-stopping best iteration
+        best_iteration = booster.attributes().get("best_iteration")
+        if best_iteration is not None:
+            trees = trees[:model["iteration_indptr"][int(best_iteration) + 1]]
+
+        feature, threshold, left, default_left, value, roots = ([] for _ in range(6))
+        max_depth, offset = 0, 0
+        for tree in trees:
+            if any(tree["split_type"]):
+                raise ValueError("Categorical splits are not supported")
+            lc, rc = tree["left_children"], tree["right_children"]
+
+            # Renumber breadth-first so every right child directly follows its left sibling
+            order, depth = [0], [0]
+            for node, d in zip(order, depth):  # grows while iterating
+                if lc[node] != -1:
+                    order += [lc[node], rc[node]]
+                    depth += [d + 1, d + 1]
+            position = {node: i for i, node in enumerate(order)}
+
+            for node in order:
+                is_leaf = lc[node] == -1
+                # Leaves point at themselves and always go "left": nothing compares >= a NaN threshold
+                left.append(offset + (position[node] if is_leaf else position[lc[node]]))
+                feature.append(0 if is_leaf else tree["split_indices"][node])
+                threshold.append(np.nan if is_leaf else tree["split_conditions"][node])
+                default_left.append(True if is_leaf else bool(tree["default_left"][node]))
+                # Leaves keep their output in split_conditions
+                value.append(tree["split_conditions"][node] if is_leaf else 0.0)
+            roots.append(offset)
+            max_depth = max(max_depth, max(depth))
+            offset += len(order)
+
+        return cls(
+            feature, threshold, left, default_left, value, roots,
+            base_score=_parse_base_score(learner["learner_model_param"]["base_score"]),
+            max_depth=max_depth, n_features=int(learner["learner_model_param"]["num_feature"]),
+            objective=objective, source_sha256=source_sha256,
+            sparse_features=booster.attributes().get("sparse_features") == "1",
+        )
+
+    def predict(self, X):
+        if sp.issparse(X):
+            # Absent entries are missing values, as xgboost reads CSR input
+            X = sp.csr_matrix(X, dtype=np.float32)
+            if X.shape[1] != self.n_features:
+                raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+            out = np.empty(X.shape[0], dtype=np.float32)
+            for start in range(0, X.shape[0], SPARSE_BLOCK_ROWS):
+                block = X[start:start + SPARSE_BLOCK_ROWS]
+                dense = np.full(block.shape, np.nan, dtype=np.float32)
+                dense[np.repeat(np.arange(block.shape[0]), np.diff(block.indptr)), block.indices] = block.data
+                out[start:start + block.shape[0]] = self.predict(dense)
+            return out
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        n_rows = len(X)
+        flat = np.ascontiguousarray(X).ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.int64) * self.n_features)[:, None]
+        has_missing = bool(np.isnan(flat).any())
+        nodes = np.repeat(self.roots[None, :], n_rows, axis=0)
+        for _ in range(self.max_depth):
+            x = flat[row_offsets + self.feature[nodes]]
+            go_left = ~(x >= self.threshold[nodes])
+            if has_missing:
+                # A missing value passes the test above; keep it left only if the split defaults left
+                go_left &= ~np.isnan(x) | self.default_left[nodes]
+            nodes = self.left[nodes] + ~go_left
+
+        # Sum tree by tree in float32, the same order xgboost accumulates in
+        leaves = np.empty((n_rows, len(self.roots) + 1), dtype=np.float32)
+        leaves[:, 0] = self.base_score
+        leaves[:, 1:] = self.value[nodes]
+        return np.add.accumulate(leaves, axis=1)[:, -1]
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            **{name: getattr(self, name) for name in self.ARRAYS},
+            base_score=np.float32(self.base_score), max_depth=self.max_depth, n_features=self.n_features,
+            objective=np.str_(self.objective), source_sha256=np.str_(self.source_sha256),
+            sparse_features=self.sparse_features,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                *(data[name] for name in cls.ARRAYS),
+                base_score=data["base_score"], max_depth=data["max_depth"], n_features=data["n_features"],
+                objective=str(data["objective"]), source_sha256=str(data["source_sha256"]),
+                sparse_features=bool(data["sparse_features"]) if "sparse_features" in data.files else False,
+            )
+
+def compile_model_file(model_path, out_path):
+    """Exports a pickled XGBRegressor at `model_path` to a compiled `.npz` at `out_path`."""
+    import joblib
+    compiled = CompiledTreeModel.from_booster(joblib.load(model_path), source_sha256=file_sha256(model_path))
+    compiled.save(out_path)
+    return compiled
+
+def load_compiled_model(compiled_path, model_path):
+    """
+    Returns the compiled model if it exists and was exported from the current
+    `model_path`, otherwise None (the caller falls back to the pickled model).
+    """
+    if not os.path.exists(compiled_path):
+        return None
+    try:
+        compiled = CompiledTreeModel.load(compiled_path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable compiled model {compiled_path}: {e}")
+        return None
+    if os.path.exists(model_path) and compiled.source_sha256 != file_sha256(model_path):
+        logger.warning(f"Compiled model {compiled_path} is stale; re-run src/models/compile_model.py")
+        return None
+    return compiled
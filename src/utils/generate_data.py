@@ -102,31 +102,32 @@ def calculate_salary(title, exp, location):
     # Ensure minimum wage floor (e.g. 3 LPA)
     return max(int(final_salary), 300000)
 
-# Generate dataset
-num_rows = 5000
-data = []
+def generate_jobs(num_rows=5000):
+    """Builds the synthetic job postings table."""
+    data = []
+    for _ in range(num_rows):
+        title = random.choice(job_titles)
+        exp = random.choice(experience_levels)
+        loc = random.choice(locations)
+        comp = random.choice(companies)
+        skills = generate_skills(title)
+        salary = calculate_salary(title, exp, loc)
 
-for _ in range(num_rows):
-    title = random.choice(job_titles)
-    exp = random.choice(experience_levels)
-    loc = random.choice(locations)
-    comp = random.choice(companies)
-    skills = generate_skills(title)
-    salary = calculate_salary(title, exp, loc)
-    
-    data.append({
-        "role": title,
-        "company": comp,
-        "location": loc,
-        "experience_years": random.randint(1, 15) if exp != "Entry-level" else random.randint(0, 2),
-        "skills": skills,
-        "salary_lpa": round(salary / 100000, 2), # Correct conversion: 15,00,000 -> 15.0 LPA
-        "post_date": pd.Timestamp.now() - pd.Timedelta(days=random.randint(0, 90))
-    })
+        data.append({
+            "role": title,
+            "company": comp,
+            "location": loc,
+            "experience_years": random.randint(1, 15) if exp != "Entry-level" else random.randint(0, 2),
+            "skills": skills,
+            "salary_lpa": round(salary / 100000, 2), # Correct conversion: 15,00,000 -> 15.0 LPA
+            "post_date": pd.Timestamp.now() - pd.Timedelta(days=random.randint(0, 90))
+        })
+    return pd.DataFrame(data)
 
-df = pd.DataFrame(data)
+if __name__ == "__main__":
+    df = generate_jobs(5000)
 
-# Save to CSV - matching the file expected by train.py
-os.makedirs("data", exist_ok=True)
-df.to_csv("data/job_market_analytics_dataset.csv", index=False)
-print("Synthetic dataset generated and saved to data/job_market_analytics_dataset.csv")
+    # Save to CSV - matching the file expected by train.py
+    os.makedirs("data", exist_ok=True)
+    df.to_csv("data/job_market_analytics_dataset.csv", index=False)
+    print("Synthetic dataset generated and saved to data/job_market_analytics_dataset.csv")
@@ -0,0 +1,495 @@
+import os
+import itertools
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from src.utils.salary_cube import SalaryCube
+
+# --- Column Detection ---
+COLUMN_KEYWORDS = {
+    "role": ['role', 'job role', 'title', 'job title', 'position', 'job name'],
+    "salary": ['salary', 'salary_lpa', 'compensation', 'package', 'pay', 'ctc'],
+    "skills": ['skills', 'skillset', 'technologies', 'requirements', 'stacks'],
+    "experience": ['experience', 'exp', 'years of experience', 'years', 'tenure'],
+    "location": ['location', 'city', 'job location', 'office', 'region', 'country'],
+}
+
+def find_best_col(cols_orig, keywords):
+    """Robust column detection (fuzzy matching) over a list of column names."""
+    # 1. Exact or close match (ignoring case/spaces/underscores)
+    for col in cols_orig:
+        clean_col = col.lower().replace('_', '').replace(' ', '')
+        for k in keywords:
+            clean_k = k.lower().replace('_', '').replace(' ', '')
+            if clean_col == clean_k:
+                return col
+    # 2. Substring match
+    for col in cols_orig:
+        clean_col = col.lower().replace('_', '').replace(' ', '')
+        for k in keywords:
+            clean_k = k.lower().replace('_', '').replace(' ', '')
+            if clean_k in clean_col or clean_col in clean_k:
+                return col
+    return None
+
+def resolve_mapping(columns, custom_mapping=None):
+    """Returns the effective column mapping: user overrides first, then fuzzy detection."""
+    custom_mapping = custom_mapping or {}
+    cols_orig = list(columns)
+    return {
+        key: custom_mapping.get(key) or find_best_col(cols_orig, keywords)
+        for key, keywords in COLUMN_KEYWORDS.items()
+    }
+
+# --- Role Normalization ---
+STANDARD_ROLES = [
+    "Data Scientist", "ML Engineer", "Software Engineer", "Data Analyst",
+    "Backend Developer", "Frontend Developer", "Full Stack Developer",
+    "DevOps Engineer", "Cloud Architect", "AI Researcher", "Data Engineer",
+    "Product Manager (Tech)", "UX Designer", "Cybersecurity Analyst",
+    "Blockchain Developer", "Mobile App Developer", "Embedded Systems Engineer",
+    "QA Automation Engineer", "NOC Engineer", "Solutions Architect",
+    "Technical Support Engineer", "Database Administrator", "Systems Analyst",
+    "Game Developer", "AR/VR Developer", "Big Data Engineer", "Scrum Master",
+    "Site Reliability Engineer", "Computer Vision Engineer", "NLP Scientist"
+]
+
+class RoleNormalizer:
+    """
+    Maps free-text job titles onto STANDARD_ROLES by token overlap.
+
+    Standard-role tokens are indexed once (token -> role positions) and every
+    raw title is scored at most once thanks to a memo, so normalizing a column
+    costs about as much as normalizing its distinct titles.
+    """
+
+    MAX_MEMO_SIZE = 100_000
+
+    def __init__(self, standard_roles=STANDARD_ROLES):
+        self.standard_roles = list(standard_roles)
+        self._index = {}
+        for position, std in enumerate(self.standard_roles):
+            for token in set(std.lower().split()):
+                self._index.setdefault(token, []).append(position)
+        self._memo = {}
+
+    def _score(self, role):
+        overlaps = {}
+        for token in set(role.lower().split()):
+            for position in self._index.get(token, ()):
+                overlaps[position] = overlaps.get(position, 0) + 1
+        if not overlaps:
+            return role.title()
+        # Highest overlap wins; ties go to the earlier standard role
+        best = min(overlaps, key=lambda position: (-overlaps[position], position))
+        return self.standard_roles[best]
+
+    def normalize(self, role):
+        if not isinstance(role, str): return "Other"
+        normalized = self._memo.get(role)
+        if normalized is None:
+            if len(self._memo) >= self.MAX_MEMO_SIZE:
+                self._memo.clear()
+            normalized = self._memo[role] = self._score(role)
+        return normalized
+
+    def normalize_series(self, series):
+        """Normalizes each distinct title once and broadcasts back as a categorical Series."""
+        codes, uniques = pd.factorize(series)
+        normalized = [self.normalize(title) for title in uniques]
+        if (codes < 0).any():
+            # Missing titles have code -1, which picks the trailing "Other"
+            normalized.append("Other")
+        norm_codes, categories = pd.factorize(pd.Series(normalized, dtype=object))
+        return pd.Series(
+            pd.Categorical.from_codes(norm_codes[codes], categories=categories),
+            index=series.index,
+        )
+
+role_normalizer = RoleNormalizer()
+
+def normalize_role(role):
+    return role_normalizer.normalize(role)
+
+# --- Location Normalization ---
+def normalize_location(loc):
+    if not isinstance(loc, str): return "Remote"
+    loc = loc.lower()
+    if "remote" in loc: return "Remote"
+    if "bengaluru" in loc or "bangalore" in loc: return "Bangalore, India"
+    if "san francisco" in loc or "sf" in loc: return "San Francisco, CA"
+    if "new york" in loc or "ny" in loc: return "New York, NY"
+    if "austin" in loc: return "Austin, TX"
+    if "london" in loc: return "London, UK"
+    if "berlin" in loc: return "Berlin, Germany"
+    if "singapore" in loc: return "Singapore"
+    if "sydney" in loc: return "Sydney, Australia"
+    if "toronto" in loc: return "Toronto, Canada"
+    return loc.title()
+
+def normalize_locations(series):
+    """Normalizes each distinct location once and broadcasts back as a categorical Series."""
+    codes, uniques = pd.factorize(series)
+    normalized = [normalize_location(loc) for loc in uniques]
+    if (codes < 0).any():
+        normalized.append(normalize_location(None))
+    norm_codes, categories = pd.factorize(pd.Series(normalized, dtype=object))
+    return pd.Series(pd.Categorical.from_codes(norm_codes[codes], categories=categories), index=series.index)
+
+# --- Aggregation ---
+# Rows per chunk when streaming a dataset; bounds peak memory regardless of file size
+CHUNK_ROWS = int(os.environ.get("MARKET_CHUNK_ROWS", 100_000))
+
+def split_skills(value):
+    return [s.strip() for s in str(value).replace('|', ',').replace(';', ',').split(',')]
+
+class SkillVocabulary:
+    """
+    Interns skill names to integer ids and tokenizes skill columns in bulk.
+
+    Each distinct raw skills string is split once; rows are then gathered
+    from the per-string CSR matrix, giving a rows x skills count matrix
+    without one Python object per skill occurrence.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.skills = []
+        self._tokenized = {}
+
+    def __len__(self):
+        return len(self.skills)
+
+    def intern(self, skill):
+        skill_id = self.ids.get(skill)
+        if skill_id is None:
+            skill_id = self.ids[skill] = len(self.skills)
+            self.skills.append(skill)
+        return skill_id
+
+    def _token_ids(self, raw):
+        ids = self._tokenized.get(raw)
+        if ids is None:
+            ids = self._tokenized[raw] = [self.intern(skill) for skill in split_skills(raw)]
+        return ids
+
+    def tokenize(self, series):
+        """Returns a CSR matrix (len(series) x len(self)) of skill occurrence counts."""
+        codes, uniques = pd.factorize(series)
+        raw_values = [str(value) for value in uniques]
+        if (codes < 0).any():
+            # Missing cells have code -1 and tokenize like str(nan), as astype(str) did
+            raw_values.append(str(np.nan))
+        token_ids = [self._token_ids(raw) for raw in raw_values]
+
+        lengths = np.fromiter((len(ids) for ids in token_ids), dtype=np.int64, count=len(token_ids))
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        indices = np.fromiter(itertools.chain.from_iterable(token_ids), dtype=np.int32, count=int(indptr[-1]))
+        per_value = sp.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), indices, indptr),
+            shape=(len(raw_values), len(self)),
+        )
+        per_value.sum_duplicates()
+        return per_value[codes]
+
+def coerce_salary(series):
+    return pd.to_numeric(series, errors='coerce').fillna(0)
+
+def extract_experience(series):
+    # Extract just the number from "5 years", "5+", etc.
+    return series.astype(str).str.extract(r'(\d+)')[0].astype(float).fillna(0).astype(int)
+
+def ordered_roles(roles):
+    """Standard roles first, then any other normalized titles, each group sorted."""
+    roles = set(roles)
+    return sorted(set(STANDARD_ROLES) & roles) + sorted(roles - set(STANDARD_ROLES))
+
+class MarketAggregator:
+    """
+    Streaming version of the /api/market_data aggregation.
+
+    Each chunk is reduced to mergeable partials (skill counts, salary sums and
+    counts per role / experience, distinct filter values), so memory is bounded
+    by the chunk size rather than the dataset size.
+    """
+
+    def __init__(self, mapping):
+        self.role_col = mapping.get('role')
+        self.salary_col = mapping.get('salary')
+        self.skills_col = mapping.get('skills')
+        self.exp_col = mapping.get('experience')
+        self.location_col = mapping.get('location')
+
+        self.total_records = 0
+        self.roles = set()
+        self.experience = set()
+        self.vocabulary = SkillVocabulary()
+        # Occurrences per skill id; ids are assigned in first-seen order
+        self.skill_counts = np.zeros(0, dtype=np.int64)
+        self.role_salary = {}
+        self.exp_salary = {}
+        # Salary breakdowns are pre-aggregated in the same pass
+        self.cube = SalaryCube() if self.role_col and self.salary_col else None
+
+    @staticmethod
+    def _merge_sums(target, sums, counts):
+        for key, total in sums.items():
+            prev_sum, prev_count = target.get(key, (0.0, 0))
+            target[key] = (prev_sum + float(total), prev_count + int(counts[key]))
+
+    def update(self, chunk):
+        self.total_records += len(chunk)
+
+        roles = None
+        if self.role_col:
+            roles = role_normalizer.normalize_series(chunk[self.role_col])
+            self.roles.update(roles.unique())
+
+        salary = None
+        if self.salary_col:
+            salary = coerce_salary(chunk[self.salary_col])
+
+        exp = None
+        if self.exp_col:
+            exp = extract_experience(chunk[self.exp_col])
+            self.experience.update(exp.unique().tolist())
+
+        if self.skills_col:
+            matrix = self.vocabulary.tokenize(chunk[self.skills_col])
+            counts = np.zeros(len(self.vocabulary), dtype=np.int64)
+            counts[:len(self.skill_counts)] = self.skill_counts
+            counts += np.asarray(matrix.sum(axis=0)).ravel().astype(np.int64)
+            self.skill_counts = counts
+
+        if salary is not None:
+            if roles is not None:
+                grouped = salary.groupby(roles, observed=True)
+                self._merge_sums(self.role_salary, grouped.sum(), grouped.count())
+            if exp is not None:
+                grouped = salary.groupby(exp)
+                self._merge_sums(self.exp_salary, grouped.sum(), grouped.count())
+
+        if self.cube is not None:
+            locations = normalize_locations(chunk[self.location_col]) if self.location_col else None
+            self.cube.update(roles, exp, locations, salary)
+
+    def payload(self):
+        unique_roles = ordered_roles(self.roles)
+
+        skill_demand = top_skill_demand(self.skill_counts, self.vocabulary.skills)
+
+        job_salary = []
+        exp_salary = []
+        if self.salary_col:
+            # Use Normalized Role for aggregation
+            job_salary = [
+                {"title": role, "salary": total / count}
+                for role, (total, count) in sorted(self.role_salary.items())
+            ]
+            if self.exp_col:
+                exp_salary = [
+                    {"level": int(level), "salary": total / count}
+                    for level, (total, count) in sorted(self.exp_salary.items())
+                ]
+
+        return {
+            "skill_demand": skill_demand,
+            "job_salary": job_salary,
+            "exp_salary": exp_salary,
+            "total_records": self.total_records,
+            "filters": {
+                "roles": unique_roles,
+                "skills": sorted(self.vocabulary.skills),
+                "experience": sorted(int(e) for e in self.experience)
+            }
+        }
+
+def top_skill_demand(counts, skills, n=10):
+    # Stable sort keeps first-seen order among ties, as value_counts() did
+    top_ids = np.argsort(-counts, kind="stable")[:n]
+    return [{"skill": skills[i], "count": int(counts[i])} for i in top_ids if counts[i] > 0]
+
+class MarketIndex:
+    """
+    Per-dataset-version row index for filtered /api/market_data queries.
+
+    Rows are kept as compact arrays (role id, experience, salary, sparse skill
+    counts) plus sorted row-id posting lists per role and per skill and an
+    experience-sorted permutation, so a filter is answered by intersecting
+    posting lists and aggregating only the matching rows.
+    """
+
+    def __init__(self, mapping):
+        self.mapping = dict(mapping)
+        self.role_names = []
+        # name -> role code, the position in role_names
+        self.role_ids = {}
+        self.vocabulary = SkillVocabulary()
+        self.total_records = 0
+
+    @classmethod
+    def build(cls, chunks, mapping):
+        index = cls(mapping)
+        role_ids = {}
+        role_parts, salary_parts, exp_parts, skill_parts = [], [], [], []
+
+        for chunk in chunks:
+            index.total_records += len(chunk)
+            if mapping.get('role'):
+                roles = role_normalizer.normalize_series(chunk[mapping['role']])
+                categories = roles.cat.categories
+                lookup = np.array([role_ids.setdefault(r, len(role_ids)) for r in categories], dtype=np.int32)
+                role_parts.append(lookup[roles.cat.codes.to_numpy()])
+            if mapping.get('salary'):
+                salary_parts.append(coerce_salary(chunk[mapping['salary']]).to_numpy(dtype=np.float64))
+            if mapping.get('experience'):
+                exp_parts.append(extract_experience(chunk[mapping['experience']]).to_numpy(dtype=np.int64))
+            if mapping.get('skills'):
+                skill_parts.append(index.vocabulary.tokenize(chunk[mapping['skills']]))
+
+        index.role_ids = role_ids
+        index.role_names = sorted(role_ids, key=role_ids.get)
+        index.role_codes = np.concatenate(role_parts) if role_parts else None
+        index.salary = np.concatenate(salary_parts) if salary_parts else None
+        index.experience = np.concatenate(exp_parts) if exp_parts else None
+        if skill_parts:
+            # Earlier chunks saw a smaller vocabulary; widen them before stacking
+            width = len(index.vocabulary)
+            index.skills = sp.vstack([
+                sp.csr_matrix((m.data, m.indices, m.indptr), shape=(m.shape[0], width)) for m in skill_parts
+            ]).tocsr()
+        else:
+            index.skills = None
+        index._build_postings()
+        return index
+
+    @staticmethod
+    def _group_rows(codes, n_groups):
+        order = np.argsort(codes, kind="stable")
+        bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=n_groups))])
+        return order, bounds
+
+    def _build_postings(self):
+        if self.role_codes is not None:
+            self._role_order, self._role_bounds = self._group_rows(self.role_codes, len(self.role_names))
+        if self.skills is not None:
+            # CSC columns are the per-skill sorted row-id posting lists
+            self._skill_postings = self.skills.tocsc()
+            self._skill_postings.sort_indices()
+        if self.experience is not None:
+            self._exp_order = np.argsort(self.experience, kind="stable")
+            self._exp_sorted = self.experience[self._exp_order]
+
+    def _role_rows(self, role):
+        code = self.role_ids.get(role)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return self._role_order[self._role_bounds[code]:self._role_bounds[code + 1]]
+
+    def _skill_rows(self, skill):
+        skill_id = self.vocabulary.ids.get(skill)
+        if skill_id is None:
+            return np.empty(0, dtype=np.int64)
+        postings = self._skill_postings
+        return postings.indices[postings.indptr[skill_id]:postings.indptr[skill_id + 1]]
+
+    def _experience_rows(self, exp_min, exp_max):
+        lo = 0 if exp_min is None else np.searchsorted(self._exp_sorted, exp_min, side="left")
+        hi = len(self._exp_sorted) if exp_max is None else np.searchsorted(self._exp_sorted, exp_max, side="right")
+        return np.sort(self._exp_order[lo:hi])
+
+    @staticmethod
+    def _union(row_sets):
+        if not row_sets:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(row_sets))
+
+    def query(self, roles=None, skills=None, skills_match="all", experience_min=None, experience_max=None):
+        """Returns the sorted row ids matching every given filter (None means no filtering)."""
+        row_sets = []
+        if roles:
+            if self.role_codes is None:
+                raise ValueError("Role filter requires a role column")
+            row_sets.append(self._union([self._role_rows(r) for r in roles]))
+        if skills:
+            if self.skills is None:
+                raise ValueError("Skill filter requires a skills column")
+            per_skill = [self._skill_rows(s) for s in skills]
+            if skills_match == "any":
+                row_sets.append(self._union(per_skill))
+            else:
+                row_sets.extend(per_skill)
+        if experience_min is not None or experience_max is not None:
+            if self.experience is None:
+                raise ValueError("Experience filter requires an experience column")
+            row_sets.append(self._experience_rows(experience_min, experience_max))
+
+        if not row_sets:
+            return None
+        # Intersect smallest-first so every step works on the fewest rows
+        row_sets.sort(key=len)
+        rows = row_sets[0]
+        for other in row_sets[1:]:
+            if len(rows) == 0:
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def filters(self):
+        return {
+            "roles": ordered_roles(self.role_names),
+            "skills": sorted(self.vocabulary.skills),
+            "experience": sorted(np.unique(self.experience).tolist()) if self.experience is not None else []
+        }
+
+    def payload(self, rows=None):
+        """Aggregates the /api/market_data payload over `rows` (all rows if None)."""
+        if rows is None:
+            rows = np.arange(self.total_records)
+
+        skill_demand = []
+        if self.skills is not None:
+            counts = np.asarray(self.skills[rows].sum(axis=0)).ravel().astype(np.int64)
+            skill_demand = top_skill_demand(counts, self.vocabulary.skills)
+
+        job_salary = []
+        exp_salary = []
+        if self.salary is not None:
+            salary = self.salary[rows]
+            if self.role_codes is not None:
+                codes = self.role_codes[rows]
+                n_roles = len(self.role_names)
+                sums = np.bincount(codes, weights=salary, minlength=n_roles)
+                counts = np.bincount(codes, minlength=n_roles)
+                job_salary = sorted(
+                    ({"title": self.role_names[i], "salary": float(sums[i] / counts[i])} for i in np.flatnonzero(counts)),
+                    key=lambda item: item["title"],
+                )
+            if self.experience is not None:
+                levels, inverse = np.unique(self.experience[rows], return_inverse=True)
+                sums = np.bincount(inverse, weights=salary, minlength=len(levels))
+                counts = np.bincount(inverse, minlength=len(levels))
+                exp_salary = [
+                    {"level": int(level), "salary": float(total / count)}
+                    for level, total, count in zip(levels, sums, counts)
+                ]
+
+        return {
+            "skill_demand": skill_demand,
+            "job_salary": job_salary,
+            "exp_salary": exp_salary,
+            "total_records": int(len(rows)),
+            "filters": self.filters()
+        }
+
+def compute_market_payload(chunks, mapping):
+    """
+    Computes the /api/market_data payload (everything except the mapping echo)
+    from an iterable of DataFrame chunks whose columns were already resolved.
+    """
+    aggregator = MarketAggregator(mapping)
+    for chunk in chunks:
+        aggregator.update(chunk)
+    return aggregator.payload()
@@ -0,0 +1,184 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def _json_default(value):
+    # numpy scalars sneak in through pandas aggregations
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class MarketDataCache:
+    """
+    Content-addressed cache of computed /api/market_data payloads.
+
+    Entries are keyed by the SHA-256 of the dataset bytes plus the effective
+    column mapping, persisted as JSON files in `cache_dir` so a restarted
+    worker comes back warm. Memory holds only the most recently used entries;
+    evicted ones are read back from disk on their next use.
+    """
+
+    # Payloads and artifacts kept in memory (least recently used evicted first)
+    MAX_ENTRIES = 32
+    # Query indexes are memory-only (not JSON-serialisable); keep the latest few
+    MAX_INDEXES = 2
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._indexes = OrderedDict()
+        # (path, size, mtime_ns) -> content hash, so polling does not rehash an unchanged file
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+
+    def dataset_fingerprint(self, csv_path):
+        stat = os.stat(csv_path)
+        stat_key = (os.path.abspath(csv_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._fingerprints.get(stat_key)
+        if digest:
+            return digest
+
+        sha = hashlib.sha256()
+        with open(csv_path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        with self._lock:
+            self._fingerprints[stat_key] = digest
+        return digest
+
+    def record_fingerprint(self, csv_path, digest):
+        """Registers a hash computed elsewhere (e.g. while spooling an upload)."""
+        stat = os.stat(csv_path)
+        stat_key = (os.path.abspath(csv_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            self._fingerprints[stat_key] = digest
+
+    @staticmethod
+    def make_key(fingerprint, mapping):
+        mapping_blob = json.dumps(mapping, sort_keys=True)
+        return hashlib.sha256(f"{fingerprint}:{mapping_blob}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        payload = self._lookup(key)
+        if payload is not None:
+            return payload
+
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable market cache entry {path}: {e}")
+            return None
+        self._remember(key, payload)
+        return payload
+
+    def put(self, key, payload):
+        # Round-trip through JSON so memory and disk hold exactly the same values
+        blob = json.dumps(payload, default=_json_default)
+        payload = json.loads(blob)
+        self._remember(key, payload)
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(blob)
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError as e:
+            logger.warning(f"Could not persist market cache entry: {e}")
+        return payload
+
+    def _artifact_path(self, key, name):
+        return os.path.join(self.cache_dir, f"{key}.{name}.pkl")
+
+    def get_artifact(self, key, name):
+        """Returns a pickled companion object (e.g. the salary cube) stored for `key`."""
+        obj = self._lookup((key, name))
+        if obj is not None:
+            return obj
+
+        path = self._artifact_path(key, name)
+        if not os.path.exists(path):
+            return None
+        try:
+            obj = joblib.load(path)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable market cache artifact {path}: {e}")
+            return None
+        self._remember((key, name), obj)
+        return obj
+
+    def put_artifact(self, key, name, obj):
+        self._remember((key, name), obj)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            os.close(fd)
+            joblib.dump(obj, tmp_path)
+            os.replace(tmp_path, self._artifact_path(key, name))
+        except OSError as e:
+            logger.warning(f"Could not persist market cache artifact: {e}")
+        return obj
+
+    def get_index(self, key):
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+            return index
+
+    def put_index(self, key, index):
+        with self._lock:
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.MAX_INDEXES:
+                self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self):
+        """Drops every cached payload, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            self._indexes.clear()
+            self._fingerprints.clear()
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith((".json", ".pkl")):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError as e:
+                    logger.warning(f"Could not remove market cache entry {name}: {e}")
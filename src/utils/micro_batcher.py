@@ -0,0 +1,135 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Upper edges of the batch-size histogram exposed in metrics
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one model call.
+
+    Callers enqueue a feature row and block on a Future. A worker thread waits
+    until either `max_batch` rows are queued or `window_ms` has passed since the
+    oldest queued row, predicts the stacked matrix once, and fans the results
+    back out. Once closed, queued rows are still predicted and later ones are
+    predicted directly by the caller, so requests that picked up this batcher
+    before an asset reload replaced it still get answers.
+    """
+
+    def __init__(self, predict_fn, max_batch=256, window_ms=2.0):
+        self.predict_fn = predict_fn
+        self.max_batch = max(1, int(max_batch))
+        self.window = max(0.0, float(window_ms)) / 1000.0
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._worker = None
+        self._pid = None
+        self._stopped = False
+
+        self._requests = 0
+        self._batches = 0
+        self._rows = 0
+        self._max_batch_seen = 0
+        self._max_queue_depth = 0
+        self._histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def _ensure_worker(self):
+        # Threads do not survive a fork (e.g. gunicorn --preload), so start lazily per process
+        if self._worker is None or self._pid != os.getpid() or not self._worker.is_alive():
+            self._pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name="salary-micro-batcher", daemon=True)
+            self._worker.start()
+
+    def submit(self, row):
+        """Queues one feature row (copied, callers may reuse their buffer) and returns a Future."""
+        future = Future()
+        row = np.array(row, dtype=np.float32, copy=True).ravel()
+        with self._cond:
+            stopped = self._stopped
+            if not stopped:
+                self._ensure_worker()
+                self._queue.append((row, future))
+                self._requests += 1
+                self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+                self._cond.notify()
+        if stopped:
+            try:
+                future.set_result(self.predict_fn(row[np.newaxis, :])[0])
+            except Exception as e:
+                future.set_exception(e)
+        return future
+
+    def predict(self, row, timeout=None):
+        return self.submit(row).result(timeout=timeout)
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._queue and not self._stopped:
+                self._cond.wait()
+            if not self._queue:
+                return []
+            deadline = time.monotonic() + self.window
+            while len(self._queue) < self.max_batch and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(len(self._queue), self.max_batch)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _record(self, size):
+        with self._cond:
+            self._batches += 1
+            self._rows += size
+            self._max_batch_seen = max(self._max_batch_seen, size)
+            bucket = next((i for i, edge in enumerate(BATCH_SIZE_BUCKETS) if size <= edge), len(BATCH_SIZE_BUCKETS))
+            self._histogram[bucket] += 1
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            rows, futures = zip(*batch)
+            try:
+                predictions = self.predict_fn(np.vstack(rows))
+                for future, value in zip(futures, predictions):
+                    future.set_result(value)
+            except Exception as e:
+                logger.error(f"Micro-batch prediction failed: {e}")
+                for future in futures:
+                    future.set_exception(e)
+            self._record(len(batch))
+
+    def metrics(self):
+        with self._cond:
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch": self.max_batch,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_queue_depth,
+                "requests": self._requests,
+                "batches": self._batches,
+                "avg_batch_size": round(self._rows / self._batches, 2) if self._batches else 0,
+                "max_batch_size": self._max_batch_seen,
+                # Batches per size bucket; "le" is the bucket's inclusive upper edge (None = above the last)
+                "batch_size_histogram": [
+                    {"le": edge, "batches": count}
+                    for edge, count in zip(list(BATCH_SIZE_BUCKETS) + [None], self._histogram)
+                ],
+            }
+
+    def close(self):
+        """Stops the worker once the queued rows are predicted."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
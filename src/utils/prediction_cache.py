@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+def canonical_key(role, location, experience, skills):
+    """
+    Builds the cache key for an already parsed profile (location normalized).
+    Skill order and duplicates do not change a prediction, so they are dropped.
+    Experience is keyed as the float32 the model reads, so profiles sharing a
+    key get exactly the same prediction.
+    Returns None for inputs that cannot be keyed (unhashable or unsortable skills).
+    """
+    try:
+        key = (role, location, float(np.float32(experience)), tuple(sorted(set(skills))))
+        hash(key)
+    except (TypeError, ValueError):
+        return None
+    return key
+
+class PredictionCache:
+    """
+    Bounded LRU cache of salary predictions keyed by `canonical_key`.
+    A `max_size` of 0 disables caching; counters are kept either way.
+
+    `generation` counts model swaps: `clear` bumps it, and a `put` made for
+    an older generation (a prediction that was still running on the previous
+    model) is not stored.
+    """
+
+    def __init__(self, max_size=10_000):
+        self.max_size = max(0, int(max_size))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.generation = 0
+
+    def get(self, key):
+        with self._lock:
+            if key is not None and key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, generation=None):
+        if key is None or self.max_size == 0:
+            return value
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return value
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        """Drops every entry and starts a new generation, which is returned."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+            self.generation += 1
+            return self.generation
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "generation": self.generation,
+            }
@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# --- Quantile Sketch ---
+# Log-spaced buckets (DDSketch style): any quantile is within 1% relative error,
+# and two sketches merge by adding bucket counts.
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = np.log(GAMMA)
+NUM_BUCKETS = 2048
+BUCKET_OFFSET = NUM_BUCKETS // 2  # bucket 0 holds zero/negative salaries
+
+def sketch_buckets(values):
+    values = np.asarray(values, dtype=np.float64)
+    buckets = np.zeros(len(values), dtype=np.int32)
+    positive = values > 0
+    raw = np.ceil(np.log(values[positive]) / LOG_GAMMA) + BUCKET_OFFSET
+    buckets[positive] = np.clip(raw, 1, NUM_BUCKETS - 1)
+    return buckets
+
+def bucket_value(bucket):
+    if bucket == 0:
+        return 0.0
+    return float(2 * GAMMA ** (bucket - BUCKET_OFFSET) / (GAMMA + 1))
+
+def sketch_quantile(buckets, counts, q):
+    """Quantile `q` (0-1) of a sketch given its sorted non-empty buckets and their counts."""
+    total = counts.sum()
+    if total == 0:
+        return None
+    rank = q * (total - 1)
+    position = np.searchsorted(np.cumsum(counts), rank, side="right")
+    return bucket_value(int(buckets[min(position, len(buckets) - 1)]))
+
+# --- Experience Buckets ---
+EXPERIENCE_EDGES = [3, 6, 11]
+EXPERIENCE_LABELS = ["0-2", "3-5", "6-10", "11+"]
+
+def experience_bucket_codes(years):
+    return np.digitize(np.asarray(years), EXPERIENCE_EDGES)
+
+DIMENSIONS = ("role", "experience", "location")
+ALL_VALUE = "All"
+UNKNOWN_VALUE = "Unknown"
+
+class SalaryCube:
+    """
+    Pre-aggregated salary statistics over role x experience bucket x location.
+
+    Every non-empty cell stores count, sum, min, max and a quantile sketch, all
+    mergeable, so roll-ups (per role, per role+location, p25/p50/p90, ...) are
+    answered from the cells without touching raw rows.
+    """
+
+    def __init__(self):
+        self.values = {dim: [] for dim in DIMENSIONS}
+        self._value_ids = {dim: {} for dim in DIMENSIONS}
+        self._cell_ids = {}
+        self.cell_dims = np.zeros((0, len(DIMENSIONS)), dtype=np.int32)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.total = np.zeros(0, dtype=np.float64)
+        self.min = np.zeros(0, dtype=np.float64)
+        self.max = np.zeros(0, dtype=np.float64)
+        self.sketch = sp.csr_matrix((0, NUM_BUCKETS), dtype=np.int64)
+
+    def _dim_codes(self, dim, values, n_rows):
+        ids = self._value_ids[dim]
+        if values is None:
+            # Dimension not mapped for this dataset: every row shares one cell value
+            code = ids.setdefault(ALL_VALUE, len(ids))
+            self.values[dim] = sorted(ids, key=ids.get)
+            return np.full(n_rows, code, dtype=np.int32)
+
+        codes, uniques = pd.factorize(values)
+        labels = [str(v) for v in uniques]
+        if (codes < 0).any():
+            labels.append(UNKNOWN_VALUE)  # code -1 picks this trailing entry
+        lookup = np.array([ids.setdefault(label, len(ids)) for label in labels], dtype=np.int32)
+        self.values[dim] = sorted(ids, key=ids.get)
+        return lookup[codes]
+
+    def _grow(self, n_cells):
+        extra = n_cells - len(self.count)
+        if extra <= 0:
+            return
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+        self.total = np.concatenate([self.total, np.zeros(extra)])
+        self.min = np.concatenate([self.min, np.full(extra, np.inf)])
+        self.max = np.concatenate([self.max, np.full(extra, -np.inf)])
+        self.sketch = sp.vstack([self.sketch, sp.csr_matrix((extra, NUM_BUCKETS), dtype=np.int64)]).tocsr()
+
+    def update(self, roles, experience_years, locations, salaries):
+        """
+        Adds one chunk of rows. Dimension values may be categorical or object
+        Series; pass None for a dimension the dataset does not have.
+        """
+        salaries = np.asarray(salaries, dtype=np.float64)
+        n_rows = len(salaries)
+        if n_rows == 0:
+            return
+        exp_labels = None
+        if experience_years is not None:
+            exp_labels = np.array(EXPERIENCE_LABELS, dtype=object)[experience_bucket_codes(experience_years)]
+        dims = np.column_stack([
+            self._dim_codes("role", roles, n_rows),
+            self._dim_codes("experience", exp_labels, n_rows),
+            self._dim_codes("location", locations, n_rows),
+        ])
+
+        chunk_cells, inverse = np.unique(dims, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        cell_ids = np.array([
+            self._cell_ids.setdefault(tuple(cell), len(self._cell_ids)) for cell in chunk_cells.tolist()
+        ], dtype=np.int64)
+        if len(self._cell_ids) > len(self.cell_dims):
+            self.cell_dims = np.array(list(self._cell_ids), dtype=np.int32).reshape(-1, len(DIMENSIONS))
+        self._grow(len(self._cell_ids))
+
+        rows = cell_ids[inverse]
+        n = len(self.count)
+        self.count += np.bincount(rows, minlength=n)
+        self.total += np.bincount(rows, weights=salaries, minlength=n)
+        np.minimum.at(self.min, rows, salaries)
+        np.maximum.at(self.max, rows, salaries)
+        chunk_sketch = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.int64), (rows, sketch_buckets(salaries))),
+            shape=(n, NUM_BUCKETS),
+        )
+        self.sketch = (self.sketch + chunk_sketch).tocsr()
+
+    def rollup(self, group_by=(), filters=None, percentiles=(25, 50, 90)):
+        """
+        Aggregates cells into one row per combination of `group_by` dimensions,
+        keeping only cells whose dimension values are listed in `filters`.
+        """
+        for dim in list(group_by) + list(filters or {}):
+            if dim not in DIMENSIONS:
+                raise ValueError(f"Unknown dimension {dim!r}; expected one of {', '.join(DIMENSIONS)}")
+        for p in percentiles:
+            if not 0 <= p <= 100:
+                raise ValueError("Percentiles must be between 0 and 100")
+
+        selected = np.ones(len(self.count), dtype=bool)
+        for dim, wanted in (filters or {}).items():
+            if isinstance(wanted, str):
+                wanted = [wanted]
+            ids = [self._value_ids[dim][v] for v in wanted if v in self._value_ids[dim]]
+            selected &= np.isin(self.cell_dims[:, DIMENSIONS.index(dim)], ids)
+        cells = np.flatnonzero(selected)
+        if len(cells) == 0:
+            return []
+
+        positions = [DIMENSIONS.index(dim) for dim in group_by]
+        keys = self.cell_dims[cells][:, positions] if positions else np.zeros((len(cells), 0), dtype=np.int32)
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        n_groups = len(groups)
+
+        counts = np.bincount(inverse, weights=self.count[cells], minlength=n_groups)
+        totals = np.bincount(inverse, weights=self.total[cells], minlength=n_groups)
+        mins = np.full(n_groups, np.inf)
+        maxs = np.full(n_groups, -np.inf)
+        np.minimum.at(mins, inverse, self.min[cells])
+        np.maximum.at(maxs, inverse, self.max[cells])
+        membership = sp.csr_matrix((np.ones(len(cells), dtype=np.int64), (inverse, np.arange(len(cells)))), shape=(n_groups, len(cells)))
+        sketches = (membership @ self.sketch[cells]).tocsr()
+        sketches.sort_indices()
+
+        result = []
+        for g in range(n_groups):
+            row = {dim: self.values[dim][groups[g][i]] for i, dim in enumerate(group_by)}
+            row.update({
+                "count": int(counts[g]),
+                "mean": float(totals[g] / counts[g]),
+                "min": float(mins[g]),
+                "max": float(maxs[g]),
+            })
+            start, end = sketches.indptr[g], sketches.indptr[g + 1]
+            for p in percentiles:
+                value = sketch_quantile(sketches.indices[start:end], sketches.data[start:end], p / 100)
+                # Sketch values are bucket midpoints; never report outside the observed range
+                row[f"p{p:g}"] = float(min(max(value, mins[g]), maxs[g]))
+            result.append(row)
+
+        def sort_key(row):
+            # Experience buckets sort in range order, other dimensions alphabetically
+            return tuple(
+                (EXPERIENCE_LABELS.index(row[dim]) if row[dim] in EXPERIENCE_LABELS else len(EXPERIENCE_LABELS), row[dim])
+                if dim == "experience" else (0, row[dim])
+                for dim in group_by
+            )
+        return sorted(result, key=sort_key)
@@ -0,0 +1,117 @@
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+
+from src.utils.market_analytics import normalize_location
+
+def parse_profile(data):
+    """Extracts (role, normalized location, experience, skills) from one request profile."""
+    if not isinstance(data, dict):
+        raise ValueError("Each profile must be a JSON object")
+    skills = data.get("skills", []) or []
+    if isinstance(skills, str):
+        skills = [skills]
+    return (
+        data.get("role"),
+        # Normalize location (Critical for accuracy)
+        normalize_location(data.get("location")),
+        float(data.get("experience_years", 0)),
+        list(skills),
+    )
+
+def uses_sparse_features(model):
+    """True for models trained on CSR input, which saw absent skills (zeros) as missing values."""
+    if hasattr(model, "sparse_features"):
+        return bool(model.sparse_features)
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    return booster.attr("sparse_features") == "1"
+
+class FeatureAssembler:
+    """
+    Precompiled encoder for salary model inputs, built once at asset-load time.
+
+    TargetEncoder categories become plain dict lookups, skills map straight to
+    column positions, and rows are filled into float32 arrays, so a prediction
+    needs no DataFrame construction, concat or column alignment.
+
+    With `zero_as_missing` (models trained on sparse features) zeros are
+    missing values, matching how XGBoost read the CSR training matrix: a
+    single row gets NaN in place of every zero, and a batch is assembled
+    straight into a CSR matrix holding only the non-zero entries. That
+    includes experience_years of 0 and encodings of exactly 0.
+    """
+
+    def __init__(self, encoder, mlb, feature_columns, zero_as_missing=False):
+        self.feature_columns = list(feature_columns)
+        self.n_features = len(self.feature_columns)
+        column_index = {col: i for i, col in enumerate(self.feature_columns)}
+
+        # (input name, column position, category -> encoding, encoding for unseen categories)
+        self.category_maps = []
+        default = float(np.ravel(encoder.target_mean_)[0])
+        for name, categories, encodings in zip(encoder.feature_names_in_, encoder.categories_, encoder.encodings_):
+            if name in column_index:
+                lookup = {cat: float(enc) for cat, enc in zip(categories.tolist(), np.ravel(encodings).tolist())}
+                self.category_maps.append((name, column_index[name], lookup, default))
+
+        self.experience_pos = column_index.get('experience_years')
+        self.skill_index = {
+            skill: column_index[f"Skill_{skill}"]
+            for skill in mlb.classes_ if f"Skill_{skill}" in column_index
+        }
+        self.zero_as_missing = zero_as_missing
+        self._buffers = threading.local()
+
+    def _fill(self, row, role, location, experience, skills):
+        values = {'role': role, 'Normalized_Location': location}
+        for name, pos, lookup, default in self.category_maps:
+            try:
+                row[pos] = lookup.get(values.get(name), default)
+            except TypeError:  # unhashable input can never be a known category
+                row[pos] = default
+        if self.experience_pos is not None:
+            row[self.experience_pos] = experience
+        for skill in skills:
+            pos = self.skill_index.get(skill)
+            if pos is not None:
+                row[pos] = 1.0
+
+    def transform_one(self, role, location, experience, skills):
+        """Returns a (1, n_features) float32 row from a per-thread preallocated buffer."""
+        row = getattr(self._buffers, "row", None)
+        if row is None:
+            row = self._buffers.row = np.zeros((1, self.n_features), dtype=np.float32)
+        else:
+            row.fill(0.0)
+        self._fill(row[0], role, location, experience, skills)
+        if self.zero_as_missing:
+            row[row == 0] = np.nan
+        return row
+
+    def transform(self, profiles):
+        """
+        Encodes parsed profiles into a (len(profiles), n_features) float32
+        matrix, CSR for models trained on sparse features.
+        """
+        if self.zero_as_missing:
+            return self._transform_sparse(profiles)
+        X = np.zeros((len(profiles), self.n_features), dtype=np.float32)
+        for i, (role, location, experience, skills) in enumerate(profiles):
+            self._fill(X[i], role, location, experience, skills)
+        return X
+
+    def _transform_sparse(self, profiles):
+        indptr, indices, data = [0], [], []
+        for role, location, experience, skills in profiles:
+            row = {}
+            self._fill(row, role, location, experience, skills)
+            for pos in sorted(row):
+                if row[pos] != 0:
+                    indices.append(pos)
+                    data.append(row[pos])
+            indptr.append(len(indices))
+        return sp.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(profiles), self.n_features),
+        )
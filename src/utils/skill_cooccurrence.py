@@ -0,0 +1,190 @@
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+logger = logging.getLogger(__name__)
+
+# Default number of related skills returned per query
+TOP_RELATED_SKILLS = 10
+
+class SkillCooccurrenceBuilder:
+    """
+    Accumulates skill x skill co-occurrence counts from chunks of job postings.
+
+    Each chunk becomes a binary posting x skill matrix X, and X.T @ X adds the
+    number of postings listing both skills of every pair (the diagonal is the
+    number of postings listing the skill). Per-role counts come from the same
+    product with X's rows spread into one column block per role. Counts are
+    merged after every chunk, so memory tracks the number of non-zero pairs.
+    """
+
+    def __init__(self, by_role=True):
+        self.by_role = by_role
+        self.skill_ids = {}
+        self.role_ids = {}
+        # Triples of the merged matrix; block 0 is all roles, block r + 1 is role r
+        self._block = np.zeros(0, dtype=np.int64)
+        self._row = np.zeros(0, dtype=np.int64)
+        self._col = np.zeros(0, dtype=np.int64)
+        self._count = np.zeros(0, dtype=np.int64)
+
+    def update(self, roles, skills_lists):
+        """Adds one chunk: parallel sequences of role names and per-posting skill lists."""
+        posting, skill = [], []
+        for i, skills in enumerate(skills_lists):
+            for s in set(skills):
+                posting.append(i)
+                skill.append(self.skill_ids.setdefault(s, len(self.skill_ids)))
+        if not posting:
+            return
+        n_postings, n_skills = len(skills_lists), len(self.skill_ids)
+        posting = np.asarray(posting, dtype=np.int64)
+        skill = np.asarray(skill, dtype=np.int64)
+        ones = np.ones(len(posting), dtype=np.int64)
+        X = sp.csr_matrix((ones, (posting, skill)), shape=(n_postings, n_skills))
+
+        parts = [(X.T @ X).tocoo()]
+        if self.by_role:
+            # Postings without a role only count towards the overall block
+            role = np.array([
+                self.role_ids.setdefault(str(r), len(self.role_ids)) if pd.notnull(r) else -1
+                for r in roles
+            ], dtype=np.int64)
+            keep = role[posting] >= 0
+            X_roles = sp.csr_matrix(
+                (ones[keep], (posting[keep], (role[posting[keep]] + 1) * n_skills + skill[keep])),
+                shape=(n_postings, (len(self.role_ids) + 1) * n_skills),
+            )
+            parts.append((X_roles.T @ X).tocoo())
+
+        self._merge(
+            [self._block] + [p.row // n_skills for p in parts],
+            [self._row] + [p.row % n_skills for p in parts],
+            [self._col] + [p.col for p in parts],
+            [self._count] + [p.data for p in parts],
+        )
+
+    def _merge(self, blocks, rows, cols, counts):
+        n_skills = max(len(self.skill_ids), 1)
+        keys = np.concatenate(blocks) * n_skills + np.concatenate(rows)
+        n_rows = (len(self.role_ids) + 1) * n_skills
+        merged = sp.coo_matrix(
+            (np.concatenate(counts).astype(np.int64), (keys, np.concatenate(cols))), shape=(n_rows, n_skills)
+        ).tocsr().tocoo()  # tocsr sums duplicate pairs
+        self._block, self._row = np.divmod(merged.row.astype(np.int64), n_skills)
+        self._col, self._count = merged.col.astype(np.int64), merged.data
+
+    def build(self):
+        skills = sorted(self.skill_ids)
+        roles = sorted(self.role_ids)
+        # Renumber ids alphabetically so the artifact does not depend on chunk order
+        skill_map = np.empty(len(self.skill_ids), dtype=np.int64)
+        skill_map[[self.skill_ids[s] for s in skills]] = np.arange(len(skills))
+        block_map = np.zeros(len(self.role_ids) + 1, dtype=np.int64)
+        block_map[[self.role_ids[r] + 1 for r in roles]] = np.arange(1, len(roles) + 1)
+
+        n_skills = len(skills)
+        rows = block_map[self._block] * n_skills + skill_map[self._row]
+        matrix = sp.csr_matrix(
+            (self._count, (rows, skill_map[self._col])), shape=((len(roles) + 1) * n_skills, n_skills)
+        )
+        return SkillCooccurrence(skills, roles, matrix)
+
+class SkillCooccurrence:
+    """
+    Sparse skill x skill co-occurrence counts, overall and optionally per role.
+
+    `matrix` stacks one n_skills x n_skills block for all postings followed by
+    one block per role. Related skills for a set of known skills are the sum of
+    their rows, with the known skills removed, top-k by partial sort.
+    """
+
+    def __init__(self, skills, roles, matrix):
+        self.skills = np.asarray(skills, dtype=object)
+        self.roles = list(roles)
+        self.matrix = sp.csr_matrix(matrix)
+        self.skill_ids = {s: i for i, s in enumerate(self.skills.tolist())}
+        self.role_blocks = {r: i + 1 for i, r in enumerate(self.roles)}
+
+    def __len__(self):
+        return len(self.skills)
+
+    def _skill_rows(self, skills, block):
+        ids = set()
+        for s in skills:
+            try:
+                i = self.skill_ids.get(s)
+            except TypeError:  # unhashable input can never be a known skill
+                continue
+            if i is not None:
+                ids.add(i)
+        ids = np.fromiter(sorted(ids), dtype=np.int64, count=len(ids))
+        return ids, block * len(self.skills) + ids
+
+    def related(self, skills, role=None, k=TOP_RELATED_SKILLS):
+        """
+        Top `k` skills co-occurring with `skills` (excluding them), scored by
+        the number of postings that list each candidate alongside a known skill,
+        summed over the known skills. With `role`, only that role's postings
+        count; an unknown role gives no suggestions. Ties break alphabetically.
+        """
+        k = max(0, int(k))
+        block = 0
+        if role is not None:
+            try:
+                block = self.role_blocks.get(role)
+            except TypeError:
+                block = None
+            if block is None:
+                return []
+        known, rows = self._skill_rows(skills, block)
+        if len(rows) == 0 or k == 0:
+            return []
+
+        # Sum the CSR rows straight from indptr/indices, skipping a sparse row slice
+        m = self.matrix
+        parts = [slice(m.indptr[r], m.indptr[r + 1]) for r in rows.tolist()]
+        scores = np.bincount(
+            np.concatenate([m.indices[p] for p in parts]),
+            weights=np.concatenate([m.data[p] for p in parts]),
+            minlength=len(self.skills),
+        ).astype(np.int64)
+        scores[known] = 0
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            # Keep every candidate tied with the k-th score so the alphabetical tie-break stays exact
+            kth = np.partition(scores[candidates], len(candidates) - k)[len(candidates) - k]
+            candidates = candidates[scores[candidates] >= kth]
+        # Skills are stored alphabetically, so a stable sort by score breaks ties by name
+        order = candidates[np.argsort(-scores[candidates], kind="stable")][:k]
+        return [{"skill": self.skills[i], "score": int(scores[i])} for i in order]
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            skills=np.array(self.skills.tolist(), dtype=np.str_),
+            roles=np.array(self.roles, dtype=np.str_),
+            data=self.matrix.data.astype(np.int32), indices=self.matrix.indices, indptr=self.matrix.indptr,
+            shape=np.array(self.matrix.shape),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            matrix = sp.csr_matrix((data["data"], data["indices"], data["indptr"]), shape=tuple(data["shape"]))
+            return cls(data["skills"].tolist(), data["roles"].tolist(), matrix)
+
+def load_cooccurrence(path):
+    """Returns the co-occurrence artifact at `path`, or None if it is missing or unreadable."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return SkillCooccurrence.load(path)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable skill co-occurrence artifact {path}: {e}")
+        return None
@@ -0,0 +1,145 @@
+import sys
+
+import numpy as np
+
+# Size of a role's "required" skill set in the skills endpoints
+TOP_ROLE_SKILLS = 30
+
+# Number of set bits in every byte value, for popcounts over packed masks
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+class RoleSkillIndex:
+    """
+    Role -> skills sorted by posting count, built once from the
+    skill_recommendation_data frame (columns role, Skills_List, count).
+
+    Each role keeps its skills and counts as parallel arrays in the order
+    `sf[sf['role'] == role].sort_values(by='count', ascending=False)`
+    produced, so a top-K query is a dict lookup plus a slice.
+    """
+
+    def __init__(self, skill_freq):
+        self._roles = {}
+        # groupby(sort=False) hands each role's rows over in frame order, exactly like the boolean filter did
+        for role, group in skill_freq.groupby('role', sort=False):
+            ordered = group.sort_values(by='count', ascending=False)
+            self._roles[sys.intern(str(role))] = (
+                ordered['Skills_List'].to_numpy(dtype=object),
+                ordered['count'].to_numpy(dtype=np.int64),
+            )
+
+    def __contains__(self, role):
+        return self._lookup(role) is not None
+
+    def __len__(self):
+        return len(self._roles)
+
+    def items(self):
+        """(role, skills sorted by count) pairs."""
+        return ((role, skills) for role, (skills, _) in self._roles.items())
+
+    def _lookup(self, role):
+        if not isinstance(role, str):
+            return None
+        return self._roles.get(role)
+
+    def top_skills(self, role, k=TOP_ROLE_SKILLS):
+        """The role's `k` most frequent skills, or [] for an unknown role."""
+        entry = self._lookup(role)
+        return entry[0][:k].tolist() if entry else []
+
+class SkillGapIndex:
+    """
+    Required skill sets as packed bit arrays, for skill-gap reports in bulk.
+
+    Every skill in the index gets an integer id (one bit); each role's top-K
+    skills become a packed uint8 mask. A batch of employees is encoded into
+    one mask matrix, so matched/missing sets for all (employee, role) pairs
+    are two bitwise ops and the counts a popcount-table lookup.
+    """
+
+    def __init__(self, role_index, k=TOP_ROLE_SKILLS):
+        self.skill_ids = {}
+        self.role_ids = {}
+        self.required_ids = []
+        for role, skills in role_index.items():
+            required = skills[:k].tolist()
+            self.role_ids[role] = len(self.role_ids)
+            self.required_ids.append(np.array(
+                [self.skill_ids.setdefault(sys.intern(skill), len(self.skill_ids)) for skill in required],
+                dtype=np.int64,
+            ))
+        self.skills = np.array(sorted(self.skill_ids, key=self.skill_ids.get), dtype=object)
+        self.n_bits = max(8, -(-len(self.skill_ids) // 8) * 8)
+
+        self.required_masks = self._pack(
+            np.repeat(np.arange(len(self.required_ids)), [len(ids) for ids in self.required_ids]),
+            np.concatenate(self.required_ids + [np.zeros(0, dtype=np.int64)]),
+            len(self.required_ids),
+        )
+        self.required_counts = POPCOUNT[self.required_masks].sum(axis=1, dtype=np.int64)
+
+    def _pack(self, rows, ids, n_rows):
+        """
+        Packed masks with bit `ids[j]` set in row `rows[j]`, in np.packbits'
+        layout (bit i is the high-order bit i % 8 of byte i // 8), written
+        straight into the bytes instead of through an n_rows x n_bits bool matrix.
+        """
+        masks = np.zeros((n_rows, self.n_bits // 8), dtype=np.uint8)
+        ids = np.asarray(ids, dtype=np.int64)
+        np.bitwise_or.at(masks, (np.asarray(rows, dtype=np.int64), ids >> 3), (0x80 >> (ids & 7)).astype(np.uint8))
+        return masks
+
+    def encode(self, skills_lists):
+        """Packs each list of skill names into a bit mask; skills no role requires are dropped."""
+        rows, cols = [], []
+        for i, skills in enumerate(skills_lists):
+            for skill in skills:
+                skill_id = self.skill_ids.get(skill) if isinstance(skill, str) else None
+                if skill_id is not None:
+                    rows.append(i)
+                    cols.append(skill_id)
+        return self._pack(rows, cols, len(skills_lists))
+
+    def _role_id(self, role):
+        return self.role_ids.get(role, -1) if isinstance(role, str) else -1
+
+    def gaps(self, skills_lists, roles, include_skills=True):
+        """
+        Skill-gap report for each (skills, role) pair: match percentage,
+        required/matched/missing counts and, with `include_skills`, the matched and
+        missing skill names in the role's frequency order.
+        """
+        role_ids = np.array([self._role_id(role) for role in roles], dtype=np.int64)
+        known = role_ids >= 0
+        employees = self.encode(skills_lists)
+        required = self.required_masks[np.where(known, role_ids, 0)]
+        required[~known] = 0
+
+        matched = employees & required
+        missing = required & ~employees
+        matched_counts = POPCOUNT[matched].sum(axis=1, dtype=np.int64)
+        missing_counts = POPCOUNT[missing].sum(axis=1, dtype=np.int64)
+        required_counts = POPCOUNT[required].sum(axis=1, dtype=np.int64)
+        # Same arithmetic as int((matched / required) * 100) in recommend_skills
+        with np.errstate(divide="ignore", invalid="ignore"):
+            percentages = np.where(required_counts > 0, (matched_counts / required_counts) * 100, 0).astype(np.int64)
+
+        results = [
+            {"match_percentage": int(p), "required_count": int(r), "matched_count": int(m), "missing_count": int(x)}
+            for p, r, m, x in zip(percentages, required_counts, matched_counts, missing_counts)
+        ]
+        if include_skills:
+            for result in results:
+                result["matched_skills"] = []
+                result["missing_skills"] = []
+            # One vectorized bit test per role over all of its rows
+            for role_id in np.unique(role_ids[known]):
+                rows = np.flatnonzero(role_ids == role_id)
+                ids = self.required_ids[role_id]
+                has = (matched[rows][:, ids >> 3] >> (7 - (ids & 7)).astype(np.uint8)) & 1
+                names = self.skills[ids]
+                for row, flags in zip(rows.tolist(), has.astype(bool)):
+                    results[row]["matched_skills"] = names[flags].tolist()
+                    results[row]["missing_skills"] = names[~flags].tolist()
+        return results
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+class StreamingTargetEncoder:
+    """
+    Continuous target encoder fitted chunk by chunk.
+
+    Reproduces sklearn's TargetEncoder(target_type="continuous", smooth="auto")
+    fitted on all rows at once, but only keeps per-category count, mean and
+    sum of squared deviations (merged across chunks with Chan's update), so
+    memory is bounded by the number of categories. After `finalize()` it
+    exposes the same fitted attributes (`categories_`, `encodings_`,
+    `target_mean_`, `feature_names_in_`) the API's FeatureAssembler reads.
+    """
+
+    target_type_ = "continuous"
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self._stats = {col: {} for col in self.columns}  # category -> [count, mean, m2]
+        self._total = [0, 0.0, 0.0]
+
+    @staticmethod
+    def _merge(acc, count, mean, m2):
+        n = acc[0] + count
+        delta = mean - acc[1]
+        acc[1] += delta * count / n
+        acc[2] += m2 + delta * delta * acc[0] * count / n
+        acc[0] = n
+
+    def partial_fit(self, X, y):
+        y = np.asarray(y, dtype=np.float64)
+        if len(y) == 0:
+            return self
+        self._merge(self._total, len(y), y.mean(), float(((y - y.mean()) ** 2).sum()))
+        for col in self.columns:
+            codes, uniques = pd.factorize(np.asarray(X[col], dtype=object))
+            keys = list(uniques)
+            if (codes < 0).any():
+                # Missing values form one category of their own, as in sklearn
+                keys.append(np.nan)
+                codes = np.where(codes < 0, len(uniques), codes)
+            counts = np.bincount(codes, minlength=len(keys))
+            means = np.bincount(codes, weights=y, minlength=len(keys)) / counts
+            m2 = np.bincount(codes, weights=(y - means[codes]) ** 2, minlength=len(keys))
+            stats = self._stats[col]
+            for key, count, mean, ssd in zip(keys, counts.tolist(), means.tolist(), m2.tolist()):
+                self._merge(stats.setdefault(key, [0, 0.0, 0.0]), count, mean, ssd)
+        return self
+
+    def finalize(self):
+        count, mean, m2 = self._total
+        if count == 0:
+            raise ValueError("StreamingTargetEncoder saw no rows")
+        y_variance = m2 / count
+        self.target_mean_ = np.float64(mean)
+        self.feature_names_in_ = np.array(self.columns, dtype=object)
+        self.n_features_in_ = len(self.columns)
+        self.categories_, self.encodings_ = [], []
+        for col in self.columns:
+            stats = self._stats[col]
+            # Same order as sklearn: sorted values, missing last
+            keys = sorted(k for k in stats if not (isinstance(k, float) and np.isnan(k)))
+            keys += [k for k in stats if isinstance(k, float) and np.isnan(k)]
+            counts = np.array([stats[k][0] for k in keys], dtype=np.float64)
+            means = np.array([stats[k][1] for k in keys], dtype=np.float64)
+            ssd = np.array([stats[k][2] for k in keys], dtype=np.float64)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                lam = y_variance * counts / (y_variance * counts + ssd / counts)
+            encodings = np.where(np.isnan(lam), mean, lam * means + (1 - lam) * mean)
+            self.categories_.append(np.array(keys, dtype=object))
+            self.encodings_.append(encodings)
+        return self
+
+    def transform(self, X):
+        """Encodes the categorical columns of `X`; unseen categories get the target mean."""
+        out = np.empty((len(X), len(self.columns)), dtype=np.float64)
+        for i, (col, categories, encodings) in enumerate(zip(self.columns, self.categories_, self.encodings_)):
+            lookup = pd.Series(encodings, index=pd.Index(categories, dtype=object))
+            values = pd.Series(np.asarray(X[col], dtype=object))
+            out[:, i] = values.map(lookup).fillna(self.target_mean_).to_numpy(dtype=np.float64)
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(self.columns, dtype=object)
@@ -0,0 +1,104 @@
+import json
+import os
+import sys
+from contextlib import contextmanager
+
+import numpy as np
+
+# Ensure we can import the app helpers when run as a script from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import src.api.flask_app as flask_app
+from src.utils.candidate_pool import CandidatePool
+from src.utils.candidate_records import CANDIDATE_FIELDS, CandidateRecords
+from test_candidate_search import QUERIES, make_pool, reference
+
+@contextmanager
+def candidate_app(df, vectorizer, matrix):
+    """A test client matching against `df`, whatever candidates the app loaded."""
+    saved = {key: flask_app.assets.get(key) for key in ("candidate_pool", "vectorizer")}
+    flask_app.assets.update(candidate_pool=CandidatePool(vectorizer, df, matrix), vectorizer=vectorizer)
+    try:
+        yield flask_app.app.test_client()
+    finally:
+        flask_app.assets.update(saved)
+
+def expected_ids(df, vectorizer, matrix, skills, top_n):
+    """Candidate IDs of a brute-force cosine scan, ties by row as the endpoints order them."""
+    indices, _ = reference(vectorizer.transform([" ".join(skills)]), matrix, top_n)
+    return df["Candidate ID"].iloc[indices].tolist()
+
+def test_batch_matches_single_requests():
+    df, vectorizer, matrix = make_pool()
+    jobs = [{"id": f"job-{i}", "skills_required": text.split()} for i, text in enumerate(QUERIES)]
+    jobs += [["Docker", "AWS"], {"skills_required": "Spark"}, {"id": 7, "skills_required": []}]
+    with candidate_app(df, vectorizer, matrix) as client:
+        for top_n in (1, 10, 300):
+            resp = client.post("/api/match_candidates_batch", json={"jobs": jobs, "top_n": top_n})
+            assert resp.status_code == 200 and resp.mimetype == "application/x-ndjson"
+            lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+            assert [line["index"] for line in lines] == list(range(len(jobs)))
+            for job, line in zip(jobs, lines):
+                skills = job.get("skills_required") if isinstance(job, dict) else job
+                skills = [skills] if isinstance(skills, str) else skills
+                assert line["id"] == (job.get("id") if isinstance(job, dict) else None)
+                single = client.post("/api/match_candidates", json={"skills_required": skills, "top_n": top_n}).get_json()
+                assert line["candidates"] == single["candidates"], (skills, top_n)
+                assert [c["Candidate ID"] for c in line["candidates"]] == expected_ids(df, vectorizer, matrix, skills, top_n)
+
+        # NDJSON bodies take top_n from the query string
+        ndjson = "\n".join(json.dumps(job) for job in jobs[:3])
+        resp = client.post("/api/match_candidates_batch?top_n=4", data=ndjson, content_type="application/x-ndjson")
+        lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+        assert [len(line["candidates"]) for line in lines] == [4, 4, 4]
+        assert lines[1]["candidates"] == client.post("/api/match_candidates", json={**jobs[1], "top_n": 4}).get_json()["candidates"]
+
+        assert client.post("/api/match_candidates_batch", json={"jobs": [{"skills_required": 5}]}).status_code == 400
+        too_many = [["Python"]] * (flask_app.MAX_MATCH_JOBS + 1)
+        assert client.post("/api/match_candidates_batch", json={"jobs": too_many}).status_code == 413
+
+def baseline_body(df, vectorizer, matrix, skills, top_n):
+    """The original response: DataFrame rows to dicts plus the rounded score, through jsonify."""
+    indices, scores = reference(vectorizer.transform([" ".join(skills)]), matrix, top_n)
+    matches = df.iloc[indices].copy()
+    matches["score"] = np.round(scores * 100, 1)
+    records = matches[["Candidate ID", "Name", "Email", "Experience Level", "Skills", "score"]].to_dict(orient="records")
+    return flask_app.app.json.dumps({"candidates": records})
+
+def test_rendered_records_match_jsonify():
+    df, vectorizer, matrix = make_pool()
+    # Repeated and unique, ASCII and not, so both column layouts and escaping are exercised
+    df["Email"] = [f"person{i}@example.com" if i % 3 else "shared@example.com" for i in range(len(df))]
+    df.loc[::7, "Name"] = "Zoë \"Quotes\" O'Brien \u4e2d\u6587"
+    with candidate_app(df, vectorizer, matrix) as client:
+        for text in QUERIES:
+            for top_n in (1, 10, 300):
+                resp = client.post("/api/match_candidates", json={"skills_required": text.split(), "top_n": top_n})
+                assert resp.status_code == 200 and resp.mimetype == "application/json"
+                # Same values and the same (sorted) key order as the original response
+                got = json.loads(resp.get_data(as_text=True), object_pairs_hook=list)
+                expected = json.loads(baseline_body(df, vectorizer, matrix, text.split(), top_n), object_pairs_hook=list)
+                assert got[0] == expected[0], (text, top_n)
+
+def test_records_store_layouts():
+    df, _, _ = make_pool(n_rows=40)
+    df = df.drop(columns=["Email"], errors="ignore")
+    df.loc[3, "Name"] = None
+    records = CandidateRecords.from_frame(df)
+    assert len(records) == len(df)
+    for row in (0, 3, 39):
+        fragment = json.loads(records.fragment(row) + b"12.5}")
+        assert list(fragment) == list(CANDIDATE_FIELDS) + ["score"]
+        # Absent columns and missing values are null
+        assert fragment["Email"] is None and fragment["Name"] == (None if row == 3 else df["Name"].iloc[row])
+    # Few distinct levels are dictionary-encoded, unique names are stored back to back
+    levels, names = records.columns[CANDIDATE_FIELDS.index("Experience Level")], records.columns[CANDIDATE_FIELDS.index("Name")]
+    assert levels.codes is not None and names.codes is None
+    rows = [np.array([5, 1]), np.array([0, 39, 3])]
+    merged = CandidateRecords.concat([records, records], rows)
+    assert [merged.fragment(i) for i in range(5)] == [records.fragment(r) for r in (5, 1, 0, 39, 3)]
+
+if __name__ == "__main__":
+    test_batch_matches_single_requests()
+    test_rendered_records_match_jsonify()
+    test_records_store_layouts()
+    print("Candidate matches render like the original jsonify output, single and in bulk")
@@ -0,0 +1,42 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Ensure we can import the app helpers when run as a script from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from src.utils.candidate_partitions import CandidatePartitions, PARTITION_COLUMN
+
+def make_csv(n_rows=400, seed=42):
+    rng = np.random.default_rng(seed)
+    levels = ["Entry-level", "Mid-level", "Senior-level", "Executive"]
+    skills = ["Python", "SQL", "AWS", "Docker", "Java", "React", "Spark", "R"]
+    lines = ["Candidate ID,Name,Experience Level,Skills"]
+    for i in range(n_rows):
+        picked = ", ".join(rng.choice(skills, size=int(rng.integers(1, 5)), replace=False))
+        lines.append(f'CAN_{i},Person {i},{rng.choice(levels)},"{picked}"')
+    return "\n".join(lines) + "\n"
+
+def test_partitions_from_read_csv():
+    # Whatever dtype this pandas gives text columns (object, or str under pandas >= 3)
+    df = pd.read_csv(io.StringIO(make_csv()))
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(df["Skills"].str.replace(",", " "))
+    partitions = CandidatePartitions(df, matrix)
+
+    assert partitions.partition_column == PARTITION_COLUMN, f"filterable columns: {partitions.columns}"
+    assert "Candidate ID" not in partitions.columns and "Name" not in partitions.columns
+
+    query = vectorizer.transform(["Python SQL"])
+    indices, scores = partitions.search(query, 10, {PARTITION_COLUMN: "Mid-level"})
+    assert len(indices) == 10
+    assert (df[PARTITION_COLUMN].iloc[indices] == "Mid-level").all()
+    expected = partitions.select({PARTITION_COLUMN: ["Mid-level"]})
+    np.testing.assert_array_equal(expected, np.flatnonzero(df[PARTITION_COLUMN] == "Mid-level"))
+    print(f"Partitions built from read_csv ({df[PARTITION_COLUMN].dtype} columns): {partitions.columns}")
+
+if __name__ == "__main__":
+    test_partitions_from_read_csv()
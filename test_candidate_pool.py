@@ -0,0 +1,166 @@
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+# Ensure we can import the app helpers when run as a script from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from src.utils.candidate_pool import CandidatePool, ID_COLUMN, MAX_SEGMENTS
+from test_candidate_search import QUERIES, make_candidates, make_pool
+
+def live_records(pool):
+    """{Candidate ID: pre-rendered record} of every live candidate."""
+    snapshot = pool.latest()
+    records = {}
+    for s, segment in enumerate(snapshot.segments):
+        rows = np.flatnonzero(~snapshot.deleted[s])
+        for row, candidate_id in zip(rows.tolist(), segment.records.field_values(ID_COLUMN, rows)):
+            assert candidate_id not in records, f"{candidate_id} is live twice"
+            records[candidate_id] = segment.records.fragment(row)
+    return records
+
+def results(pool, vectorizer, k=20):
+    """Top-k records and scores per query (row numbers differ between pools, records do not)."""
+    snapshot = pool.latest()
+    out = []
+    for text in QUERIES:
+        rows, scores = snapshot.search(vectorizer.transform([text]), k)
+        out.append((snapshot.fragments(rows), scores.tolist()))
+    return out
+
+def assert_same_pool(pool, other, vectorizer):
+    assert live_records(pool) == live_records(other)
+    assert results(pool, vectorizer) == results(other, vectorizer)
+
+def journal_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [line for line in f if line.strip()]
+
+def apply_updates(pool, seed):
+    """A mix of adds, a replacement of a trained candidate and deletes; returns the IDs it removed."""
+    for batch in range(3):
+        pool.add(make_candidates(10, seed=seed + batch, start=10 * batch + 100 * seed, prefix="NEW"))
+    pool.add(make_candidates(1, seed=seed).assign(**{ID_COLUMN: [f"CAN_{seed}"]}))
+    removed = [f"CAN_{seed + 1}", f"NEW_{100 * seed + 3}"]
+    assert pool.delete(removed) == 2
+    return removed
+
+def test_updates_without_journal():
+    df, vectorizer, matrix = make_pool()
+    pool = CandidatePool(vectorizer, df, matrix)
+    removed = apply_updates(pool, seed=1)
+    records = live_records(pool)
+    assert len(records) == len(df) + 30 - 2
+    assert not set(removed) & set(records) and "NEW_130" not in records and "NEW_129" in records
+    assert pool.delete(["NOBODY"]) == 0 and pool.add([]) == 0
+    for bad in ([{ID_COLUMN: "X"}], [{"Skills": "Python"}], [{ID_COLUMN: None, "Skills": "Python"}]):
+        try:
+            pool.add(bad)
+            raise AssertionError(f"{bad} was accepted")
+        except ValueError:
+            pass
+
+    before = results(pool, vectorizer)
+    pool.compact()
+    assert len(pool.snapshot.segments) == 1 and sum(pool.snapshot.n_deleted) == 0
+    assert live_records(pool) == records and results(pool, vectorizer) == before
+
+def test_journal_replay_and_checkpoint():
+    df, vectorizer, matrix = make_pool()
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = os.path.join(tmp, "candidate_updates.ndjson")
+        pool = CandidatePool(vectorizer, df, matrix, journal_path=journal, base_version="v1")
+        apply_updates(pool, seed=1)
+        # Header plus one line per change until the next compaction
+        assert len(journal_lines(journal)) == 1 + 5
+        assert_same_pool(CandidatePool(vectorizer, df, matrix, journal_path=journal, base_version="v1"), pool, vectorizer)
+
+        pool.compact()
+        lines = journal_lines(journal)
+        assert len(lines) == 2 and '"op": "checkpoint"' in lines[1]
+        pool.delete(["NEW_105"])
+        assert len(journal_lines(journal)) == 3
+        reloaded = CandidatePool(vectorizer, df, matrix, journal_path=journal, base_version="v1")
+        assert_same_pool(reloaded, pool, vectorizer)
+        # Loading compacts and checkpoints what it replayed
+        assert len(reloaded.snapshot.segments) == 1 and len(journal_lines(journal)) == 2
+
+        # Replay stays bounded however many changes were journaled
+        for i in range(3 * MAX_SEGMENTS):
+            pool.add([{ID_COLUMN: f"LOOP_{i}", "Skills": "Python, Go"}])
+        reloaded = CandidatePool(vectorizer, df, matrix, journal_path=journal, base_version="v1")
+        assert_same_pool(reloaded, pool, vectorizer)
+
+        # Retrained candidates: the journal no longer applies and is dropped
+        retrained = CandidatePool(vectorizer, df, matrix, journal_path=journal, base_version="v2")
+        assert not os.path.exists(journal)
+        assert len(live_records(retrained)) == len(df)
+
+def test_workers_share_journal():
+    # Two pools on one journal behave like two worker processes (the flock is per open file)
+    df, vectorizer, matrix = make_pool()
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = os.path.join(tmp, "candidate_updates.ndjson")
+        first = CandidatePool(vectorizer, df, matrix, journal_path=journal, base_version="v1")
+        second = CandidatePool(vectorizer, df, matrix, journal_path=journal, base_version="v1")
+
+        first.add([{ID_COLUMN: "NEW_A", "Skills": "Python, SQL"}])
+        assert "NEW_A" in live_records(second)
+        second.delete(["NEW_A", "CAN_7"])
+        second.add([{ID_COLUMN: "NEW_B", "Skills": "Go"}])
+        records = live_records(first)
+        assert "NEW_A" not in records and "CAN_7" not in records and "NEW_B" in records
+
+        # A checkpoint written by one worker keeps the other's updates...
+        first.compact()
+        assert len(journal_lines(journal)) == 2
+        assert_same_pool(second, first, vectorizer)
+        # ...and the other reconciles with it, then keeps appending after it
+        second.add([{ID_COLUMN: "NEW_B", "Skills": "Java"}, {ID_COLUMN: "NEW_C", "Skills": "AWS"}])
+        second.compact()
+        first.delete(["NEW_C"])
+        fresh = CandidatePool(vectorizer, df, matrix, journal_path=journal, base_version="v1")
+        for pool in (first, second):
+            assert_same_pool(pool, fresh, vectorizer)
+        assert '"Java"' in live_records(fresh)["NEW_B"].decode()
+
+def test_concurrent_writers():
+    df, vectorizer, matrix = make_pool()
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = os.path.join(tmp, "candidate_updates.ndjson")
+        pools = [CandidatePool(vectorizer, df, matrix, journal_path=journal, base_version="v1") for _ in range(2)]
+        errors = []
+
+        def write(worker, pool):
+            try:
+                for i in range(30):
+                    pool.add([{ID_COLUMN: f"W{worker}_{i}", "Skills": "Python, Docker"}])
+                    if i % 3 == 0:
+                        pool.delete([f"CAN_{worker * 100 + i}"])
+                    if i % 10 == 9:
+                        pool.compact()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(worker, pool)) for worker, pool in enumerate(pools)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, errors
+
+        fresh = CandidatePool(vectorizer, df, matrix, journal_path=journal, base_version="v1")
+        records = live_records(fresh)
+        assert all(f"W{worker}_{i}" in records for worker in range(2) for i in range(30))
+        assert len(records) == len(df) + 60 - 20
+        for pool in pools:
+            assert_same_pool(pool, fresh, vectorizer)
+
+if __name__ == "__main__":
+    test_updates_without_journal()
+    test_journal_replay_and_checkpoint()
+    test_workers_share_journal()
+    test_concurrent_writers()
+    print("Candidate pool updates, journal replay and shared journals behave")
@@ -0,0 +1,179 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Ensure we can import the app helpers when run as a script from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from src.utils.candidate_index import CandidateIndex, top_k
+from src.utils.candidate_ivf import CandidateIVF
+from src.utils.candidate_partitions import CandidatePartitions, PARTITION_COLUMN
+from src.utils.candidate_pool import CandidatePool, ID_COLUMN, candidate_text
+
+LEVELS = ["Entry-level", "Mid-level", "Senior-level", "Executive"]
+LOCATIONS = ["Bangalore", "Pune", "Remote"]
+SKILLS = ["Python", "SQL", "AWS", "Docker", "Java", "React", "Spark", "R", "Go", "Kubernetes", "Excel", "Tableau"]
+QUERIES = ["Python SQL", "Java", "Docker Kubernetes AWS", "R R Excel", "Python Python Go Spark Tableau", "COBOL"]
+K_VALUES = [1, 5, 20, 300]
+
+def make_candidates(n_rows, seed=7, start=0, prefix="CAN"):
+    # Few distinct skills, so many candidates tie and tie order is exercised
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        ID_COLUMN: [f"{prefix}_{start + i}" for i in range(n_rows)],
+        "Name": [f"Person {start + i}" for i in range(n_rows)],
+        PARTITION_COLUMN: rng.choice(LEVELS, n_rows),
+        "Location": rng.choice(LOCATIONS, n_rows),
+        "Skills": [", ".join(rng.choice(SKILLS, size=int(rng.integers(1, 5)), replace=False)) for _ in range(n_rows)],
+    })
+
+def make_pool(n_rows=250):
+    df = make_candidates(n_rows)
+    vectorizer = TfidfVectorizer()
+    matrix = vectorizer.fit_transform(candidate_text(df))
+    return df, vectorizer, matrix
+
+def reference(query, matrix, k, rows=None):
+    """Brute force: cosine_similarity over every (or only `rows`) candidate, then top_k."""
+    scores = cosine_similarity(query, matrix).ravel()
+    rows = np.arange(matrix.shape[0], dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+    return top_k(rows, scores[rows], k)
+
+def assert_same(result, expected, context):
+    np.testing.assert_array_equal(result[0], expected[0], err_msg=f"rows differ: {context}")
+    np.testing.assert_array_equal(result[1], expected[1], err_msg=f"scores differ: {context}")
+
+def test_index_search():
+    _, vectorizer, matrix = make_pool()
+    index = CandidateIndex(matrix)
+    for text in QUERIES:
+        query = vectorizer.transform([text])
+        for k in K_VALUES:
+            expected = reference(query, matrix, k)
+            assert_same(index.search(query, k), expected, (text, k))
+            assert_same(index.search_exhaustive(query, k), expected, (text, k))
+
+def test_index_search_batch():
+    _, vectorizer, matrix = make_pool()
+    index = CandidateIndex(matrix)
+    queries = vectorizer.transform(QUERIES)
+    for k in K_VALUES:
+        # A tiny score budget forces one product per query, the default scores them all at once
+        for max_scores in (1, 10_000_000):
+            results = list(index.search_batch(queries, k, max_scores=max_scores))
+            assert [row for row, _, _ in results] == list(range(len(QUERIES)))
+            for row, indices, scores in results:
+                assert_same((indices, scores), reference(queries[row], matrix, k), (QUERIES[row], k, max_scores))
+
+def test_partitions_search():
+    df, vectorizer, matrix = make_pool()
+    partitions = CandidatePartitions(df, matrix)
+    assert partitions.partition_column == PARTITION_COLUMN
+    # Partition-only filters search per-partition indexes, any other combination scores the selected rows
+    filters = [None, {PARTITION_COLUMN: "Mid-level"}, {PARTITION_COLUMN: ["Entry-level", "Executive"]},
+               {"Location": "Remote"}, {PARTITION_COLUMN: "Senior-level", "Location": ["Pune", "Remote"]}]
+    for text in QUERIES:
+        query = vectorizer.transform([text])
+        for k in K_VALUES:
+            for wanted in filters:
+                rows = partitions.select(wanted) if wanted else None
+                assert_same(partitions.search(query, k, wanted), reference(query, matrix, k, rows), (text, k, wanted))
+
+def test_ivf_search():
+    _, vectorizer, matrix = make_pool()
+    index = CandidateIndex(matrix)
+    ivf = CandidateIVF.build(matrix, n_lists=8)
+    cosine = cosine_similarity(matrix, vectorizer.transform(QUERIES)).T
+    for q, text in enumerate(QUERIES):
+        query = vectorizer.transform([text])
+        for k in K_VALUES:
+            expected = reference(query, matrix, k)
+            # Probing every list is exact
+            assert_same(ivf.search(index, query, k, nprobe=ivf.n_lists)[:2], expected, (text, k))
+            indices, scores, _ = ivf.search(index, query, k, nprobe=1)
+            if query.nnz == 0:
+                # No known terms: the exact answer, not whatever one list holds
+                assert_same((indices, scores), expected, (text, k, "no known terms"))
+            else:
+                assert len(indices) <= k and np.array_equal(scores, cosine[q, indices]), (text, k)
+
+def live_candidates(snapshot, df, matrix, vectorizer, expected_skills):
+    """
+    Row numbers, IDs and levels of the snapshot's live rows, plus their
+    original vectors: trained rows from the trained matrix, appended rows
+    vectorized from the skills they were last added with.
+    """
+    rows, ids, levels, vectors = [], [], [], []
+    for s, segment in enumerate(snapshot.segments):
+        local = np.flatnonzero(~snapshot.deleted[s])
+        rows.append(local + snapshot.offsets[s])
+        for row, candidate_id, level in zip(local.tolist(), segment.records.field_values(ID_COLUMN, local),
+                                            segment.records.field_values(PARTITION_COLUMN, local)):
+            origin = segment.origin[row]
+            if origin >= 0:
+                assert df[ID_COLUMN].iloc[origin] == candidate_id and df["Skills"].iloc[origin] == expected_skills[candidate_id]
+                vectors.append(matrix[origin])
+            else:
+                vectors.append(vectorizer.transform([expected_skills[candidate_id].replace(",", " ")]))
+            ids.append(candidate_id)
+            levels.append(level)
+    return np.concatenate(rows), ids, np.array(levels), sp.vstack(vectors).tocsr()
+
+def check_snapshot(snapshot, df, matrix, vectorizer, expected_skills):
+    rows, ids, levels, live_matrix = live_candidates(snapshot, df, matrix, vectorizer, expected_skills)
+    assert sorted(ids) == sorted(expected_skills), "live candidates differ from the adds and deletes made"
+
+    # Live rows are numbered in ascending order, so ranking their positions keeps the tie order
+    def expected(query, k, positions=None):
+        indices, scores = reference(query, live_matrix, k, positions)
+        return rows[indices], scores
+
+    mid = np.flatnonzero(levels == "Mid-level")
+    queries = vectorizer.transform(QUERIES)
+    for q, text in enumerate(QUERIES):
+        for k in K_VALUES:
+            assert_same(snapshot.search(queries[q], k), expected(queries[q], k), (text, k))
+            assert_same(snapshot.search(queries[q], k, {PARTITION_COLUMN: "Mid-level"}),
+                        expected(queries[q], k, mid), (text, k, "Mid-level"))
+    for k in K_VALUES:
+        for row, indices, scores in snapshot.search_batch(queries, k):
+            assert_same((indices, scores), expected(queries[row], k), (QUERIES[row], k, "batch"))
+
+def test_pool_search_after_updates():
+    df, vectorizer, matrix = make_pool()
+    pool = CandidatePool(vectorizer, df, matrix)
+    expected_skills = dict(zip(df[ID_COLUMN], df["Skills"]))
+
+    for batch in range(3):
+        added = make_candidates(15, seed=100 + batch, start=15 * batch, prefix="NEW")
+        pool.add(added)
+        expected_skills.update(zip(added[ID_COLUMN], added["Skills"]))
+    # Replacing a trained candidate tombstones its old row
+    replaced = make_candidates(2, seed=200).assign(**{ID_COLUMN: ["CAN_3", "CAN_4"]})
+    pool.add(replaced)
+    expected_skills.update(zip(replaced[ID_COLUMN], replaced["Skills"]))
+    removed = ["CAN_0", "CAN_10", "CAN_11", "NEW_1", "NEW_20", "CAN_3"]
+    assert pool.delete(removed + ["MISSING"]) == len(removed)
+    for candidate_id in removed:
+        del expected_skills[candidate_id]
+
+    snapshot = pool.snapshot
+    assert len(snapshot.segments) > 1 and sum(snapshot.n_deleted) > 0
+    check_snapshot(snapshot, df, matrix, vectorizer, expected_skills)
+
+    pool.compact()
+    snapshot = pool.snapshot
+    assert len(snapshot.segments) == 1 and sum(snapshot.n_deleted) == 0
+    check_snapshot(snapshot, df, matrix, vectorizer, expected_skills)
+    print(f"Pool search matches brute force over {len(snapshot)} live candidates before and after compaction")
+
+if __name__ == "__main__":
+    test_index_search()
+    test_index_search_batch()
+    test_partitions_search()
+    test_ivf_search()
+    test_pool_search_after_updates()
@@ -0,0 +1,89 @@
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Ensure we can import the app helpers when run as a script from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from src.utils.columnar import (
+    ColumnarWriter, VERSION_PREFIX, columnar_path, convert_csv, fresh_columnar, iter_dataset_chunks, load_dataset,
+)
+
+def make_csv(directory, n_rows=3000, seed=4):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "role": rng.choice(["Data Scientist", "Chef", "ML Engineer"], n_rows),
+        "experience_years": rng.integers(0, 20, n_rows),
+        "salary_lpa": np.round(rng.uniform(3, 60, n_rows), 2),
+        "skills": rng.choice(["Python|SQL", "Go", None], n_rows),
+    })
+    path = os.path.join(directory, "jobs.csv")
+    df.to_csv(path, index=False)
+    return path, pd.read_csv(path)
+
+def as_csv(df):
+    # Compares values only: columnar frames are backed by memmaps and Categoricals
+    return df.reset_index(drop=True).to_csv(index=False)
+
+def versions(csv_path):
+    return [name for name in os.listdir(columnar_path(csv_path)) if name.startswith(VERSION_PREFIX)]
+
+def test_columnar_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, expected = make_csv(tmp)
+        assert fresh_columnar(csv_path) is None
+        dataset_dir = convert_csv(csv_path, chunksize=700)
+        assert dataset_dir == fresh_columnar(csv_path)
+        assert as_csv(load_dataset(csv_path, categorical=False)) == as_csv(expected)
+        chunks = list(iter_dataset_chunks(csv_path, 1000))
+        assert [len(c) for c in chunks] == [1000, 1000, 1000]
+        assert as_csv(pd.concat(chunks)) == as_csv(expected)
+
+def test_republish_during_reads():
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, expected = make_csv(tmp)
+        convert_csv(csv_path)
+        errors, done = [], threading.Event()
+
+        def read():
+            while not done.is_set():
+                try:
+                    assert fresh_columnar(csv_path) is not None, "no current version"
+                    assert as_csv(pd.concat(iter_dataset_chunks(csv_path, 400))) == as_csv(expected)
+                except Exception as e:
+                    errors.append(e)
+
+        readers = [threading.Thread(target=read) for _ in range(3)]
+        for reader in readers:
+            reader.start()
+        try:
+            for _ in range(30):
+                assert convert_csv(csv_path, chunksize=500) is not None
+        finally:
+            done.set()
+            for reader in readers:
+                reader.join()
+        assert not errors, errors[:3]
+        # The current version plus the one before it
+        assert len(versions(csv_path)) == 2
+
+def test_unversioned_copy_is_replaced():
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path, expected = make_csv(tmp, n_rows=50)
+        # The layout written before versions existed: the dataset straight in foo.cols
+        writer = ColumnarWriter(columnar_path(csv_path))
+        writer.append(expected)
+        writer.close({"size": 0, "mtime_ns": 0})
+        assert fresh_columnar(csv_path) is None
+        convert_csv(csv_path)
+        assert not os.path.exists(os.path.join(columnar_path(csv_path), "meta.json"))
+        assert as_csv(load_dataset(csv_path, categorical=False)) == as_csv(expected)
+
+if __name__ == "__main__":
+    test_columnar_round_trip()
+    test_republish_during_reads()
+    test_unversioned_copy_is_replaced()
+    print("Columnar copies round-trip and stay readable while being republished")
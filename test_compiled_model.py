@@ -0,0 +1,60 @@
+import os
+import sys
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+
+# Ensure we can import the app helpers when run as a script from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from src.utils.compiled_trees import CompiledTreeModel, load_compiled_model
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "models")
+
+def make_inputs(n_features, n_rows=5000, seed=42):
+    rng = np.random.default_rng(seed)
+    X = (rng.random((n_rows, n_features)) < 0.1).astype(np.float32)  # skill indicators
+    X[:, 0] = rng.normal(3.4, 0.4, n_rows)   # target-encoded role
+    X[:, 1] = rng.normal(3.4, 0.4, n_rows)   # target-encoded location
+    X[:, 2] = rng.integers(0, 25, n_rows)    # experience_years
+    X[::13, 3] = np.nan                      # missing values follow the default branch
+    X[::17, 2] = np.inf
+    return X
+
+def test_compiled_model_parity():
+    model = joblib.load(os.path.join(MODELS_DIR, "salary_model.pkl"))
+    compiled = CompiledTreeModel.from_booster(model)
+    X = make_inputs(compiled.n_features)
+
+    expected = model.predict(X)
+    np.testing.assert_allclose(compiled.predict(X), expected, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(compiled.predict(X[:1]), expected[:1], rtol=0, atol=1e-6)
+    print(f"Compiled model matches model.predict on {len(X)} rows "
+          f"(max abs diff {np.abs(compiled.predict(X) - expected).max():.2e})")
+
+def test_compiled_model_sparse_input():
+    # CSR input: absent entries are missing, exactly like NaN in a dense row
+    model = joblib.load(os.path.join(MODELS_DIR, "salary_model.pkl"))
+    compiled = CompiledTreeModel.from_booster(model)
+    X = make_inputs(compiled.n_features, n_rows=9000, seed=3)
+    X[~np.isfinite(X)] = 0
+    X_missing = np.where(X == 0, np.nan, X).astype(np.float32)
+
+    expected = compiled.predict(X_missing)
+    np.testing.assert_array_equal(compiled.predict(sp.csr_matrix(X)), expected)
+    np.testing.assert_allclose(model.predict(sp.csr_matrix(X)), expected, rtol=0, atol=1e-6)
+    print(f"Compiled model reads CSR input like dense rows with NaN for absent entries ({len(X)} rows)")
+
+def test_shipped_artifact_is_current():
+    compiled = load_compiled_model(os.path.join(MODELS_DIR, "salary_model_compiled.npz"),
+                                   os.path.join(MODELS_DIR, "salary_model.pkl"))
+    assert compiled is not None, "salary_model_compiled.npz is missing or stale; run src/models/compile_model.py"
+    model = joblib.load(os.path.join(MODELS_DIR, "salary_model.pkl"))
+    X = make_inputs(compiled.n_features, n_rows=500, seed=7)
+    np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=0, atol=1e-6)
+    print("Shipped salary_model_compiled.npz is current.")
+
+if __name__ == "__main__":
+    test_compiled_model_parity()
+    test_compiled_model_sparse_input()
+    test_shipped_artifact_is_current()
@@ -0,0 +1,269 @@
+import io
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Ensure we can import the app helpers when run as a script from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import src.api.flask_app as flask_app
+from src.utils.market_analytics import STANDARD_ROLES, RoleNormalizer, SkillVocabulary, split_skills
+from src.utils.market_cache import MarketDataCache
+
+TITLES = ["Senior Data Scientist", "data analyst", "Backend Developer II", "Chef", "Lead ML Engineer",
+          "Cloud Architect", "sous chef", "Software Engineer", "QA Automation Engineer", "Janitor"]
+SKILLS = ["Python", "SQL", "AWS", "Docker", "Java", "React", "Excel", "Tableau", "Go"]
+
+def make_dataset(n_rows=600, seed=11):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Job Title": rng.choice(TITLES, n_rows),
+        "Salary": np.round(rng.uniform(3, 60, n_rows), 2),
+        "Skills": ["|".join(rng.choice(SKILLS, size=int(rng.integers(1, 5)), replace=False)) for _ in range(n_rows)],
+        "Experience": [f"{years} years" for years in rng.integers(0, 15, n_rows)],
+    })
+
+@contextmanager
+def market_app(df):
+    """A test client serving `df` as the analytics dataset, with caches in a scratch directory."""
+    data_path, cache = flask_app.DATA_PATH, flask_app.market_cache
+    with tempfile.TemporaryDirectory() as tmp:
+        df.to_csv(os.path.join(tmp, "job_market_analytics_dataset.csv"), index=False)
+        flask_app.DATA_PATH = tmp
+        flask_app.market_cache = MarketDataCache(os.path.join(tmp, "market_cache"))
+        try:
+            yield flask_app.app.test_client()
+        finally:
+            flask_app.DATA_PATH, flask_app.market_cache = data_path, cache
+
+def baseline_normalize_role(role):
+    """Row-by-row title normalization of the original /api/market_data."""
+    if not isinstance(role, str):
+        return "Other"
+    best_match, max_score = "Other", 0
+    for std in STANDARD_ROLES:
+        overlap = len(set(std.lower().split()) & set(role.lower().split()))
+        if overlap > max_score:
+            max_score, best_match = overlap, std
+    return best_match if max_score > 0 else role.title()
+
+def reference_frame(df):
+    """The dataset as the original endpoint cleaned it: normalized roles, numeric years, skill lists."""
+    return pd.DataFrame({
+        "role": df["Job Title"].apply(baseline_normalize_role),
+        "salary": pd.to_numeric(df["Salary"], errors="coerce").fillna(0),
+        "experience": df["Experience"].astype(str).str.extract(r"(\d+)")[0].astype(float).fillna(0).astype(int),
+        "skills": df["Skills"].apply(split_skills),
+    })
+
+def make_messy_dataset(n_rows=2000, seed=11):
+    """make_dataset with missing and malformed cells sprinkled in."""
+    df = make_dataset(n_rows, seed).astype({"Salary": object})
+    df.loc[::37, "Skills"] = "Python; SQL,  Go|"
+    df.loc[::53, "Skills"] = None
+    df.loc[::41, "Job Title"] = None
+    df.loc[::43, "Job Title"] = "  senior DATA   scientist "
+    df.loc[::29, "Salary"] = "n/a"
+    df.loc[::31, "Experience"] = "fresher"
+    return df
+
+def baseline_payload(df):
+    """Skill demand, record count and filter choices as the original /api/market_data computed them."""
+    df = df.copy()
+    roles = set(df["Job Title"].apply(baseline_normalize_role).unique())
+    experience = df["Experience"].astype(str).str.extract(r"(\d+)").astype(float).fillna(0).astype(int)
+    all_skills = df["Skills"].astype(str).apply(lambda x: [s.strip() for s in str(x).replace("|", ",").replace(";", ",").split(",")]).explode()
+    return {
+        "skill_demand": [{"skill": s, "count": int(c)} for s, c in all_skills.value_counts().head(10).items()],
+        "total_records": len(df),
+        "filters": {
+            "roles": sorted(set(STANDARD_ROLES) & roles) + sorted(roles - set(STANDARD_ROLES)),
+            "skills": sorted(all_skills.dropna().unique().tolist()),
+            "experience": sorted(experience[0].unique().tolist()),
+        },
+    }
+
+def assert_aggregates(payload, ref):
+    assert payload["total_records"] == len(ref)
+    job_salary = ref.groupby("role")["salary"].mean()
+    assert [item["title"] for item in payload["job_salary"]] == job_salary.index.tolist()
+    np.testing.assert_allclose([item["salary"] for item in payload["job_salary"]], job_salary.to_numpy(), rtol=1e-12)
+    exp_salary = ref.groupby("experience")["salary"].mean()
+    assert [item["level"] for item in payload["exp_salary"]] == exp_salary.index.tolist()
+    np.testing.assert_allclose([item["salary"] for item in payload["exp_salary"]], exp_salary.to_numpy(), rtol=1e-12)
+
+def test_role_normalization_matches_row_by_row():
+    rng = np.random.default_rng(8)
+    tokens = sorted({t for std in STANDARD_ROLES for t in std.split()}) + ["Senior", "ii", "Chef", "Head"]
+    titles = [" ".join(rng.choice(tokens, size=int(rng.integers(1, 5)))) for _ in range(3000)]
+    titles += ["", "   ", None, np.nan, 5, "data", "DATA ENGINEER", "engineer data", "sous chef", "Chef"]
+    # A tiny memo is cleared repeatedly, which must not change the answers
+    for normalizer in (RoleNormalizer(), type("Small", (RoleNormalizer,), {"MAX_MEMO_SIZE": 7})()):
+        expected = [baseline_normalize_role(title) for title in titles]
+        assert [normalizer.normalize(title) for title in titles] == expected
+        assert normalizer.normalize_series(pd.Series(titles, dtype=object)).astype(object).tolist() == expected
+
+    df = make_messy_dataset()
+    with market_app(df) as client:
+        payload = client.get("/api/market_data").get_json()
+    assert payload["filters"]["roles"] == baseline_payload(df)["filters"]["roles"]
+    assert_aggregates(payload, reference_frame(df))
+
+def test_skill_demand_matches_value_counts():
+    df = make_messy_dataset()
+    vocabulary = SkillVocabulary()
+    # Tokenized in two chunks, so ids interned by the first carry over to the second
+    counts = [vocabulary.tokenize(df["Skills"].iloc[:700]), vocabulary.tokenize(df["Skills"].iloc[700:])]
+    for chunk, start in zip(counts, (0, 700)):
+        for row, value in enumerate(df["Skills"].iloc[start:start + chunk.shape[0]]):
+            expected = pd.Series(split_skills(value)).value_counts().to_dict()
+            found = chunk[row]
+            assert {vocabulary.skills[i]: int(c) for i, c in zip(found.indices, found.data)} == expected, value
+
+    with market_app(df) as client:
+        payload = client.get("/api/market_data").get_json()
+    expected = baseline_payload(df)
+    assert payload["skill_demand"] == expected["skill_demand"]
+    assert payload["filters"]["skills"] == expected["filters"]["skills"]
+    assert payload["total_records"] == expected["total_records"]
+
+def upload(client, df, filename="jobs.csv"):
+    blob = df.to_csv(index=False).encode("utf-8")
+    return client.post("/api/upload_csv", data={"file": (io.BytesIO(blob), filename)}, content_type="multipart/form-data")
+
+def test_upload_streams_into_the_same_analytics():
+    df = make_messy_dataset(n_rows=2500, seed=5)
+    chunk_rows = flask_app.CHUNK_ROWS
+    with market_app(make_dataset(n_rows=30)) as client:
+        # Several chunks per upload, so chunked aggregation is what gets compared
+        flask_app.CHUNK_ROWS = 400
+        try:
+            resp = upload(client, df)
+        finally:
+            flask_app.CHUNK_ROWS = chunk_rows
+        assert resp.status_code == 200, resp.get_json()
+        saved = os.path.join(flask_app.DATA_PATH, "job_market_analytics_dataset.csv")
+        pd.testing.assert_frame_equal(pd.read_csv(saved), pd.read_csv(io.BytesIO(df.to_csv(index=False).encode("utf-8"))))
+        assert not [name for name in os.listdir(flask_app.DATA_PATH) if name.endswith((".upload", ".tmp"))]
+
+        payload = client.get("/api/market_data").get_json()
+        expected = baseline_payload(df)
+        for key in ("skill_demand", "total_records", "filters"):
+            assert payload[key] == expected[key], key
+        assert_aggregates(payload, reference_frame(df))
+
+        # A file that fails to parse leaves the current dataset and no spool files behind
+        bad = client.post("/api/upload_csv", data={"file": (io.BytesIO(b'a,b\n1,"2\n'), "bad.csv")},
+                          content_type="multipart/form-data")
+        assert bad.status_code == 500
+        assert client.get("/api/market_data").get_json()["total_records"] == len(df)
+        assert not [name for name in os.listdir(flask_app.DATA_PATH) if name.endswith((".upload", ".tmp"))]
+        assert upload(client, df, filename="jobs.xlsx").status_code == 400
+
+def test_market_filters_match_pandas():
+    df = make_dataset()
+    ref = reference_frame(df)
+    has = lambda skill: ref["skills"].apply(lambda skills: skill in skills)
+    cases = [
+        ({"roles": ["Data Scientist", "Chef"]}, ref["role"].isin(["Data Scientist", "Chef"])),
+        ({"role": "Data Analyst"}, ref["role"] == "Data Analyst"),
+        ({"skills": ["Python", "SQL"]}, has("Python") & has("SQL")),
+        ({"skills": ["Python", "SQL"], "skills_match": "any"}, has("Python") | has("SQL")),
+        ({"experience_min": 3, "experience_max": 7}, ref["experience"].between(3, 7)),
+        ({"roles": ["Software Engineer"], "skill": "Go", "experience_min": 5},
+         (ref["role"] == "Software Engineer") & has("Go") & (ref["experience"] >= 5)),
+        ({"roles": ["Nobody"]}, ref["role"] == "Nobody"),
+    ]
+    with market_app(df) as client:
+        for filters, mask in cases:
+            resp = client.post("/api/market_data", json={"filters": filters})
+            assert resp.status_code == 200, (filters, resp.get_json())
+            payload = resp.get_json()
+            assert_aggregates(payload, ref[mask])
+            # Filter choices always describe the whole dataset
+            assert payload["filters"]["experience"] == sorted(ref["experience"].unique().tolist())
+
+def test_market_filters_from_query_string():
+    df = make_dataset()
+    ref = reference_frame(df)
+    both = ref["skills"].apply(lambda skills: "Python" in skills and "SQL" in skills)
+    with market_app(df) as client:
+        # Repeated singular keys keep every value, like the plural form
+        repeated = client.get("/api/market_data?skill=Python&skill=SQL").get_json()
+        plural = client.get("/api/market_data?skills=Python&skills=SQL").get_json()
+        assert repeated["applied_filters"]["skills"] == ["Python", "SQL"]
+        assert repeated["total_records"] == plural["total_records"] == int(both.sum())
+        ranged = client.get("/api/market_data?role=Chef&experience_min=2").get_json()
+        assert ranged["total_records"] == int(((ref["role"] == "Chef") & (ref["experience"] >= 2)).sum())
+
+def test_market_filters_reject_malformed_input():
+    df = make_dataset(n_rows=50)
+    with market_app(df) as client:
+        unfiltered = client.get("/api/market_data").get_json()
+        # A body that is not an object is ignored, as it always was
+        resp = client.post("/api/market_data", json=[1, 2])
+        assert resp.status_code == 200 and resp.get_json()["total_records"] == unfiltered["total_records"]
+
+        for body in [{"filters": [1]}, {"filters": "Chef"}, {"filters": {"roles": [["x"]]}},
+                     {"filters": {"roles": [1]}}, {"filters": {"role": ["Chef"]}}, {"filters": {"skills": 5}},
+                     {"filters": {"experience_min": "many"}}, {"filters": {"experience_max": [3]}},
+                     {"filters": {"skill": "SQL", "skills_match": "some"}}, {"mapping": ["Job Title"]}]:
+            resp = client.post("/api/market_data", json=body)
+            assert resp.status_code == 400, (body, resp.status_code, resp.get_json())
+        assert client.get("/api/market_data?experience_min=abc").status_code == 400
+
+def test_salary_breakdown_matches_pandas():
+    df = make_dataset()
+    ref = reference_frame(df)
+    expected = ref.groupby("role")["salary"].agg(["count", "mean", "min", "max"])
+    with market_app(df) as client:
+        for request in ({"json": {"group_by": ["role"], "filters": {"role": ["Chef", "Data Analyst"]}}},
+                        {"query_string": "group_by=role&role=Chef&role=Data Analyst"}):
+            method = client.post if "json" in request else client.get
+            resp = method("/api/salary_breakdown", **request)
+            assert resp.status_code == 200, (request, resp.get_json())
+            groups = resp.get_json()["groups"]
+            assert [g["role"] for g in groups] == ["Chef", "Data Analyst"]
+            for g in groups:
+                row = expected.loc[g["role"]]
+                assert g["count"] == row["count"] and g["min"] == row["min"] and g["max"] == row["max"]
+                assert abs(g["mean"] - row["mean"]) <= 1e-9 * row["mean"]
+
+def test_salary_breakdown_rejects_malformed_input():
+    with market_app(make_dataset(n_rows=50)) as client:
+        for body in [[1, 2], {"filters": ["Chef"]}, {"filters": "Chef"}, {"filters": {"role": [["Chef"]]}},
+                     {"filters": {"role": 5}}, {"filters": {"planet": "Mars"}}, {"group_by": 5},
+                     {"group_by": [["role"]]}, {"percentiles": ["p90"]}, {"percentiles": [120]},
+                     {"mapping": ["Job Title"]}]:
+            resp = client.post("/api/salary_breakdown", json=body)
+            assert resp.status_code == 400, (body, resp.status_code, resp.get_json())
+
+def test_market_cache_is_bounded():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MarketDataCache(os.path.join(tmp, "market_cache"))
+        payloads = {f"key{i}": {"total_records": i, "salaries": [i / 3, None]} for i in range(3 * cache.MAX_ENTRIES)}
+        for key, payload in payloads.items():
+            cache.put(key, payload)
+            cache.put_artifact(key, "cube", {"rows": payload["total_records"]})
+            cache.get("key0")  # recently used entries stay in memory
+        assert len(cache._entries) == cache.MAX_ENTRIES and "key0" in cache._entries
+        # Evicted entries come back from disk unchanged
+        for key, payload in payloads.items():
+            assert cache.get(key) == payload
+            assert cache.get_artifact(key, "cube") == {"rows": payload["total_records"]}
+        assert len(cache._entries) == cache.MAX_ENTRIES
+
+if __name__ == "__main__":
+    test_role_normalization_matches_row_by_row()
+    test_skill_demand_matches_value_counts()
+    test_upload_streams_into_the_same_analytics()
+    test_market_filters_match_pandas()
+    test_market_filters_from_query_string()
+    test_market_filters_reject_malformed_input()
+    test_salary_breakdown_matches_pandas()
+    test_salary_breakdown_rejects_malformed_input()
+    test_market_cache_is_bounded()
+    print("Market data drill-down filters and salary breakdowns match pandas")
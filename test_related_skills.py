@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+from collections import Counter
+
+import numpy as np
+
+# Ensure we can import the app helpers when run as a script from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import src.api.flask_app as flask_app
+from src.utils.skill_cooccurrence import SkillCooccurrence, SkillCooccurrenceBuilder
+
+ROLES = ["Data Scientist", "ML Engineer", "Backend Developer", None]
+SKILLS = ["Python", "SQL", "AWS", "Docker", "Java", "React", "Spark", "Go", "Excel", "Tableau"]
+
+def make_postings(n_rows=400, seed=3):
+    rng = np.random.default_rng(seed)
+    roles = [ROLES[i] for i in rng.integers(0, len(ROLES), n_rows)]
+    # A few postings repeat a skill or list none, which must not change the counts
+    skills = [[str(s) for s in rng.choice(SKILLS, size=int(rng.integers(0, 6)))] for _ in range(n_rows)]
+    return roles, skills
+
+def baseline_related(roles, skills_lists, skills, role=None, k=10):
+    """Counts pairs posting by posting, then sorts by score and name."""
+    known = set(skills)
+    scores = Counter()
+    for posting_role, posting_skills in zip(roles, skills_lists):
+        if role is not None and posting_role != role:
+            continue
+        posting_skills = set(posting_skills)
+        for s in posting_skills - known:
+            scores[s] += len(posting_skills & known)
+    ranked = sorted((s for s in scores if scores[s] > 0), key=lambda s: (-scores[s], s))
+    return [{"skill": s, "score": scores[s]} for s in ranked[:k]]
+
+def build(roles, skills_lists, chunk_rows=64):
+    builder = SkillCooccurrenceBuilder(by_role=True)
+    for start in range(0, len(roles), chunk_rows):
+        builder.update(roles[start:start + chunk_rows], skills_lists[start:start + chunk_rows])
+    return builder.build()
+
+def with_cooccurrence(cooccurrence, check):
+    saved = flask_app.assets.get("skill_cooccurrence")
+    flask_app.assets["skill_cooccurrence"] = cooccurrence
+    try:
+        check(flask_app.app.test_client())
+    finally:
+        flask_app.assets["skill_cooccurrence"] = saved
+
+def test_cooccurrence_matches_pair_counts():
+    roles, skills_lists = make_postings()
+    cooccurrence = build(roles, skills_lists)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "skill_cooccurrence.npz")
+        cooccurrence.save(path)
+        loaded = SkillCooccurrence.load(path)
+    for known in (["Python"], ["SQL", "AWS"], ["Go", "Go", "Nope"], SKILLS[:-1], []):
+        for role in [None] + ROLES[:3] + ["Chef"]:
+            for k in (1, 3, 10):
+                expected = baseline_related(roles, skills_lists, known, role, k) if role != "Chef" else []
+                assert cooccurrence.related(known, role, k) == expected, (known, role, k)
+                assert loaded.related(known, role, k) == expected, (known, role, k)
+
+def test_related_skills_endpoint():
+    roles, skills_lists = make_postings()
+    cooccurrence = build(roles, skills_lists)
+
+    def check(client):
+        body = {"current_skills": ["Python", "SQL"], "target_role": "Data Scientist", "top_k": 4}
+        resp = client.post("/api/related_skills", json=body)
+        assert resp.status_code == 200, resp.get_json()
+        assert resp.get_json()["related_skills"] == baseline_related(roles, skills_lists, ["Python", "SQL"], "Data Scientist", 4)
+        resp = client.post("/api/related_skills", json={"current_skills": "Docker"})
+        assert resp.get_json()["related_skills"] == baseline_related(roles, skills_lists, ["Docker"])
+        assert client.post("/api/related_skills", json={"current_skills": ["Go"], "top_k": "many"}).status_code == 400
+
+        recommended = client.post("/api/recommend_skills", json={"target_role": "Data Scientist", "current_skills": ["Python"]})
+        assert recommended.status_code == 200
+        assert recommended.get_json()["related_skills"] == baseline_related(roles, skills_lists, ["Python"], "Data Scientist")
+
+    with_cooccurrence(cooccurrence, check)
+
+def test_related_skills_without_artifact():
+    def check(client):
+        resp = client.post("/api/related_skills", json={"current_skills": ["Python"]})
+        assert resp.status_code == 503 and "skill_recommendations" in resp.get_json()["error"]
+        recommended = client.post("/api/recommend_skills", json={"target_role": "Data Scientist", "current_skills": ["Python"]})
+        assert recommended.status_code == 200 and recommended.get_json()["related_skills"] == []
+
+    with_cooccurrence(None, check)
+
+def test_shipped_artifact_covers_the_skill_data():
+    # The shipped artifact is built by the same stage as skill_recommendation_data.pkl
+    cooccurrence = flask_app.assets["skill_cooccurrence"]
+    assert cooccurrence is not None, "src/models/skill_cooccurrence.npz is missing"
+    skill_freq = flask_app.assets["skill_freq"]
+    assert set(cooccurrence.skills.tolist()) == set(skill_freq["Skills_List"])
+    assert set(cooccurrence.roles) == set(skill_freq["role"])
+    resp = flask_app.app.test_client().post("/api/recommend_skills", json={"target_role": "Data Scientist", "current_skills": ["Python"]})
+    assert resp.status_code == 200 and resp.get_json()["related_skills"]
+
+if __name__ == "__main__":
+    test_cooccurrence_matches_pair_counts()
+    test_related_skills_endpoint()
+    test_related_skills_without_artifact()
+    test_shipped_artifact_covers_the_skill_data()
+    print("Related skills match pair counts and the endpoints serve them")
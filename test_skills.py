@@ -0,0 +1,107 @@
+import os
+import sys
+
+import numpy as np
+
+# Ensure we can import the app helpers when run as a script from the repo root
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import src.api.flask_app as flask_app
+from src.utils.skill_index import TOP_ROLE_SKILLS
+
+def baseline_required(role):
+    """The original per-request scan and sort of skill_recommendation_data."""
+    sf = flask_app.assets["skill_freq"]
+    return sf[sf["role"] == role].sort_values(by="count", ascending=False).head(TOP_ROLE_SKILLS)["Skills_List"].tolist()
+
+def baseline_gap(skills, role):
+    """Set arithmetic of the original /api/recommend_skills."""
+    required = baseline_required(role)
+    matched = set(required) & set(skills)
+    missing = set(required) - set(skills)
+    return {
+        "match_percentage": int((len(matched) / len(required)) * 100) if required else 0,
+        "matched_skills": matched,
+        "missing_skills": missing,
+    }
+
+def make_pairs(n_pairs=300, seed=12):
+    rng = np.random.default_rng(seed)
+    sf = flask_app.assets["skill_freq"]
+    roles = sorted(sf["role"].unique().tolist()) + ["Astronaut", None]
+    skills = sorted(sf["Skills_List"].unique().tolist()) + ["Not A Skill"]
+    return [{
+        "skills": [str(s) for s in rng.choice(skills, size=int(rng.integers(0, 25)))],
+        "target_role": roles[int(rng.integers(0, len(roles)))],
+    } for _ in range(n_pairs)]
+
+def test_role_skills_match_the_frame_scan():
+    client = flask_app.app.test_client()
+    role_skills = flask_app.assets["role_skills"]
+    roles = sorted(flask_app.assets["skill_freq"]["role"].unique().tolist())
+    assert len(role_skills) == len(roles)
+    for role in roles:
+        for k in (1, 5, TOP_ROLE_SKILLS, 1000):
+            sf = flask_app.assets["skill_freq"]
+            expected = sf[sf["role"] == role].sort_values(by="count", ascending=False).head(k)["Skills_List"].tolist()
+            # Including the order of skills tied on count
+            assert role_skills.top_skills(role, k) == expected, (role, k)
+        resp = client.post("/api/get_role_skills", json={"target_role": role})
+        assert resp.status_code == 200 and resp.get_json()["skills"] == baseline_required(role)
+    for role in ("Astronaut", None, 5, ["Data Scientist"]):
+        assert role not in role_skills and role_skills.top_skills(role) == [], role
+    fallback = client.post("/api/get_role_skills", json={"target_role": "Astronaut"}).get_json()["skills"]
+    assert fallback == ["Python", "SQL", "Communication", "Leadership", "Project Management"]
+
+def test_skill_gap_batch_matches_set_arithmetic():
+    client = flask_app.app.test_client()
+    pairs = make_pairs()
+    resp = client.post("/api/skill_gap_batch", json={"pairs": pairs})
+    assert resp.status_code == 200, resp.get_json()
+    results = resp.get_json()["results"]
+    assert len(results) == len(pairs)
+    for pair, result in zip(pairs, results):
+        expected = baseline_gap(pair["skills"], pair["target_role"])
+        required = baseline_required(pair["target_role"])
+        assert result["match_percentage"] == expected["match_percentage"], pair
+        # Same sets as before, listed in the role's frequency order
+        assert result["matched_skills"] == [s for s in required if s in expected["matched_skills"]], pair
+        assert result["missing_skills"] == [s for s in required if s in expected["missing_skills"]], pair
+        assert result["required_count"] == len(required)
+        assert result["matched_count"] + result["missing_count"] == len(required)
+
+    counts_only = client.post("/api/skill_gap_batch", json={"pairs": pairs[:20], "include_skills": False}).get_json()
+    for full, short in zip(results, counts_only["results"]):
+        assert "matched_skills" not in short
+        assert short["match_percentage"] == full["match_percentage"] and short["missing_count"] == full["missing_count"]
+    for body in [{"pairs": "x"}, {"pairs": [1]}, {"pairs": [{"skills": 5}]}]:
+        assert client.post("/api/skill_gap_batch", json=body).status_code == 400
+
+def test_recommend_skills_matches_set_arithmetic():
+    client = flask_app.app.test_client()
+    for pair in make_pairs(n_pairs=40, seed=2):
+        resp = client.post("/api/recommend_skills", json={"target_role": pair["target_role"], "current_skills": pair["skills"]})
+        assert resp.status_code == 200, resp.get_json()
+        payload = resp.get_json()
+        expected = baseline_gap(pair["skills"], pair["target_role"])
+        assert payload["required_skills"] == baseline_required(pair["target_role"])
+        assert payload["match_percentage"] == expected["match_percentage"]
+        assert set(payload["matched_skills"]) == expected["matched_skills"]
+        assert set(payload["missing_skills"]) == expected["missing_skills"]
+
+def test_skill_masks_match_packbits():
+    index = flask_app.assets["skill_gaps"]
+    skills_lists = [pair["skills"] + [None, 3] for pair in make_pairs(n_pairs=200, seed=4)] + [[]]
+    bits = np.zeros((len(skills_lists), index.n_bits), dtype=bool)
+    for i, skills in enumerate(skills_lists):
+        for skill in skills:
+            if isinstance(skill, str) and skill in index.skill_ids:
+                bits[i, index.skill_ids[skill]] = True
+    np.testing.assert_array_equal(index.encode(skills_lists), np.packbits(bits, axis=1))
+    assert index.encode([]).shape == (0, index.n_bits // 8)
+
+if __name__ == "__main__":
+    test_role_skills_match_the_frame_scan()
+    test_skill_gap_batch_matches_set_arithmetic()
+    test_recommend_skills_matches_set_arithmetic()
+    test_skill_masks_match_packbits()
+    print("Role skill lists and skill gaps match the original frame scans and set arithmetic")